@@ -17,7 +17,7 @@ setup(
     keywords="count collection probability sequence permutation calculator",
     long_description=README,
     long_description_content_type="text/markdown",
-    python_requires=">=3.6.0",
+    python_requires=">=3.7.0",
     packages=find_packages("src"),
     package_dir={"": "src"},
     project_urls={
@@ -27,7 +27,6 @@ setup(
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
     ],
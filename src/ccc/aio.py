@@ -0,0 +1,201 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence
+
+from sympy import Rational
+
+from ccc.evaluate import Disjuncts
+from ccc.query import (
+    Query,
+    compile_draws,
+    compile_multisets,
+    compile_permutations,
+    compile_sequences,
+)
+from ccc.util.cancellation import run_cancellable
+
+# Shared by every call, and created when first needed
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class Partial(NamedTuple):
+    """
+    The signed sum of the inclusion-exclusion terms that were evaluated
+    before the deadline passed, out of all the terms.
+    """
+
+    value: Any
+    evaluated: int
+    terms: int
+
+
+def set_executor(executor: Optional[ThreadPoolExecutor]) -> None:
+    """
+    Evaluate queries in the given executor (or, if None, in one created
+    when it is next needed).
+    """
+    global _executor
+    _executor = executor
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="ccc")
+        return _executor
+
+
+async def evaluate_query(query: Query, timeout: Optional[float] = None, partial: bool = False):
+    """
+    Answer a compiled query in the executor, one term at a time.
+
+    If the task awaiting this is cancelled, or the timeout (in seconds)
+    passes, the term being evaluated is stopped at its next check
+    between multiplications (every engine checks), so its worker is
+    freed once the multiplication in progress is done. On timeout,
+    asyncio.TimeoutError is raised, or if partial is set, the sum of the
+    terms evaluated so far is returned as a Partial.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    cancelled = threading.Event()
+    answer = 0
+
+    try:
+        for evaluated, term in enumerate(query.terms):
+            future = loop.run_in_executor(
+                _get_executor(), run_cancellable, cancelled, term.evaluate
+            )
+
+            try:
+                value = await asyncio.wait_for(future, _remaining(loop, deadline))
+            except asyncio.TimeoutError:
+                if partial:
+                    return Partial(answer, evaluated, len(query.terms))
+                raise
+
+            answer += term.coefficient * value
+
+    finally:
+        # stop any term still running in the executor
+        cancelled.set()
+
+    return answer
+
+
+async def _compile_and_evaluate(
+    compile_query: Callable[..., Query],
+    args: Sequence[Any],
+    timeout: Optional[float],
+    partial: bool,
+):
+    """
+    Compile the query in the executor, then evaluate it with whatever
+    remains of the timeout. Compiling only plans the terms, so it is not
+    checked for cancellation.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    future = loop.run_in_executor(_get_executor(), compile_query, *args)
+    query = await asyncio.wait_for(future, _remaining(loop, deadline))
+
+    return await evaluate_query(query, _remaining(loop, deadline), partial)
+
+
+def _remaining(loop: asyncio.AbstractEventLoop, deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return max(deadline - loop.time(), 0)
+
+
+async def count_multisets(
+    size: int,
+    collection: Optional[Dict[str, int]] = None,
+    constraints: Optional[Disjuncts] = None,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+):
+    """
+    Count multisets of the given size that meet zero or more constraints.
+    """
+    args = (size, collection, constraints)
+    return await _compile_and_evaluate(compile_multisets, args, timeout, partial)
+
+
+async def count_draws(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Optional[Disjuncts] = None,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+):
+    """
+    Count draws (without replacement) of the given size from a
+    collection which meet zero or more constraints.
+    """
+    args = (size, collection, constraints, False, "count")
+    return await _compile_and_evaluate(compile_draws, args, timeout, partial)
+
+
+async def count_sequences(
+    size: int,
+    collection: Optional[Dict[str, int]],
+    constraints: Disjuncts,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+):
+    """
+    Count sequences of the given size that meet the constraints.
+    """
+    args = (size, collection, constraints)
+    return await _compile_and_evaluate(compile_sequences, args, timeout, partial)
+
+
+async def count_permutations(
+    sequence: Sequence[Hashable],
+    constraints: Optional[Disjuncts] = None,
+    same_distinct: bool = False,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+):
+    """
+    Count permutations of the sequence that meet zero or more constraints.
+    """
+    args = (sequence, constraints, same_distinct, "count")
+    return await _compile_and_evaluate(compile_permutations, args, timeout, partial)
+
+
+async def probability_draw(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Disjuncts,
+    replace: bool = False,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+) -> Rational:
+    """
+    Probability of drawing a collection of the given size such that
+    the constraints are met.
+    """
+    args = (size, collection, constraints, replace, "probability")
+    return await _compile_and_evaluate(compile_draws, args, timeout, partial)
+
+
+async def probability_permutation(
+    sequence: Sequence[Hashable],
+    constraints: Disjuncts,
+    same_distinct: bool = False,
+    timeout: Optional[float] = None,
+    partial: bool = False,
+) -> Rational:
+    """
+    Probability that a random permutation of the sequence meets
+    the constraints.
+    """
+    args = (sequence, constraints, same_distinct, "probability")
+    return await _compile_and_evaluate(compile_permutations, args, timeout, partial)
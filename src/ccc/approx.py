@@ -0,0 +1,318 @@
+import math
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from ccc.tables import log_factorial
+from ccc.util.degrees import Degrees, highest_degree, intersect_ranges, lowest_degree
+
+# Probabilities below exp(-_TAIL) are treated as zero when an item's
+# distribution is summed over a window around its mean
+_TAIL = 80.0
+
+# Largest number of Newton steps taken to find the saddle point
+_MAX_STEPS = 200
+
+
+class Approximation(NamedTuple):
+    """
+    An approximate probability, with an estimate of its absolute error.
+    """
+
+    value: float
+    error: float
+
+
+class _Item(NamedTuple):
+    """
+    One item's degrees, prepared once for the many tilts they are summed
+    at: a range with a few degrees excluded from it, or the degrees in
+    increasing order.
+    """
+
+    degrees: Sequence[int]
+    excluded: Sequence[int]
+    count: int
+
+
+class _Cumulants(NamedTuple):
+    log_mass: float
+    mean: float
+    variance: float
+    third: float
+    fourth: float
+
+
+def saddlepoint_probability(
+    factors: Iterable[Tuple[Degrees, int]], size: int, replace: bool = False
+) -> Approximation:
+    """
+    Approximate the probability that a draw of the given size from a
+    collection meets the constraints, given each item's degrees and
+    its count in the collection.
+
+    Without replacement, the counts drawn are distributed as independent
+    Binomial(n_i, p) variables conditioned on their sum being the size
+    (for any p). With replacement, they are Poisson(n_i * theta) variables
+    conditioned in the same way. So the probability is
+
+        P(all Y_i in their degrees) * P(sum of Y_i = size | all in degrees)
+        / P(sum of Y_i = size)
+
+    The first and last factors are found exactly (to floating point). The
+    middle one is the density of a sum of independent variables, which is
+    approximated by the normal density with an Edgeworth correction, with
+    p (or theta) chosen so the sum's mean is the size: the saddle point.
+    The size of the correction is given as the error estimate.
+
+    Items whose degrees include all of their likely values cost O(1), so
+    pooled unconstrained items are cheap however large the collection.
+    Items whose degrees are such a range less a few degrees (as != and
+    "not in" leave them) cost O(1) for each of those degrees. Other items
+    are summed over a window of O(sqrt(n_i)) degrees.
+    """
+    factors = [(degrees, count) for degrees, count in factors]
+    total = sum(count for _, count in factors)
+
+    if not all(degrees for degrees, _ in factors) or size > total and not replace:
+        return Approximation(0.0, 0.0)
+
+    if size == 0:
+        return Approximation(1.0, 0.0)
+
+    span = _lattice_span(degrees for degrees, _ in factors)
+    if (size - sum(lowest_degree(degrees) for degrees, _ in factors)) % span:
+        return Approximation(0.0, 0.0)
+
+    items = [_prepare_item(degrees, count) for degrees, count in factors]
+    tilt = _solve_tilt(items, size, total, replace)
+    cumulants = [_item_cumulants(item, tilt, replace) for item in items]
+
+    log_mass = sum(c.log_mass for c in cumulants)
+    variance = sum(c.variance for c in cumulants)
+    third = sum(c.third for c in cumulants)
+    fourth = sum(c.fourth for c in cumulants)
+
+    log_total = _log_pmf(size, total, tilt, replace)
+
+    if variance < 1e-12:
+        # every count is (almost) fixed, and the sum is the size
+        return Approximation(math.exp(log_mass - log_total), 0.0)
+
+    correction = fourth / (8 * variance ** 2) - 5 * third ** 2 / (24 * variance ** 3)
+    log_density = math.log(span) - 0.5 * math.log(2 * math.pi * variance)
+
+    value = math.exp(log_mass + log_density - log_total)
+    return Approximation(value * max(1 + correction, 0.0), value * abs(correction))
+
+
+def _prepare_item(degrees: Degrees, count: int) -> _Item:
+    """
+    Hold a set of degrees as the range spanning it less the degrees
+    missing from it, if fewer are missing than present, or else in order.
+    """
+    if isinstance(degrees, range):
+        return _Item(degrees, (), count)
+
+    ordered = sorted(degrees)
+    spanning = range(ordered[0], ordered[-1] + 1)
+
+    if len(spanning) - len(ordered) < len(ordered):
+        return _Item(spanning, [d for d in spanning if d not in degrees], count)
+
+    return _Item(ordered, (), count)
+
+
+def _solve_tilt(items: List[_Item], size: int, total: int, replace: bool) -> float:
+    """
+    Find the tilt at which the mean of the sum of the conditioned counts
+    is the size, by Newton's method (falling back to bisection).
+    """
+    if replace:
+        tilt = math.log(size / total)
+    else:
+        tilt = math.log(size / (total - size)) if size < total else 30.0
+
+    low, high = -math.inf, math.inf
+
+    for _ in range(_MAX_STEPS):
+        cumulants = [_item_cumulants(item, tilt, replace) for item in items]
+        mean = sum(c.mean for c in cumulants)
+        variance = sum(c.variance for c in cumulants)
+
+        if abs(mean - size) <= 1e-9 * max(size, 1):
+            break
+
+        if mean < size:
+            low = tilt
+        else:
+            high = tilt
+
+        step = (size - mean) / variance if variance > 0 else math.copysign(1.0, size - mean)
+        tilt += max(min(step, 5.0), -5.0)
+
+        if not low < tilt < high:
+            tilt = (low + high) / 2 if math.isfinite(low + high) else tilt
+
+    return tilt
+
+
+def _item_cumulants(item: _Item, tilt: float, replace: bool) -> _Cumulants:
+    """
+    The log of the probability that one item's tilted count is in its
+    degrees, and the first four cumulants of the count given that it is.
+    """
+    degrees, excluded, count = item
+
+    if replace:
+        rate = count * math.exp(tilt)
+        mean, variance = rate, rate
+        third, fourth = rate, rate
+        upper = math.inf
+    else:
+        p = 1 / (1 + math.exp(-tilt)) if tilt > -700 else 0.0
+        mean, variance = count * p, count * p * (1 - p)
+        third = variance * (1 - 2 * p)
+        fourth = variance * (1 - 6 * p * (1 - p))
+        upper = count
+
+    spread = _TAIL ** 0.5 * math.sqrt(variance) + _TAIL
+    lowest = max(mean - spread, 0)
+    highest = min(mean + spread, upper)
+
+    # the excluded degrees that are likely (the others change nothing)
+    likely = excluded[bisect_left(excluded, lowest) : bisect_right(excluded, highest)]
+
+    if isinstance(degrees, range) and degrees.step == 1:
+        if degrees[0] <= lowest and highest <= degrees[-1]:
+            moments = (0.0, variance, third, fourth + 3 * variance ** 2)
+            cumulants = _exclude(mean, moments, likely, count, tilt, replace)
+            if cumulants is not None:
+                return cumulants
+
+    # the likely degrees: a window around the mean, or the nearest degrees to it
+    if isinstance(degrees, range):
+        centre = min(max(mean, degrees[0]), degrees[-1])
+        window = range(math.floor(centre - spread), math.ceil(centre + spread) + 1)
+        support: Sequence[int] = intersect_ranges(degrees, window)
+        if likely:
+            missing = set(likely)
+            support = [d for d in support if d not in missing]
+        if not support:
+            support = [lowest_degree(degrees), highest_degree(degrees)]
+    else:
+        start = bisect_left(degrees, lowest)
+        stop = bisect_right(degrees, highest)
+        support = degrees[max(start - 1, 0) : stop + 1]
+
+    logs = [(d, _log_pmf(d, count, tilt, replace)) for d in support if 0 <= d <= upper]
+    logs = [(d, log) for d, log in logs if log > -math.inf]
+
+    if not logs:
+        return _Cumulants(-math.inf, 0.0, 0.0, 0.0, 0.0)
+
+    peak = max(log for _, log in logs)
+    weights = [(d, math.exp(log - peak)) for d, log in logs]
+    mass = sum(w for _, w in weights)
+
+    mean = sum(d * w for d, w in weights) / mass
+    moments = [sum((d - mean) ** k * w for d, w in weights) / mass for k in (2, 3, 4)]
+
+    return _Cumulants(
+        peak + math.log(mass),
+        mean,
+        moments[0],
+        moments[1],
+        moments[2] - 3 * moments[0] ** 2,
+    )
+
+
+def _exclude(
+    mean: float,
+    moments: Tuple[float, float, float, float],
+    excluded: Sequence[int],
+    count: int,
+    tilt: float,
+    replace: bool,
+) -> Optional[_Cumulants]:
+    """
+    The cumulants of a count with the given mean and first four central
+    moments, given that it is not one of the excluded degrees, found by
+    taking their terms out of the moments. None if they hold so much of
+    the probability that too little precision would be left.
+    """
+    if not excluded:
+        return _Cumulants(0.0, mean, moments[1], moments[2], moments[3] - 3 * moments[1] ** 2)
+
+    # moments about the unconditioned mean, less the excluded terms
+    weights = [(d - mean, math.exp(_log_pmf(d, count, tilt, replace))) for d in excluded]
+    mass = 1 - sum(w for _, w in weights)
+
+    if mass < 1e-3:
+        return None
+
+    raw = [
+        (moment - sum(x ** k * w for x, w in weights)) / mass for k, moment in enumerate(moments, 1)
+    ]
+
+    # and about the conditioned mean, shifted from the unconditioned one
+    shift = raw[0]
+    variance = raw[1] - shift ** 2
+    third = raw[2] - 3 * shift * raw[1] + 2 * shift ** 3
+    fourth = raw[3] - 4 * shift * raw[2] + 6 * shift ** 2 * raw[1] - 3 * shift ** 4
+
+    return _Cumulants(math.log(mass), mean + shift, variance, third, fourth - 3 * variance ** 2)
+
+
+def _log_pmf(d: int, count: int, tilt: float, replace: bool) -> float:
+    """
+    Log probability that a Binomial(count, p) variable (or with
+    replacement, a Poisson(count * theta) variable) is d, where the
+    tilt is log(p / (1 - p)) (or log(theta)).
+    """
+    if replace:
+        rate = math.log(count) + tilt
+        return d * rate - math.exp(rate) - log_factorial(d)
+
+    if d < 0 or d > count:
+        return -math.inf
+
+    # log p and log(1 - p), computed stably for large tilts
+    log_p = -_log1pexp(-tilt)
+    log_q = -_log1pexp(tilt)
+
+    return (
+        log_factorial(count)
+        - log_factorial(d)
+        - log_factorial(count - d)
+        + d * log_p
+        + (count - d) * log_q
+    )
+
+
+def _log1pexp(t: float) -> float:
+    if t > 30:
+        return t + math.log1p(math.exp(-t))
+    return math.log1p(math.exp(t))
+
+
+def _lattice_span(degree_sets: Iterable[Degrees]) -> int:
+    """
+    The greatest common divisor of the gaps between the degrees of every
+    item: the sum of one degree from each item can only take values this
+    far apart.
+    """
+    span = 0
+
+    for degrees in degree_sets:
+        if isinstance(degrees, range):
+            gap = degrees.step if len(degrees) > 1 else 0
+            span = math.gcd(span, gap)
+        else:
+            lowest = min(degrees)
+            for degree in degrees:
+                span = math.gcd(span, degree - lowest)
+
+        if span == 1:
+            return 1
+
+    return span or 1
@@ -0,0 +1,65 @@
+import os
+from typing import List, Tuple
+
+try:
+    import flint
+except ImportError:
+    flint = None
+
+# Polynomials with integer coefficients are multiplied by one of these:
+#
+#   - "python": packed into big integers (see ccc.series.multiply)
+#   - "flint": as fmpz_poly objects from python-flint, if it is installed
+#
+# Both give exactly the same coefficients. The fastest one installed is
+# used, unless the CCC_BACKEND environment variable names another when
+# this module is first imported (or set_backend is called).
+BACKENDS = ("python", "flint")
+
+_backend = "flint" if flint is not None else "python"
+
+
+def available_backends() -> Tuple[str, ...]:
+    """
+    The backends that can be used in this process.
+    """
+    return tuple(name for name in BACKENDS if name != "flint" or flint is not None)
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """
+    Multiply polynomials with the named backend from now on.
+    """
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {', '.join(BACKENDS)}")
+
+    if name not in available_backends():
+        raise ValueError(f"Backend '{name}' needs python-flint, which is not installed")
+
+    _backend = name
+
+
+def flint_multiply(first: List[int], second: List[int], max_degree: int) -> List[int]:
+    """
+    Multiply two polynomials with integer coefficients of any sign (given
+    as non-empty lists, lowest degree first) with python-flint, discarding
+    terms above max_degree.
+
+    The result has the same length as the product found by multiply(),
+    including any zero coefficients at the end.
+    """
+    product = flint.fmpz_poly(first[: max_degree + 1]) * flint.fmpz_poly(second[: max_degree + 1])
+    coeffs = [int(c) for c in product.coeffs()[: max_degree + 1]]
+    length = min(len(first) + len(second) - 1, max_degree + 1)
+
+    return coeffs + [0] * (length - len(coeffs))
+
+
+if os.environ.get("CCC_BACKEND"):
+    set_backend(os.environ["CCC_BACKEND"])
@@ -1,7 +1,10 @@
 import click
 
 from ccc.commands.count import count
+from ccc.commands.distribution import distribution
 from ccc.commands.probability import probability
+from ccc.commands.serve import serve
+from ccc.commands.tables import tables
 
 
 ALIASES = {"prob": probability}
@@ -29,4 +32,7 @@ def ccc():
 
 
 ccc.add_command(count)
+ccc.add_command(distribution)
 ccc.add_command(probability)
+ccc.add_command(serve)
+ccc.add_command(tables)
@@ -0,0 +1,254 @@
+import hashlib
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from sympy import Rational
+
+from ccc.errors import CheckpointError
+from ccc.query import CompiledTerm, Query
+from ccc.util.progress import Partial, run_with_progress
+
+# Seconds between writes of the checkpoint while terms are evaluated
+CHECKPOINT_INTERVAL = 10.0
+
+# Written at the start of every checkpoint file, followed by the query
+# fingerprint, then the number of terms
+_MAGIC = b"ccc-checkpoint\x02"
+_HEADER = struct.Struct("<32sQ")
+
+# Number of terms evaluated, then the partial sum as a signed numerator
+# and a denominator (each preceded by its length in bytes)
+_PROGRESS = struct.Struct("<Q")
+_LENGTH = struct.Struct("<I")
+
+# Then the number of factors multiplied in the partial product of the
+# next term (0 if none was saved), and the number of lists holding it.
+# Each list is its length followed by its integers.
+_PARTIAL = struct.Struct("<QI")
+
+
+def fingerprint(query: Query) -> bytes:
+    """
+    SHA-256 digest identifying the query, the same in every process.
+
+    The query key is written out in a canonical form first: sets (whose
+    order of iteration changes between processes) are sorted.
+    """
+    return hashlib.sha256(_canonical(query.key).encode()).digest()
+
+
+def _canonical(value: Any) -> str:
+    if isinstance(value, (tuple, list)):
+        return "(" + ",".join(_canonical(v) for v in value) + ")"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(_canonical(v) for v in value)) + "}"
+    return repr(value)
+
+
+def checkpoint_path(directory: str, query: Query) -> str:
+    """
+    The file in the directory that holds the checkpoint for the query.
+    """
+    return os.path.join(directory, fingerprint(query).hex()[:32] + ".ckpt")
+
+
+def read_checkpoint(path: str, query: Query) -> Tuple[int, Any, Optional[Partial]]:
+    """
+    Return the number of terms evaluated, their signed sum and the partial
+    product of the next term (or None), as saved at the last checkpoint
+    for the query, or (0, 0, None) if there is none.
+
+    A checkpoint written for a different query is rejected.
+    """
+    if not os.path.exists(path):
+        return 0, 0, None
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    try:
+        if not data.startswith(_MAGIC):
+            raise ValueError("not a checkpoint file")
+
+        offset = len(_MAGIC)
+        digest, terms = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+
+        if digest != fingerprint(query) or terms != len(query.terms):
+            raise CheckpointError(f"Checkpoint '{path}' was written for a different query")
+
+        (evaluated,) = _PROGRESS.unpack_from(data, offset)
+        numerator, offset = _read_int(data, offset + _PROGRESS.size)
+        denominator, offset = _read_int(data, offset)
+        partial = _read_partial(data, offset)
+
+    except (ValueError, struct.error) as err:
+        raise CheckpointError(f"Checkpoint '{path}' cannot be read: {err}")
+
+    if evaluated > terms or denominator < 1 or (partial is not None and evaluated == terms):
+        raise CheckpointError(f"Checkpoint '{path}' cannot be read: invalid progress")
+
+    if query.method == "probability":
+        return evaluated, Rational(numerator, denominator), partial
+
+    return evaluated, numerator, partial
+
+
+def write_checkpoint(
+    path: str, query: Query, evaluated: int, answer: Any, partial: Optional[Partial] = None
+) -> None:
+    """
+    Save the number of terms evaluated and their signed sum, and the
+    partial product of the next term if it has one.
+
+    The file is written in full under a temporary name and then renamed,
+    so a crash while writing leaves the previous checkpoint intact.
+    """
+    if isinstance(answer, Rational):
+        numerator, denominator = int(answer.p), int(answer.q)
+    else:
+        numerator, denominator = int(answer), 1
+
+    data = b"".join(
+        [
+            _MAGIC,
+            _HEADER.pack(fingerprint(query), len(query.terms)),
+            _PROGRESS.pack(evaluated),
+            _write_int(numerator),
+            _write_int(denominator),
+            _write_partial(partial),
+        ]
+    )
+
+    temporary = path + ".tmp"
+
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temporary, path)
+
+
+def _write_int(n: int) -> bytes:
+    data = n.to_bytes(n.bit_length() // 8 + 1, "little", signed=True)
+    return _LENGTH.pack(len(data)) + data
+
+
+def _read_int(data: bytes, offset: int) -> Tuple[int, int]:
+    (length,) = _LENGTH.unpack_from(data, offset)
+    start = offset + _LENGTH.size
+
+    if start + length > len(data):
+        raise ValueError("truncated integer")
+
+    return int.from_bytes(data[start : start + length], "little", signed=True), start + length
+
+
+def _write_partial(partial: Optional[Partial]) -> bytes:
+    if partial is None:
+        return _PARTIAL.pack(0, 0)
+
+    factors, lists = partial
+    data = [_PARTIAL.pack(factors, len(lists))]
+
+    for values in lists:
+        data.append(_PROGRESS.pack(len(values)))
+        data.extend(_write_int(value) for value in values)
+
+    return b"".join(data)
+
+
+def _read_partial(data: bytes, offset: int) -> Optional[Partial]:
+    factors, count = _PARTIAL.unpack_from(data, offset)
+    offset += _PARTIAL.size
+    lists = []
+
+    for _ in range(count):
+        (length,) = _PROGRESS.unpack_from(data, offset)
+        offset += _PROGRESS.size
+        values = []
+
+        for _ in range(length):
+            value, offset = _read_int(data, offset)
+            values.append(value)
+
+        lists.append(values)
+
+    if offset != len(data):
+        raise ValueError("unexpected data at end")
+
+    if not factors:
+        return None
+
+    return factors, tuple(lists)
+
+
+def evaluate_with_checkpoint(
+    query: Query, directory: str, jobs: int = 1, interval: Optional[float] = None
+):
+    """
+    Answer the query, saving the signed sum of the terms evaluated so far
+    to a checkpoint in the directory at most every interval seconds (and
+    once all terms are done). Terms evaluated in this process also save
+    the partial product of their factors, so that a single long term does
+    not have to start again either.
+
+    If a checkpoint for the query is already in the directory, the terms
+    (and factors) it covers are not evaluated again.
+    """
+    if interval is None:
+        interval = CHECKPOINT_INTERVAL
+
+    os.makedirs(directory, exist_ok=True)
+    path = checkpoint_path(directory, query)
+    evaluated, answer, partial = read_checkpoint(path, query)
+
+    last_write = time.monotonic()
+
+    def save_partial(progress: Partial) -> None:
+        nonlocal last_write
+
+        if time.monotonic() - last_write >= interval:
+            write_checkpoint(path, query, evaluated, answer, progress)
+            last_write = time.monotonic()
+
+    for coefficient, value in _values(query, evaluated, jobs, partial, save_partial):
+        answer += coefficient * value
+        evaluated += 1
+
+        if time.monotonic() - last_write >= interval:
+            write_checkpoint(path, query, evaluated, answer)
+            last_write = time.monotonic()
+
+    write_checkpoint(path, query, evaluated, answer)
+    return answer
+
+
+def _values(
+    query: Query,
+    start: int,
+    jobs: int,
+    partial: Optional[Partial],
+    save_partial: Callable[[Partial], None],
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Generate the coefficient and value of each term from start onwards,
+    in order.
+
+    Terms evaluated in worker processes start their products afresh;
+    otherwise the first resumes from the partial product.
+    """
+    terms = query.terms[start:]
+    coefficients = [term.coefficient for term in terms]
+
+    if jobs > 1 and len(terms) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from zip(coefficients, executor.map(CompiledTerm.evaluate, terms))
+    else:
+        for term in terms:
+            yield term.coefficient, run_with_progress(partial, save_partial, term.evaluate)
+            partial = None
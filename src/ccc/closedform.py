@@ -0,0 +1,50 @@
+from typing import Dict, Iterable, Tuple
+
+from ccc.tables import binomial
+from ccc.util.cancellation import check_cancelled
+
+
+def count_interval_multisets(bounds: Iterable[Tuple[int, int]], size: int) -> int:
+    """
+    Count multisets of the given size where the count of each item
+    lies in an interval [lowest, highest].
+
+    Subtracting each lower bound leaves a stars-and-bars problem:
+    count the ways to write the remaining size r as a sum of k
+    non-negative parts, where part i is at most u_i. By inclusion-
+    exclusion over the parts that exceed their upper bound:
+
+        sum over S of (-1)**|S| * binomial(r - sum(u_i + 1 for i in S) + k - 1, k - 1)
+
+    Only bounds smaller than r can be exceeded, and subsets of those
+    bounds are grouped by their total, so no polynomial is ever built.
+
+    """
+    bounds = list(bounds)
+    remaining = size - sum(lowest for lowest, _ in bounds)
+
+    if remaining < 0:
+        return 0
+
+    k = len(bounds)
+
+    if k == 0:
+        return int(remaining == 0)
+
+    # map the total of the excess (u_i + 1) over a subset to its signed number of subsets
+    excess_totals: Dict[int, int] = {0: 1}
+
+    for lowest, highest in bounds:
+        check_cancelled()
+        excess = highest - lowest + 1
+
+        if excess > remaining:
+            continue
+
+        for total, sign in list(excess_totals.items()):
+            if total + excess <= remaining:
+                excess_totals[total + excess] = excess_totals.get(total + excess, 0) - sign
+
+    return sum(
+        sign * binomial(remaining - total + k - 1, k - 1) for total, sign in excess_totals.items()
+    )
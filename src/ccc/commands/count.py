@@ -2,13 +2,13 @@ import sys
 
 import click
 
-from ccc.draw import Draw
-from ccc.multiset import Multiset
-from ccc.sequence import Sequence
-from ccc.permutation import PermutationCounter
+from ccc import evaluate
+from ccc.checkpoint import evaluate_with_checkpoint
+from ccc.errors import CheckpointError, CollectionError, ConstraintNotImplementedError
+from ccc.query import compile_draws, compile_multisets, compile_permutations, compile_sequences
 from ccc.util.constraints import process_constraint_string
-from ccc.util.collection import process_collection_string
-from ccc.util.misc import subsets
+from ccc.util.output import OUTPUT_FORMATS, format_number
+from ccc.util.collection import load_collection, read_collection_string
 
 
 @click.group()
@@ -19,126 +19,278 @@ def count():
 @count.command()
 @click.option("--size", "-s", type=int, required=True, help="Number of items in multiset")
 @click.option("--collection", "-k", type=str, help="Collection to produce multisets from")
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --collection)",
+)
 @click.option("--where", "constraints", type=str, help="Constraints on items in multiset")
-def multisets(size, constraints, collection):
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="decimal",
+    help="How to write the answer",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option("--explain", is_flag=True, help="Show the engine chosen for each term and exit")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+def multisets(
+    size, constraints, collection, from_file, output_format, precision, explain, jobs, checkpoint
+):
     """
     Count multisets of the given size that meet zero or more constraints
     """
-    if collection is not None:
-        collection = process_collection_string(collection)
+    try:
+        collection = load_collection(collection, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
 
     if constraints is not None:
         constraints = process_constraint_string(constraints)
 
-    else:
-        ms = Multiset(size, collection)
-        click.echo(ms.count())
-        sys.exit(0)
+    try:
+        if explain:
+            click.echo(evaluate.explain(evaluate.multiset_terms(size, collection, constraints)))
+            return
 
-    if len(constraints) == 1:
-        ms = Multiset(size, collection, constraints[0])
-        answer = ms.count()
+        if checkpoint is not None:
+            query = compile_multisets(size, collection, constraints)
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.count_multisets(size, collection, constraints, jobs)
 
-    else:
-        if collection is None:
-            sys.exit("Must specify a collection if using 'or' in constraints")
+    except (ConstraintNotImplementedError, CheckpointError) as err:
+        sys.exit(str(err))
 
-        answer = 0
-
-        # Inclusion/Exclusion
-        for n, subset in subsets(constraints):
-            ms = Multiset(size, collection, subset)
-            answer += (-1) ** (n + 1) * ms.count()
-
-    click.echo(answer)
+    click.echo(format_number(answer, output_format, precision))
 
 
 @count.command()
 @click.option("--size", "-s", type=int, required=True, help="Number of items to draw")
-@click.option("--collection", "-k", type=str, required=True, help="Collection to draw from")
+@click.option("--collection", "-k", type=str, help="Collection to draw from")
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --collection)",
+)
 @click.option("--where", "constraints", type=str, help="Constraints on drawn items")
-def draws(size, constraints, collection):
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="decimal",
+    help="How to write the answer",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option("--explain", is_flag=True, help="Show the engine chosen for each term and exit")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+def draws(
+    size, constraints, collection, from_file, output_format, precision, explain, jobs, checkpoint
+):
     """
     Count draws (without replacement) of the given size from a
     collection which meet zero or more constraints
     """
-    collection = process_collection_string(collection)
+    try:
+        collection = load_collection(collection, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
+
+    if collection is None:
+        raise click.UsageError("Give either --collection or --from-file")
 
     if constraints is not None:
         constraints = process_constraint_string(constraints)
 
-    else:
-        ms = Multiset(size, collection)
-        click.echo(ms.count())
-        sys.exit(0)
+    try:
+        if explain:
+            click.echo(evaluate.explain(evaluate.draw_terms(size, collection, constraints)))
+            return
 
-    if len(constraints) == 1:
-        draw = Draw(size, collection, constraints[0])
-        answer = draw.count()
+        if checkpoint is not None:
+            query = compile_draws(size, collection, constraints, method="count")
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.count_draws(size, collection, constraints, jobs)
 
-    else:
-        answer = 0
+    except (ConstraintNotImplementedError, CheckpointError) as err:
+        sys.exit(str(err))
 
-        # Inclusion/Exclusion
-        for n, subset in subsets(constraints):
-            draw = Draw(size, collection, subset)
-            answer += (-1) ** (n + 1) * draw.count()
-
-    click.echo(answer)
+    click.echo(format_number(answer, output_format, precision))
 
 
 @count.command()
 @click.option("--size", "-s", type=int, required=True, help="Number of items in sequence")
 @click.option("--where", "constraints", type=str, required=True, help="Constraints on sequences")
 @click.option("--collection", "-k", type=str, help="Collection to create sequences from")
-def sequences(size, constraints, collection):
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --collection)",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="decimal",
+    help="How to write the answer",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option("--explain", is_flag=True, help="Show the engine chosen for each term and exit")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+def sequences(
+    size, constraints, collection, from_file, output_format, precision, explain, jobs, checkpoint
+):
     """
     Count possible sequences of the given size that meet zero more constraints
     """
     if constraints is not None:
         constraints = process_constraint_string(constraints)
 
-    if collection is not None:
-        collection = process_collection_string(collection)
-
-    if len(constraints) == 1:
-        seq = Sequence(size, collection, constraints[0])
-        answer = seq.count()
+    try:
+        collection = load_collection(collection, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
 
-    else:
-        if collection is None:
-            sys.exit("Must specify a collection if using 'or' in constraints")
+    try:
+        if explain:
+            click.echo(evaluate.explain(evaluate.sequence_terms(size, collection, constraints)))
+            return
 
-        answer = 0
+        if checkpoint is not None:
+            query = compile_sequences(size, collection, constraints)
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.count_sequences(size, collection, constraints, jobs)
 
-        # Inclusion/Exclusion
-        for n, subset in subsets(constraints):
-            seq = Sequence(size, collection, subset)
-            answer += (-1) ** (n + 1) * seq.count()
+    except (ConstraintNotImplementedError, CheckpointError) as err:
+        sys.exit(str(err))
 
-    click.echo(answer)
+    click.echo(format_number(answer, output_format, precision))
 
 
 @count.command()
-@click.argument("sequence")
+@click.argument("sequence", required=False)
+@click.option(
+    "--counts", type=str, help="Count of each item (or a file of counts) instead of a sequence"
+)
 @click.option("--where", "constraints", type=str, help="Constraints on permutations")
 @click.option(
     "--same-distinct/--no-same-distinct", default=False, help="Toggle whether each item is unique"
 )
-def permutations(sequence, constraints, same_distinct):
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="decimal",
+    help="How to write the answer",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option("--explain", is_flag=True, help="Show the engine chosen for each term and exit")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+def permutations(
+    sequence,
+    counts,
+    constraints,
+    same_distinct,
+    output_format,
+    precision,
+    explain,
+    jobs,
+    checkpoint,
+):
     """
-    Count permutations of the given sequence that that meet a constraint
+    Count permutations of the given sequence that that meet zero or more constraints
     """
-    if constraints is not None:
-
-        constraints = process_constraint_string(constraints)
+    if (sequence is None) == (counts is None):
+        raise click.UsageError("Give either a SEQUENCE or --counts")
 
-        if len(constraints) > 1:
-            sys.exit("Using 'or' is not supported for permutations")
+    if counts is not None:
+        try:
+            sequence = read_collection_string(counts)
+        except CollectionError as err:
+            raise click.UsageError(str(err))
 
-        constraints = constraints[0]
-
-    permutation = PermutationCounter(sequence, constraints, same_distinct)
-    answer = permutation.count()
+    if constraints is not None:
+        constraints = process_constraint_string(constraints)
 
-    click.echo(answer)
+    try:
+        if explain:
+            terms = evaluate.permutation_terms(sequence, constraints, same_distinct)
+            click.echo(evaluate.explain(terms))
+            return
+
+        if checkpoint is not None:
+            query = compile_permutations(sequence, constraints, same_distinct)
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.count_permutations(sequence, constraints, same_distinct, jobs)
+    except (ConstraintNotImplementedError, CheckpointError) as err:
+        sys.exit(str(err))
+
+    click.echo(format_number(answer, output_format, precision))
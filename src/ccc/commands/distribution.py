@@ -0,0 +1,66 @@
+import click
+
+from ccc import evaluate
+from ccc.errors import CollectionError
+from ccc.util.constraints import process_constraint_string
+from ccc.util.collection import load_collection
+from ccc.util.output import format_number
+
+
+@click.group()
+def distribution() -> None:
+    "Distribution of the number of one item that is drawn"
+
+
+@distribution.command("draw")
+@click.argument("number", type=int)
+@click.option("--from", "-f", "from_", type=str, help="Collection of items to draw from")
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --from)",
+)
+@click.option("--item", "-i", type=str, required=True, help="Item whose count is tabulated")
+@click.option("--where", "constraints", type=str, help="Constraints the draw must meet")
+@click.option(
+    "--replace/--no-replace",
+    default=False,
+    help="Toggle whether each item is replaced after being drawn",
+)
+@click.option("--rational/--float", default=True, help="Toggle representation of probability")
+def draw_command(number, from_, from_file, item, constraints, replace, rational) -> None:
+    """
+    For each possible count of the item, the probability of drawing
+    exactly that many of the item such that any constraints are met.
+
+    The cumulative probability (cdf) and the probability of drawing
+    more of the item (survival) are shown alongside.
+    """
+    if constraints is not None:
+        constraints = process_constraint_string(constraints)
+
+    try:
+        collection = load_collection(from_, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
+
+    if collection is None:
+        raise click.UsageError("Give either --from or --from-file")
+
+    if item not in collection:
+        raise click.BadParameter(f"'{item}' is not in the collection", param_hint="--item")
+
+    try:
+        pmf = evaluate.distribution_draw(number, collection, item, constraints, replace)
+    except ValueError as err:
+        raise click.UsageError(str(err))
+
+    show = format_number if rational else float
+    total = sum(pmf)
+    cdf = 0
+
+    click.echo("count\tpmf\tcdf\tsurvival")
+
+    for count, probability in enumerate(pmf):
+        cdf += probability
+        click.echo(f"{count}\t{show(probability)}\t{show(cdf)}\t{show(total - cdf)}")
@@ -1,12 +1,17 @@
 import sys
+from typing import Dict, List, Optional, Tuple
 
 import click
+from sympy import Rational
+from sympy.core.sympify import SympifyError
 
-from ccc.draw import Draw
-from ccc.permutation import PermutationCounter
+from ccc import evaluate
+from ccc.checkpoint import evaluate_with_checkpoint
+from ccc.errors import CheckpointError, CollectionError, ConstraintNotImplementedError
+from ccc.query import compile_draws, compile_permutations
 from ccc.util.constraints import process_constraint_string
-from ccc.util.collection import process_collection_string
-from ccc.util.misc import subsets
+from ccc.util.output import OUTPUT_FORMATS, format_number
+from ccc.util.collection import load_collection, read_collection_string
 
 
 @click.group()
@@ -16,8 +21,11 @@ def probability() -> None:
 
 @probability.command("draw")
 @click.argument("number", type=int)
+@click.option("--from", "-f", "from_", type=str, help="Collection of items to draw from")
 @click.option(
-    "--from", "-f", "from_", type=str, required=True, help="Collection of items to draw from"
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --from)",
 )
 @click.option(
     "--where", "constraints", type=str, required=True, help="Constraints the draw must meet"
@@ -27,37 +35,196 @@ def probability() -> None:
     default=False,
     help="Toggle whether each item is replaced after being drawn",
 )
-@click.option("--rational/--float", default=True, help="Toggle representation of probability")
-def draw_command(number, constraints, from_, rational, replace) -> None:
+@click.option(
+    "--rational/--float", default=None, help="Toggle representation of probability [rational]"
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="How to write the answer (instead of --rational or --float)",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option("--explain", is_flag=True, help="Show the engine chosen for each term and exit")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+@click.option(
+    "--threshold",
+    type=str,
+    help="Only decide whether the probability is at least this (e.g. 0.9 or 9/10)",
+)
+@click.option(
+    "--method",
+    type=click.Choice(["exact", "approx"]),
+    default="exact",
+    help="Find the probability exactly, or approximately with an error estimate",
+)
+def draw_command(
+    number,
+    constraints,
+    from_,
+    from_file,
+    rational,
+    output_format,
+    precision,
+    replace,
+    explain,
+    jobs,
+    checkpoint,
+    threshold,
+    method,
+) -> None:
     """
     Probability of drawing a collection a given size such that
     any constraints imposed on the items are met
     """
+    _check_modes(
+        {
+            "--explain": explain,
+            "--threshold": threshold is not None,
+            "--method approx": method == "approx",
+        },
+        jobs,
+        checkpoint,
+    )
+
+    if method == "approx" and (output_format is not None or rational is not None):
+        raise click.UsageError(
+            "--format, --rational and --float cannot be used with --method approx"
+        )
+
+    rational = rational is not False
+
     if constraints is not None:
         constraints = process_constraint_string(constraints)
 
-    collection = process_collection_string(from_)
+    try:
+        collection = load_collection(from_, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
+
+    if collection is None:
+        raise click.UsageError("Give either --from or --from-file")
+
+    if explain:
+        click.echo(evaluate.explain(evaluate.draw_terms(number, collection, constraints, replace)))
+        return
 
-    if len(constraints) == 1:
-        draw = Draw(number, collection, constraints[0], replace=replace)
-        answer = draw.probability()
+    if threshold is not None:
+        decision = evaluate.threshold_probability_draw(
+            number, collection, constraints, _read_threshold(threshold), replace
+        )
+        click.echo(_format_decision(decision, rational, output_format, precision))
+        return
 
+    if method == "approx":
+        value, error = evaluate.approximate_probability_draw(
+            number, collection, constraints, replace
+        )
+        click.echo(f"{value:.{precision}g} ± {error:.2g}")
+        return
+
+    try:
+        if checkpoint is not None:
+            query = compile_draws(number, collection, constraints, replace)
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.probability_draw(number, collection, constraints, replace, jobs)
+    except CheckpointError as err:
+        sys.exit(str(err))
+
+    if output_format is not None:
+        click.echo(format_number(answer, output_format, precision))
+    elif rational:
+        click.echo(format_number(answer))
     else:
-        answer = 0
+        click.echo(float(answer))
+
+
+@probability.command("stages")
+@click.option("--from", "-f", "from_", type=str, help="Collection of items to draw from")
+@click.option(
+    "--from-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="CSV, JSON or JSONL file of item counts (instead of --from)",
+)
+@click.option(
+    "--stage",
+    "stages",
+    type=str,
+    multiple=True,
+    required=True,
+    help="Size of a stage and the constraints it must meet, e.g. '7: mountain >= 1'",
+)
+@click.option("--rational/--float", default=True, help="Toggle representation of probability")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="How to write the answer (instead of --rational or --float)",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+def stages_command(from_, from_file, stages, rational, output_format, precision, jobs) -> None:
+    """
+    Probability of drawing from a collection in stages, one after
+    another without replacement, such that the items drawn at each
+    stage meet the constraints of that stage
+    """
+    try:
+        collection = load_collection(from_, from_file)
+    except CollectionError as err:
+        raise click.UsageError(str(err))
+
+    if collection is None:
+        raise click.UsageError("Give either --from or --from-file")
 
-        # Inclusion/Exclusion
-        for n, subset in subsets(constraints):
-            draw = Draw(number, collection, subset, replace=replace)
-            answer += (-1) ** (n + 1) * draw.probability()
+    stages = [_read_stage(stage) for stage in stages]
 
-    if rational:
-        click.echo(answer)
+    try:
+        answer = evaluate.probability_staged_draw(collection, stages, jobs)
+    except ValueError as err:
+        raise click.UsageError(str(err))
+
+    if output_format is not None:
+        click.echo(format_number(answer, output_format, precision))
+    elif rational:
+        click.echo(format_number(answer))
     else:
         click.echo(float(answer))
 
 
 @probability.command("permutation")
-@click.argument("sequence")
+@click.argument("sequence", required=False)
+@click.option(
+    "--counts", type=str, help="Count of each item (or a file of counts) instead of a sequence"
+)
 @click.option(
     "--where", "constraints", type=str, required=True, help="Constraints the permuation must meet"
 )
@@ -65,22 +232,152 @@ def draw_command(number, constraints, from_, rational, replace) -> None:
     "--same-distinct/--no-same-distinct", default=False, help="Toggle whether each item is unique"
 )
 @click.option("--rational/--float", default=True, help="Toggle representation of probability")
-def permutation_command(sequence, constraints, same_distinct, rational):
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="How to write the answer (instead of --rational or --float)",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Significant digits for --format sci",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes to evaluate terms",
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(file_okay=False),
+    help="Directory in which to save progress, and resume from if interrupted",
+)
+@click.option(
+    "--threshold",
+    type=str,
+    help="Only decide whether the probability is at least this (e.g. 0.9 or 9/10)",
+)
+def permutation_command(
+    sequence,
+    counts,
+    constraints,
+    same_distinct,
+    rational,
+    output_format,
+    precision,
+    jobs,
+    checkpoint,
+    threshold,
+):
     """
     Probability that a random permutation of the given sequence
     meets the specified constraints.
     """
+    if (sequence is None) == (counts is None):
+        raise click.UsageError("Give either a SEQUENCE or --counts")
+
+    if counts is not None:
+        try:
+            sequence = read_collection_string(counts)
+        except CollectionError as err:
+            raise click.UsageError(str(err))
+
+    _check_modes({"--threshold": threshold is not None}, jobs, checkpoint)
+
     constraints = process_constraint_string(constraints)
 
-    if len(constraints) > 1:
-        sys.exit("Using 'or' is not supported for permutations")
+    if threshold is not None:
+        try:
+            decision = evaluate.threshold_probability_permutation(
+                sequence, constraints, _read_threshold(threshold), same_distinct
+            )
+        except ConstraintNotImplementedError as err:
+            sys.exit(str(err))
 
-    constraints = constraints[0]
+        click.echo(_format_decision(decision, rational, output_format, precision))
+        return
 
-    permutation = PermutationCounter(sequence, constraints, same_distinct)
-    answer = permutation.probability()
+    try:
+        if checkpoint is not None:
+            query = compile_permutations(sequence, constraints, same_distinct, "probability")
+            answer = evaluate_with_checkpoint(query, checkpoint, jobs)
+        else:
+            answer = evaluate.probability_permutation(sequence, constraints, same_distinct, jobs)
+    except (ConstraintNotImplementedError, CheckpointError) as err:
+        sys.exit(str(err))
 
-    if rational:
-        click.echo(answer)
+    if output_format is not None:
+        click.echo(format_number(answer, output_format, precision))
+    elif rational:
+        click.echo(format_number(answer))
     else:
         click.echo(float(answer))
+
+
+def _check_modes(modes: Dict[str, bool], jobs: int, checkpoint: Optional[str]) -> None:
+    """
+    Reject more than one of the options that replace the exact evaluation
+    (given as a mapping of each option to whether it was used), and any
+    use of --jobs or --checkpoint with them, since only the exact
+    evaluation runs in parallel or saves its progress.
+    """
+    used = [option for option, given in modes.items() if given]
+
+    if len(used) > 1:
+        raise click.UsageError(f"{used[0]} cannot be used with {used[1]}")
+
+    if used and (jobs != 1 or checkpoint is not None):
+        raise click.UsageError(f"--jobs and --checkpoint cannot be used with {used[0]}")
+
+
+def _read_threshold(threshold: str) -> Rational:
+    try:
+        value = Rational(threshold)
+    except (TypeError, ValueError, SympifyError):
+        raise click.BadParameter(f"'{threshold}' is not a number", param_hint="--threshold")
+
+    if not 0 <= value <= 1:
+        raise click.BadParameter("must be between 0 and 1", param_hint="--threshold")
+
+    return value
+
+
+def _format_decision(
+    decision: evaluate.Decision, rational: bool, output_format: Optional[str], precision: int
+) -> str:
+    """
+    Answer yes or no, followed by the bounds on the probability (written
+    the same way as the probability would be).
+    """
+    if output_format is not None:
+        lower, upper = (
+            format_number(b, output_format, precision) for b in (decision.lower, decision.upper)
+        )
+    elif rational:
+        lower, upper = (format_number(b) for b in (decision.lower, decision.upper))
+    else:
+        lower, upper = float(decision.lower), float(decision.upper)
+
+    return f"{'yes' if decision.above else 'no'} ({lower} <= P <= {upper})"
+
+
+def _read_stage(stage: str) -> Tuple[int, Optional[List]]:
+    """
+    Read a stage given as its size, optionally followed by a colon and
+    the constraints the items drawn at the stage must meet.
+    """
+    size, _, constraints = stage.partition(":")
+
+    try:
+        size = int(size)
+    except ValueError:
+        raise click.BadParameter(f"'{stage}' does not start with a size", param_hint="--stage")
+
+    if not constraints.strip():
+        return size, None
+
+    return size, process_constraint_string(constraints.strip())
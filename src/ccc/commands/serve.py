@@ -0,0 +1,45 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+
+from ccc.server import QueryServer
+
+
+@click.command()
+@click.option("--port", "-p", type=int, default=8000, help="Port to listen on")
+@click.option("--host", type=str, default="127.0.0.1", help="Address to listen on")
+@click.option("--workers", "-w", type=int, help="Number of worker processes [default: CPUs]")
+@click.option("--timeout", type=float, default=60.0, help="Seconds to wait for each query")
+def serve(port, host, workers, timeout):
+    """
+    Answer count and probability queries sent as JSON over HTTP
+
+    Each command is available at a path such as /count/draws or
+    /probability/draw, and takes a JSON object with the same options
+    as the command line, e.g.:
+
+        {"number": 4, "from": "red=3; blue=7", "where": "blue == 0"}
+    """
+    # queries that time out are cancelled through events the workers can see
+    manager = multiprocessing.Manager()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    query_server = QueryServer(executor, timeout, manager.Event)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server = loop.run_until_complete(asyncio.start_server(query_server.handle, host, port))
+
+    click.echo(f"Serving on http://{host}:{port}")
+
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        executor.shutdown()
+        manager.shutdown()
+        loop.close()
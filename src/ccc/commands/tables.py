@@ -0,0 +1,44 @@
+import click
+
+from ccc.tablefile import DEFAULT_STRIDE, build_table_file
+
+
+@click.group()
+def tables() -> None:
+    "Precomputed tables shared by worker processes"
+
+
+@tables.command("build")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--size", "-s", type=click.IntRange(min=0), required=True, help="Number of entries")
+@click.option(
+    "--stride",
+    type=click.IntRange(min=1),
+    default=DEFAULT_STRIDE,
+    show_default=True,
+    help="Distance between the exact factorials stored",
+)
+@click.option(
+    "--modulus",
+    "-m",
+    "moduli",
+    type=int,
+    multiple=True,
+    help="Prime to tabulate factorials modulo (can be repeated)",
+)
+def build_command(path, size, stride, moduli) -> None:
+    """
+    Write a file of factorials for every number below the size: their
+    logarithms, their values modulo any given primes, and exact values
+    for every multiple of the stride (from which any other is quick
+    to find).
+
+    Set the CCC_TABLES environment variable to the path of the file, and
+    every ccc process maps it read-only instead of computing the tables.
+    """
+    try:
+        build_table_file(path, size, stride, moduli)
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="--modulus")
+
+    click.echo(f"Wrote tables for 0 to {size - 1} to {path}")
@@ -1,13 +1,27 @@
-from typing import Dict, List, Optional, Tuple
+import sys
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
 
-from sympy import Rational, prod, binomial, factorial
+from sympy import Rational
 from sympy.abc import x
 
+from ccc.approx import Approximation, saddlepoint_probability
+from ccc.errors import CollectionError
 from ccc.polynomial import (
+    degrees_to_list_with_binomial_coeff,
     degrees_to_polynomial_with_binomial_coeff,
     degrees_to_polynomial_with_fractional_coeff,
+    degrees_to_sparse_with_binomial_coeff,
+    multiply_polynomials,
 )
+from ccc.planner import Plan
 from ccc.polynomialtracker import PolynomialTracker
+from ccc.series import (
+    multinomial_product,
+    sparse_product,
+    truncated_product,
+)
+from ccc.tables import binomial, binomial_row, factorial
+from ccc.util.degrees import Degrees, clip_degrees
 
 
 class Draw(PolynomialTracker):
@@ -26,52 +40,323 @@ class Draw(PolynomialTracker):
     ) -> None:
 
         if not collection:
-            raise ValueError("collection cannot be empty")
+            raise CollectionError("collection cannot be empty")
 
         self.replace = replace
         super().__init__(size, collection, constraints)
 
     def _add_unconstrained_items(self) -> None:
         """
+        Items that are not constrained are pooled into a single factor,
+        keyed by the set of pooled items. Drawing d of them in total can
+        be done in binomial(n, d) ways, where n is their total count in
+        the collection (or with replacement, counts n**d sequences).
+
         If drawing with replacement, unconstrained items are not limited
         to their frequency in the collection.
         """
+        self._counts: Dict[Hashable, int] = {item: self._collection[item] for item in self._domains}
+        unconstrained = frozenset(self._collection.keys() - self._domains.keys())
+
+        if unconstrained:
+            self._counts[unconstrained] = sum(self._collection[item] for item in unconstrained)
+            self._domains[unconstrained] = range(self._item_limit(unconstrained) + 1)
+
+    def engines(self) -> Tuple[str, ...]:
         if self.replace:
-            for item in self._collection:
-                if item not in self._degrees:
-                    self.impose_constraint_le(item, self._max_degree)
+            return ("multinomial", "polynomial")
+        return ("packed", "polynomial", "sparse")
 
-        else:
-            super()._add_unconstrained_items()
+    def _item_limit(self, item: Hashable) -> int:
+        return self._limit(self._counts[item])
 
-    def count(self) -> int:
+    def _limit(self, count: int) -> int:
         """
-        Count number of draws that meet constraints.
+        The most that can be drawn of items with this count in the
+        collection. With replacement, they can be drawn any number of times.
         """
-        polys = []
+        if self.replace:
+            return self._max_degree
 
-        for item, degrees in self._degrees.items():
+        return min(count, self._max_degree)
 
-            p = degrees_to_polynomial_with_binomial_coeff(degrees, self._collection[item])
-            polys.append(p)
+    def plan(self) -> Plan:
+        """
+        If the constraints do not exclude any draw, the answer is known
+        without evaluating any product.
+        """
+        if self.is_feasible() and all(
+            len(degrees) == self._item_limit(item) + 1
+            for item, degrees in zip(self._domains, self._clipped_degrees())
+        ):
+            return Plan("unconstrained", {"unconstrained": 1.0})
 
-        return prod(polys).coeff_monomial(x ** self._max_degree)
+        return super().plan()
 
-    def probability(self) -> Rational:
+    def factor_counts(self) -> List[int]:
+        """
+        For each factor (see factor_degrees), the number of the items it
+        stands for in the collection.
+        """
+        return [self._counts[item] for item in self._domains]
+
+    def count(self, engine: Optional[str] = None) -> int:
+        """
+        Count number of draws that meet constraints.
+
+        The engine used is chosen by the planner, unless specified.
+        """
+        if engine is None:
+            engine = self.plan().engine
+
+        return count_draw_factors(
+            self.factor_degrees(), self.factor_counts(), self._max_degree, engine
+        )
+
+    def probability(self, engine: Optional[str] = None) -> Rational:
         """
         Probability of drawing from the collection such that the
         constraints are met.
+
+        The engine used is chosen by the planner, unless specified.
+        """
+        if engine is None:
+            engine = self.plan().engine
+
+        return probability_draw_factors(
+            self.factor_degrees(), self.factor_counts(), self._max_degree, self.replace, engine
+        )
+
+    def approximate_probability(self) -> Approximation:
+        """
+        Approximate probability of drawing from the collection such that
+        the constraints are met, with an estimate of its error (see
+        saddlepoint_probability). The cost does not depend on the size.
+
+        Limiting the degrees to the size does not change the probability,
+        but it skews the distribution of each item's count, which the
+        approximation assumes is nearly normal. So degrees that reach the
+        size are extended to the most of the item that could be drawn
+        (without limit, with replacement).
         """
+        factors = []
+
+        for item, degrees in zip(self._domains, self._clipped_degrees()):
+            count = self._counts[item]
+
+            if isinstance(degrees, range) and degrees and degrees[-1] == self._max_degree:
+                upper = sys.maxsize if self.replace else max(count, self._max_degree) + 1
+                degrees = range(degrees.start, upper, degrees.step)
+
+            factors.append((degrees, count))
 
-        if not self.replace:
-            return self.count() / binomial(self.total_items_in_collection(), self._max_degree)
+        return saddlepoint_probability(factors, self._max_degree, self.replace)
 
-        polys = []
+    def constrained_product(self, counts: Dict[str, int]) -> List[int]:
+        """
+        For each total d up to the size, the ways of drawing d items
+        from the constrained items only, given their counts. With
+        replacement these are sequences, each weighted by the number
+        of ways of drawing its individual objects.
+
+        This uses only the degrees the constraints imposed, so it can
+        be reused for any collection with the same constrained counts.
+        """
+        degree_sets = [
+            clip_degrees(degrees, self._limit(counts[item]))
+            for item, degrees in self._imposed.items()
+        ]
+
+        if self.replace:
+            bases = [counts[item] for item in self._imposed]
+            return multinomial_product(degree_sets, self.size, bases)
+
+        factors = [
+            degrees_to_list_with_binomial_coeff(degrees, counts[item], self.size)
+            for item, degrees in zip(self._imposed, degree_sets)
+        ]
+        return truncated_product(factors, self.size)
+
+    def distribution(self, item: str) -> List[Rational]:
+        """
+        Probability that exactly j of the item are drawn and the
+        constraints are met, for j from 0 up to the most of the item
+        that can be drawn.
+
+        The product of the other items' factors is found once. Each
+        probability then combines one coefficient of that product with
+        the ways of drawing j of the item.
+        """
+        counts = dict(self._counts)
+        degrees = dict(zip(self._domains, self.factor_degrees()))
+
+        # an unconstrained item is taken back out of the pool
+        for key in self._domains:
+            if isinstance(key, frozenset) and item in key:
+                rest = counts.pop(key) - self._collection[item]
+                del degrees[key]
+                if rest:
+                    counts[key - {item}] = rest
+                    degrees[key - {item}] = range(self._limit(rest) + 1)
+                counts[item] = self._collection[item]
+                degrees[item] = range(self._limit(counts[item]) + 1)
+
+        limit = self._limit(counts[item])
+        others = [other for other in counts if other != item]
         total = self.total_items_in_collection()
 
-        for item, degrees in self._degrees.items():
+        if not self.is_feasible():
+            return [Rational(0)] * (limit + 1)
+
+        if self.replace:
+            bases = [counts[other] for other in others]
+            counts_of_others = multinomial_product(
+                [degrees[other] for other in others], self.size, bases
+            )
+            weights = [
+                coeff * counts[item] ** j for j, coeff in enumerate(binomial_row(self.size, limit))
+            ]
+            denominator = total ** self.size
+
+        else:
+            factors = [
+                degrees_to_list_with_binomial_coeff(degrees[other], counts[other], self.size)
+                for other in others
+            ]
+            counts_of_others = truncated_product(factors, self.size)
+            weights = binomial_row(counts[item], limit)
+            denominator = binomial(total, self.size)
+
+        return [
+            Rational(counts_of_others[self.size - j] * weights[j], denominator)
+            if j in degrees[item]
+            else Rational(0)
+            for j in range(limit + 1)
+        ]
+
+
+def count_draw_factors(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int, engine: str
+) -> int:
+    """
+    Count draws (without replacement) of the given size in which the
+    number drawn of each factor's items is one of its degrees, where the
+    collection holds counts[i] of the items of factor i. The named engine
+    is used.
+
+    Only the arguments are read, so this is safe to call from any thread.
+    """
+    return _COUNT_ENGINES[engine](factors, counts, size)
+
+
+def probability_draw_factors(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int, replace: bool, engine: str
+) -> Rational:
+    """
+    Probability that a draw of the given size (with or without
+    replacement) is counted by count_draw_factors.
+    """
+    if not replace:
+        return Rational(
+            count_draw_factors(factors, counts, size, engine), binomial(sum(counts), size)
+        )
+
+    return _PROBABILITY_ENGINES[engine](factors, counts, size)
+
+
+def _count_infeasible(factors: Sequence[Degrees], counts: Sequence[int], size: int) -> int:
+    return 0
+
+
+def _count_unconstrained(factors: Sequence[Degrees], counts: Sequence[int], size: int) -> int:
+    return binomial(sum(counts), size)
+
+
+def _count_packed(factors: Sequence[Degrees], counts: Sequence[int], size: int) -> int:
+    lists = [
+        degrees_to_list_with_binomial_coeff(degrees, count, size)
+        for degrees, count in zip(factors, counts)
+    ]
+    return truncated_product(lists, size)[size]
+
+
+def _count_sparse(factors: Sequence[Degrees], counts: Sequence[int], size: int) -> int:
+    """
+    As multiset._count_sparse: the factor with the most terms (often
+    the pooled items) is not expanded.
+    """
+    *others, (last, count) = sorted(zip(factors, counts), key=lambda factor: len(factor[0]))
+    others = [degrees_to_sparse_with_binomial_coeff(degrees, n, size) for degrees, n in others]
+
+    return sum(
+        coeff * binomial(count, size - degree)
+        for degree, coeff in zip(*sparse_product(others, size))
+        if size - degree in last
+    )
+
+
+def _count_polynomial(factors: Sequence[Degrees], counts: Sequence[int], size: int) -> int:
+    polys = []
+
+    for degrees, count in zip(factors, counts):
+
+        p = degrees_to_polynomial_with_binomial_coeff(degrees, count)
+        polys.append(p)
+
+    return multiply_polynomials(polys).coeff_monomial(x ** size)
+
+
+def _probability_infeasible(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int
+) -> Rational:
+    return Rational(0)
+
+
+def _probability_unconstrained(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int
+) -> Rational:
+    return Rational(1)
+
+
+def _probability_multinomial(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int
+) -> Rational:
+    """
+    Each sequence of draws with item counts d_1, d_2, ... is weighted
+    by n_1**d_1 * n_2**d_2 * ..., the number of ways of drawing the
+    individual objects, out of total**size possible sequences.
+    """
+    weighted = multinomial_product(factors, size, counts)
+    return Rational(weighted[size], sum(counts) ** size)
+
+
+def _probability_polynomial(
+    factors: Sequence[Degrees], counts: Sequence[int], size: int
+) -> Rational:
+    polys = []
+    total = sum(counts)
+
+    for degrees, count in zip(factors, counts):
+
+        p = degrees_to_polynomial_with_fractional_coeff(degrees, count, total)
+        polys.append(p)
+
+    product = multiply_polynomials(polys)
+    return product.coeff_monomial(x ** size) * factorial(size)
+
 
-            p = degrees_to_polynomial_with_fractional_coeff(degrees, self._collection[item], total)
-            polys.append(p)
+_COUNT_ENGINES: Dict[str, Callable[[Sequence[Degrees], Sequence[int], int], int]] = {
+    "infeasible": _count_infeasible,
+    "unconstrained": _count_unconstrained,
+    "packed": _count_packed,
+    "polynomial": _count_polynomial,
+    "sparse": _count_sparse,
+}
 
-        return prod(polys).coeff_monomial(x ** self._max_degree) * factorial(self._max_degree)
+# Engines for draws with replacement (without, the count is divided by the total)
+_PROBABILITY_ENGINES: Dict[str, Callable[[Sequence[Degrees], Sequence[int], int], Rational]] = {
+    "infeasible": _probability_infeasible,
+    "unconstrained": _probability_unconstrained,
+    "multinomial": _probability_multinomial,
+    "polynomial": _probability_polynomial,
+}
@@ -6,5 +6,13 @@ class ConstraintNotImplementedError(Exception):
     pass
 
 
-class CollectionError(Exception):
+class CollectionError(ValueError):
+    pass
+
+
+class EvaluationCancelled(Exception):
+    pass
+
+
+class CheckpointError(Exception):
     pass
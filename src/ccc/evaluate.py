@@ -0,0 +1,579 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, product, repeat
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sympy import Rational
+
+from ccc.approx import Approximation
+from ccc.draw import Draw
+from ccc.errors import ConstraintNotImplementedError
+from ccc.multiset import Multiset
+from ccc.permutation import PermutationCounter
+from ccc.sequence import Sequence as SequenceTracker
+from ccc.staged import StagedDraw
+from ccc.tables import binomial, binomial_row
+from ccc.util.constraints import constraint_to_string
+
+# Constraints as returned by process_constraint_string: a list of
+# disjuncts, each of which is a list of conjoined constraint tuples.
+Disjuncts = List[List[Tuple]]
+
+# An inclusion-exclusion term: its coefficient, the merged constraints, and
+# the tracker (or permutation counter) that evaluates them.
+Term = Tuple[int, List[Tuple], Any]
+
+# A conjunction of disjuncts, given by their (increasing) indices
+Indices = Tuple[int, ...]
+
+
+class Decision(NamedTuple):
+    """
+    Whether a probability is at least a threshold, with the bounds on the
+    probability that showed it.
+    """
+
+    above: bool
+    lower: Rational
+    upper: Rational
+
+
+def conjunctions(constraints: Disjuncts, build: Callable[[List[Tuple]], Any]) -> Iterator[Term]:
+    """
+    Generate the terms to evaluate, using build to make the tracker for
+    each conjunction. Without 'or' there is a single term.
+
+    Conjunctions that normalise to the same tracker (at any level of the
+    lattice, see conjunction_levels) are evaluated once, with their
+    coefficients summed.
+    """
+    if len(constraints) == 1:
+        yield 1, constraints[0], build(constraints[0])
+        return
+
+    terms: Dict[Hashable, List] = {}
+
+    for level in conjunction_levels(constraints, build):
+        for key, (coefficient, subset, tracker) in level.items():
+            if key in terms:
+                terms[key][0] += coefficient
+            else:
+                terms[key] = [coefficient, subset, tracker]
+
+    for coefficient, subset, tracker in terms.values():
+        if coefficient:
+            yield coefficient, subset, tracker
+
+
+def conjunction_levels(
+    constraints: Disjuncts, build: Callable[[List[Tuple]], Any]
+) -> Iterator[Dict[Hashable, Term]]:
+    """
+    Walk the lattice of conjunctions one level at a time (each disjunct,
+    then each pair, and so on), generating the terms of each level keyed
+    by the signatures of their trackers. Each coefficient is the level's
+    sign times the number of its conjunctions that normalise to the tracker.
+
+    A conjunction that cannot be met counts zero, and so does every
+    conjunction containing it: those are never built. The next level is
+    only built when it is asked for.
+    """
+    level: List[Indices] = [(i,) for i in range(len(constraints))]
+    sign = 1
+
+    while level:
+        feasible = []
+        terms: Dict[Hashable, List] = {}
+
+        for indices in level:
+            subset = list(chain.from_iterable(constraints[i] for i in indices))
+            tracker = build(subset)
+
+            if not tracker.is_feasible():
+                continue
+
+            feasible.append(indices)
+            key = tracker.signature()
+
+            if key in terms:
+                terms[key][0] += sign
+            else:
+                terms[key] = [sign, subset, tracker]
+
+        yield {key: tuple(term) for key, term in terms.items()}
+
+        level = _next_level(feasible)
+        sign = -sign
+
+
+def _next_level(level: List[Indices]) -> List[Indices]:
+    """
+    Join conjunctions of n disjuncts that differ only in their last
+    disjunct, keeping those for which every conjunction of n of the
+    disjuncts is in the level (level and result are in lexicographic order).
+    """
+    members = set(level)
+    joined = []
+
+    for i, first in enumerate(level):
+        for second in level[i + 1 :]:
+
+            if first[:-1] != second[:-1]:
+                break
+
+            candidate = first + second[-1:]
+
+            if all(candidate[:j] + candidate[j + 1 :] in members for j in range(len(first) - 1)):
+                joined.append(candidate)
+
+    return joined
+
+
+def multiset_terms(
+    size: int, collection: Optional[Dict[str, int]] = None, constraints: Optional[Disjuncts] = None
+) -> Iterator[Term]:
+
+    if constraints is None:
+        yield 1, [], Multiset(size, collection)
+        return
+
+    if len(constraints) > 1 and collection is None:
+        raise ConstraintNotImplementedError(
+            "Must specify a collection if using 'or' in constraints"
+        )
+
+    yield from conjunctions(constraints, lambda subset: Multiset(size, collection, subset))
+
+
+def draw_terms(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Optional[Disjuncts] = None,
+    replace: bool = False,
+) -> Iterator[Term]:
+
+    if constraints is None:
+        # matches 'ccc count draws' without constraints, which counts the distinct draws
+        yield 1, [], Multiset(size, collection)
+        return
+
+    yield from conjunctions(
+        constraints, lambda subset: Draw(size, collection, subset, replace=replace)
+    )
+
+
+def staged_draw_terms(
+    collection: Dict[str, int], stages: Sequence[Tuple[int, Optional[Disjuncts]]]
+) -> Iterator[Term]:
+    """
+    The constraints of each stage are expanded into conjunctions on their
+    own, and there is a term for each way of choosing one conjunction
+    from every stage (with the product of their coefficients).
+    Combinations that normalise to the same tracker are evaluated once.
+    """
+
+    def stage_conjunctions(size: int, constraints: Optional[Disjuncts]) -> List[Tuple]:
+        terms = conjunctions(constraints or [[]], lambda subset: Draw(size, collection, subset))
+        return [(coefficient, subset) for coefficient, subset, _ in terms]
+
+    sizes = [size for size, _ in stages]
+    terms: Dict[Hashable, List] = {}
+
+    for combination in product(*(stage_conjunctions(*stage) for stage in stages)):
+        coefficient = 1
+        for c, _ in combination:
+            coefficient *= c
+
+        subsets = [subset for _, subset in combination]
+        tracker = StagedDraw(collection, list(zip(sizes, subsets)))
+
+        if not tracker.is_feasible():
+            continue
+
+        key = tracker.signature()
+
+        if key in terms:
+            terms[key][0] += coefficient
+        else:
+            terms[key] = [coefficient, list(chain.from_iterable(subsets)), tracker]
+
+    for coefficient, subset, tracker in terms.values():
+        if coefficient:
+            yield coefficient, subset, tracker
+
+
+def sequence_terms(
+    size: int, collection: Optional[Dict[str, int]], constraints: Disjuncts
+) -> Iterator[Term]:
+
+    if len(constraints) > 1 and collection is None:
+        raise ConstraintNotImplementedError(
+            "Must specify a collection if using 'or' in constraints"
+        )
+
+    yield from conjunctions(constraints, lambda subset: SequenceTracker(size, collection, subset))
+
+
+def permutation_terms(
+    sequence: Sequence[Hashable],
+    constraints: Optional[Disjuncts] = None,
+    same_distinct: bool = False,
+) -> Iterator[Term]:
+
+    if constraints is None:
+        yield 1, [], PermutationCounter(sequence, None, same_distinct)
+        return
+
+    yield from conjunctions(
+        constraints, lambda subset: PermutationCounter(sequence, subset, same_distinct)
+    )
+
+
+def bonferroni_bounds(
+    levels: Iterable[Dict[Hashable, Term]], threshold: Any
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Generate ever tighter lower and upper bounds on a probability given
+    the inclusion-exclusion terms at each level of the lattice, stopping
+    once the bounds show whether the probability is at least the threshold.
+
+    By the Bonferroni inequalities, the sum of the terms up to an odd
+    level is an upper bound, and the sum up to an even level is a lower
+    bound. No single conjunction of the first level is more likely than
+    the probability, which gives a lower bound after the first level.
+    The bounds meet once every level is summed.
+    """
+    lower, upper = Rational(0), Rational(1)
+    answer = 0
+
+    for n, level in enumerate(levels, 1):
+        values = [
+            (coefficient, tracker.probability()) for coefficient, _, tracker in level.values()
+        ]
+        answer += sum(coefficient * value for coefficient, value in values)
+
+        if n == 1:
+            lower = max([lower] + [value for _, value in values])
+
+        if n % 2:
+            upper = min(upper, answer)
+        else:
+            lower = max(lower, answer)
+
+        yield lower, upper
+
+        if lower >= threshold or upper < threshold:
+            return
+
+    # every level is summed, so the answer is exact
+    yield answer, answer
+
+
+def _decide(levels: Iterable[Dict[Hashable, Term]], threshold: Any) -> Decision:
+    lower, upper = Rational(0), Rational(1)
+
+    for lower, upper in bonferroni_bounds(levels, threshold):
+        pass
+
+    return Decision(lower >= threshold, lower, upper)
+
+
+def inclusion_exclusion(terms: Iterable[Term], method: str = "count", jobs: int = 1):
+    """
+    Sum the signed values of each term, found by calling the named method
+    of each tracker.
+
+    With more than one job, the trackers are evaluated in that many worker
+    processes. The values are still summed in the order of the terms (and
+    exactly), so the answer does not depend on which worker finishes first.
+    """
+    terms = list(terms)
+    trackers = [tracker for _, _, tracker in terms]
+
+    if jobs > 1 and len(terms) > 1:
+        chunksize = max(1, len(terms) // (4 * jobs))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            values = list(executor.map(_evaluate, trackers, repeat(method), chunksize=chunksize))
+    else:
+        values = [_evaluate(tracker, method) for tracker in trackers]
+
+    answer = 0
+
+    for (coefficient, _, _), value in zip(terms, values):
+        answer += coefficient * value
+
+    return answer
+
+
+def _evaluate(tracker: Any, method: str):
+    return getattr(tracker, method)()
+
+
+def explain(terms: Iterable[Term]) -> str:
+    """
+    Describe the engine the planner chooses for each term, along with
+    the estimated costs.
+    """
+    lines = []
+
+    for coefficient, subset, tracker in terms:
+        sign = "+" if coefficient > 0 else "-"
+        if abs(coefficient) > 1:
+            sign += str(abs(coefficient))
+        constraints = ", ".join(constraint_to_string(c) for c in subset) or "(no constraints)"
+        lines.append(f"{sign} {constraints}: {tracker.plan()}")
+
+    header = f"{len(lines)} term{'s' if len(lines) > 1 else ''} to evaluate"
+    return "\n".join([header] + lines)
+
+
+def count_multisets(
+    size: int,
+    collection: Optional[Dict[str, int]] = None,
+    constraints: Optional[Disjuncts] = None,
+    jobs: int = 1,
+) -> int:
+    """
+    Count multisets of the given size that meet zero or more constraints.
+    """
+    return inclusion_exclusion(multiset_terms(size, collection, constraints), jobs=jobs)
+
+
+def count_draws(
+    size: int, collection: Dict[str, int], constraints: Optional[Disjuncts] = None, jobs: int = 1
+) -> int:
+    """
+    Count draws (without replacement) of the given size from a
+    collection which meet zero or more constraints.
+    """
+    return inclusion_exclusion(draw_terms(size, collection, constraints), jobs=jobs)
+
+
+def count_sequences(
+    size: int, collection: Optional[Dict[str, int]], constraints: Disjuncts, jobs: int = 1
+) -> int:
+    """
+    Count sequences of the given size that meet the constraints.
+    """
+    return inclusion_exclusion(sequence_terms(size, collection, constraints), jobs=jobs)
+
+
+def count_permutations(
+    sequence: Sequence[Hashable],
+    constraints: Optional[Disjuncts] = None,
+    same_distinct: bool = False,
+    jobs: int = 1,
+) -> int:
+    """
+    Count permutations of the sequence that meet zero or more constraints.
+    """
+    terms = permutation_terms(sequence, constraints, same_distinct)
+    return inclusion_exclusion(terms, jobs=jobs)
+
+
+def probability_draw(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Disjuncts,
+    replace: bool = False,
+    jobs: int = 1,
+) -> Rational:
+    """
+    Probability of drawing a collection of the given size such that
+    the constraints are met.
+    """
+    terms = draw_terms(size, collection, constraints, replace)
+    return inclusion_exclusion(terms, "probability", jobs)
+
+
+def probability_staged_draw(
+    collection: Dict[str, int],
+    stages: Sequence[Tuple[int, Optional[Disjuncts]]],
+    jobs: int = 1,
+) -> Rational:
+    """
+    Probability that drawing from the collection in stages of the given
+    sizes (without replacement) meets the constraints of every stage.
+    """
+    return inclusion_exclusion(staged_draw_terms(collection, stages), "probability", jobs)
+
+
+def threshold_probability_draw(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Disjuncts,
+    threshold: Any,
+    replace: bool = False,
+) -> Decision:
+    """
+    Whether the probability of drawing a collection of the given size
+    such that the constraints are met is at least the threshold. Only
+    as many levels of inclusion-exclusion terms are evaluated as are
+    needed to decide.
+    """
+    levels = conjunction_levels(
+        constraints or [[]], lambda subset: Draw(size, collection, subset, replace=replace)
+    )
+    return _decide(levels, threshold)
+
+
+def distribution_draw(
+    size: int,
+    collection: Dict[str, int],
+    item: str,
+    constraints: Optional[Disjuncts] = None,
+    replace: bool = False,
+) -> List[Rational]:
+    """
+    Probability that exactly j of the item are drawn and the constraints
+    are met, for each j from 0 up to the most of the item that can be drawn.
+    """
+    if item not in collection:
+        raise ValueError(f"The following items are not in the collection: {item}")
+
+    limit = size if replace else min(size, collection[item])
+    distribution = [Rational(0)] * (limit + 1)
+
+    for coefficient, _, tracker in draw_terms(size, collection, constraints or [[]], replace):
+        for j, probability in enumerate(tracker.distribution(item)):
+            distribution[j] += coefficient * probability
+
+    return distribution
+
+
+def approximate_probability_draw(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Optional[Disjuncts] = None,
+    replace: bool = False,
+) -> Approximation:
+    """
+    Approximate probability of drawing a collection of the given size
+    such that the constraints are met. The error estimates of the terms
+    are added (ignoring their signs).
+    """
+    value, error = 0.0, 0.0
+
+    for coefficient, _, tracker in draw_terms(size, collection, constraints or [[]], replace):
+        approximation = tracker.approximate_probability()
+        value += coefficient * approximation.value
+        error += abs(coefficient) * approximation.error
+
+    return Approximation(value, error)
+
+
+def probability_draws(
+    size: int,
+    items: Sequence[str],
+    rows: Iterable[Sequence[int]],
+    constraints: Optional[Disjuncts] = None,
+    replace: bool = False,
+) -> List[Rational]:
+    """
+    Probability of meeting the constraints when drawing from each of many
+    collections of the same items: each row gives the count of every item
+    (in the order of items) in one collection.
+
+    The terms are found once, for a collection holding the most of each
+    item in any row. A conjunction that cannot be met with those counts
+    cannot be met with fewer, and conjunctions with the same degrees keep
+    them with fewer, so the same terms serve every row.
+
+    In each term the unconstrained items act as one item (see Draw), so a
+    row's probability only needs the product of the constrained items'
+    factors, which is found once for each distinct set of their counts,
+    and one coefficient of the pooled items' factor for each degree.
+    """
+    rows = [tuple(row) for row in rows]
+
+    if any(len(row) != len(items) for row in rows):
+        raise ValueError(f"Every row must give a count for each of the {len(items)} items")
+
+    if any(count < 0 for row in rows for count in row):
+        raise ValueError("Item counts cannot be negative")
+
+    if not rows:
+        return []
+
+    ceiling = {item: max(row[i] for row in rows) for i, item in enumerate(items)}
+    terms = [
+        (coefficient, tracker, {})
+        for coefficient, _, tracker in draw_terms(size, ceiling, constraints or [[]], replace)
+    ]
+    answers = []
+
+    for row in rows:
+        collection = dict(zip(items, row))
+        total = sum(row)
+        answer = 0
+
+        for coefficient, tracker, products in terms:
+            key = tuple(collection[item] for item in tracker.constrained_items())
+
+            if key not in products:
+                products[key] = tracker.constrained_product(collection)
+
+            pooled = total - sum(key)
+            answer += coefficient * _combine_with_pool(products[key], pooled, size, replace)
+
+        if replace:
+            answers.append(Rational(answer, total ** size))
+        else:
+            answers.append(Rational(answer, binomial(total, size)))
+
+    return answers
+
+
+def _combine_with_pool(product: List[int], pooled: int, size: int, replace: bool) -> int:
+    """
+    Extend the ways of drawing d constrained items to draws of the whole
+    size by drawing the rest from the pooled items.
+    """
+    if replace:
+        ways = [binomial(size, d) * pooled ** (size - d) for d in range(size + 1)]
+    else:
+        ways = binomial_row(pooled, size)[::-1]
+
+    return sum(p * w for p, w in zip(product, ways))
+
+
+def probability_permutation(
+    sequence: Sequence[Hashable],
+    constraints: Disjuncts,
+    same_distinct: bool = False,
+    jobs: int = 1,
+) -> Rational:
+    """
+    Probability that a random permutation of the sequence meets
+    the constraints.
+    """
+    terms = permutation_terms(sequence, constraints, same_distinct)
+    return inclusion_exclusion(terms, "probability", jobs)
+
+
+def threshold_probability_permutation(
+    sequence: Sequence[Hashable],
+    constraints: Disjuncts,
+    threshold: Any,
+    same_distinct: bool = False,
+) -> Decision:
+    """
+    Whether the probability that a random permutation of the sequence
+    meets the constraints is at least the threshold (see
+    threshold_probability_draw).
+    """
+    levels = conjunction_levels(
+        constraints, lambda subset: PermutationCounter(sequence, subset, same_distinct)
+    )
+    return _decide(levels, threshold)
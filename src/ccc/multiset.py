@@ -1,10 +1,23 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
-from sympy import prod
 from sympy.abc import x
 
-from ccc.polynomial import degrees_to_polynomial
+from ccc.closedform import count_interval_multisets
+from ccc.polynomial import (
+    degrees_to_fraction,
+    degrees_to_list,
+    degrees_to_polynomial,
+    degrees_to_sparse,
+    multiply_polynomials,
+)
 from ccc.polynomialtracker import PolynomialTracker
+from ccc.series import (
+    multiply_signed,
+    rational_coefficient,
+    sparse_product,
+    truncated_product,
+)
+from ccc.util.degrees import Degrees, interval_bounds, lowest_degree
 
 
 class Multiset(PolynomialTracker):
@@ -25,9 +38,96 @@ class Multiset(PolynomialTracker):
 
         super().__init__(size, collection, constraints)
 
-    def count(self) -> int:
+    def engines(self) -> Tuple[str, ...]:
+        return ("closed_form", "packed", "polynomial", "recurrence", "sparse")
+
+    def count(self, engine: Optional[str] = None) -> int:
         """
         Count number of possible multisets that meet constraints.
+
+        The engine used is chosen by the planner, unless specified.
         """
-        poly = prod(degrees_to_polynomial(degrees) for degrees in self._degrees.values())
-        return poly.coeff_monomial(x ** self._max_degree)
+        if engine is None:
+            engine = self.plan().engine
+
+        return count_multiset_factors(self.factor_degrees(), self._max_degree, engine)
+
+
+def count_multiset_factors(factors: Sequence[Degrees], size: int, engine: str) -> int:
+    """
+    Count multisets of the given size in which the count of each item is
+    one of the degrees of its factor, using the named engine.
+
+    Only the arguments are read, so this is safe to call from any thread.
+    """
+    return _ENGINES[engine](factors, size)
+
+
+def _count_infeasible(factors: Sequence[Degrees], size: int) -> int:
+    return 0
+
+
+def _count_closed_form(factors: Sequence[Degrees], size: int) -> int:
+    """
+    If every item is constrained to an interval of counts, a closed-form
+    sum of binomials is used instead of multiplying polynomials.
+    """
+    bounds = [interval_bounds(degrees) for degrees in factors]
+    return count_interval_multisets(bounds, size)
+
+
+def _count_packed(factors: Sequence[Degrees], size: int) -> int:
+    lists = [degrees_to_list(degrees, size) for degrees in factors]
+    return truncated_product(lists, size)[size]
+
+
+def _count_sparse(factors: Sequence[Degrees], size: int) -> int:
+    """
+    The factors are multiplied as sparse polynomials where that is
+    cheaper, except the one with the most terms: only its coefficients
+    that complete each term of the product to the size are needed.
+    """
+    *others, last = sorted(factors, key=len)
+    others = [degrees_to_sparse(degrees, size) for degrees in others]
+
+    return sum(
+        coeff for degree, coeff in zip(*sparse_product(others, size)) if size - degree in last
+    )
+
+
+def _count_recurrence(factors: Sequence[Degrees], size: int) -> int:
+    """
+    The product of the items' polynomials is a rational function whose
+    denominator is a product of terms 1 - x**s, one for each item
+    constrained to a range with step s. Its coefficient is found
+    without expanding the product up to the size.
+    """
+    if not all(factors):
+        return 0
+
+    numerator, denominator = [1], [1]
+    lowest = sum(lowest_degree(degrees) for degrees in factors)
+
+    for degrees in factors:
+        # degrees above this can never be part of a multiset of the given size
+        reach = size - (lowest - lowest_degree(degrees))
+        top, bottom = degrees_to_fraction(degrees, reach)
+        numerator = multiply_signed(numerator, top)
+        denominator = multiply_signed(denominator, bottom)
+
+    return rational_coefficient(numerator, denominator, size)
+
+
+def _count_polynomial(factors: Sequence[Degrees], size: int) -> int:
+    poly = multiply_polynomials(degrees_to_polynomial(degrees) for degrees in factors)
+    return poly.coeff_monomial(x ** size)
+
+
+_ENGINES: Dict[str, Callable[[Sequence[Degrees], int], int]] = {
+    "infeasible": _count_infeasible,
+    "closed_form": _count_closed_form,
+    "packed": _count_packed,
+    "polynomial": _count_polynomial,
+    "recurrence": _count_recurrence,
+    "sparse": _count_sparse,
+}
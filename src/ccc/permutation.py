@@ -1,79 +1,65 @@
-from collections import Counter
-from typing import Dict, Sequence, List, Tuple, Hashable, Optional
+from collections import Counter, defaultdict
+from itertools import groupby
+from typing import Callable, Dict, Sequence, List, Tuple, Hashable, Mapping, Optional, Union
 
-from sympy import laguerre, assoc_laguerre, prod, factorial, Rational, Poly
-from sympy.abc import x
+from sympy import prod, Rational
 
 from ccc.errors import ConstraintNotImplementedError
+from ccc.planner import Plan, plan_permutation
+from ccc.series import multiply_signed
+from ccc.tables import binomial_row, factorial
+from ccc.util.cancellation import check_cancelled
+
+# Named constraints that can be imposed on permutations
+PERMUTATION_CONSTRAINTS = ("derangement", "no_adjacent")
+
+# The parameter alpha of the Laguerre polynomials used for each constraint
+LAGUERRE_ALPHA = {"derangement": 0, "no_adjacent": -1}
+
+# A sequence as its runs of (item, number of consecutive instances)
+Runs = Sequence[Tuple[Hashable, int]]
 
 
 class PermutationCounter:
     """
     Count constrained permutations of a sequence.
 
+    The sequence may instead be given as a mapping of each item to its
+    frequency, which is the sequence with all instances of each item
+    together (in the order of the mapping).
+
     """
 
     def __init__(
         self,
-        sequence: Sequence[Hashable],
+        sequence: Union[Sequence[Hashable], Mapping[Hashable, int]],
         constraints: Optional[List[Tuple]] = None,
         same_distinct: bool = False,
     ) -> None:
 
-        self.sequence: Sequence[Hashable] = sequence
-        self.length: int = len(sequence)
         self.frequencies: Counter = Counter(sequence)
+        self.length: int = sum(self.frequencies.values())
+
+        # the original order, as (item, number of consecutive instances)
+        if isinstance(sequence, Mapping):
+            self.runs: List[Tuple[Hashable, int]] = list(self.frequencies.items())
+        else:
+            self.runs = [(item, len(list(run))) for item, run in groupby(sequence)]
 
         self.constraints: List[Tuple] = constraints
-        self.polynomials: Dict[Hashable, Poly] = {}
 
         self.same_distinct: bool = same_distinct
-        self._correction_factor: int = 1
+        self.constraint_names: List[str] = []
 
         if not constraints:
             return
 
-        if len(constraints) == 1:
-            op, *args = constraints[0]
-            getattr(self, "impose_constraint_" + op)(*args)
+        for op, *_ in constraints:
+            if op not in PERMUTATION_CONSTRAINTS:
+                raise ConstraintNotImplementedError(f"Constraint '{op}' is not implemented")
 
-        else:
-            raise ConstraintNotImplementedError(
-                "Imposing multiple constraints is not supported for permuations"
-            )
-
-    def impose_constraint_derangement(self) -> None:
-        """
-        Permutation has no items in their original position.
-
-        Uses the Laguerre polynomial approach detailed in
-        "Derangements and Laguerre polynomials", S. Even & J. Gillis,
-        Mathematical Proceedings of the Cambridge Philosophical Society,
-        Volume 79, Issue 1 January 1976 , pp. 135-143.
-
-        """
-        for item, count in self.frequencies.items():
-            self.polynomials[item] = laguerre(count, x)
-
-        if self.same_distinct:
-            self._correction_factor = prod(factorial(freq) for freq in self.frequencies.values())
-
-    def impose_constraint_no_adjacent(self) -> None:
-        """
-        Permutation has no consecutive items equal to each other.
-
-        Uses the generalised Laguerre polynomial approach detailed in
-        "Counting words with Laguerre series", J. Taylor, The Electronic
-        Journal of Combinatorics (E-JC), Volume 21, Issue 2 (2014).
-
-        (https://www.combinatorics.org/ojs/index.php/eljc/article/view/v21i2p1)
-
-        """
-        for item, count in self.frequencies.items():
-            self.polynomials[item] = assoc_laguerre(count, -1, x)
-
-        if self.same_distinct:
-            self._correction_factor = prod(factorial(freq) for freq in self.frequencies.values())
+        # the same constraint given twice is the same as giving it once
+        self.constraint_names = sorted({op for op, *_ in constraints})
 
     def count_unconstrained_permutations(self) -> int:
         """
@@ -90,33 +76,257 @@ class PermutationCounter:
             len(sequence)!
 
         """
-        if self.same_distinct:
-            return factorial(self.length)
-
-        return factorial(self.length) / prod(factorial(freq) for freq in self.frequencies.values())
+        return _count_unconstrained(list(self.frequencies.values()), self.same_distinct)
 
-    def probability(self) -> Rational:
+    def probability(self, engine: Optional[str] = None) -> Rational:
         """
         Probability that a permutation of the sequence meets the
         specified constraints.
         """
-        return self.count() / self.count_unconstrained_permutations()
+        return Rational(self.count(engine), self.count_unconstrained_permutations())
+
+    def is_feasible(self) -> bool:
+        """
+        Whether any permutation could meet the constraints.
 
-    def count(self) -> int:
+        An item in more than half of the positions cannot be deranged, and
+        an item in more than half of the positions (rounding up) cannot
+        avoid being adjacent to itself.
+        """
+        most = max(self.frequencies.values(), default=0)
+
+        if "derangement" in self.constraint_names and 2 * most > self.length:
+            return False
+
+        if "no_adjacent" in self.constraint_names and 2 * most - 1 > self.length:
+            return False
+
+        return True
+
+    def signature(self) -> Tuple[str, ...]:
+        """
+        Permutations of the same sequence are counted the same way
+        whenever the same named constraints are imposed.
+        """
+        return tuple(self.constraint_names)
+
+    def plan(self) -> Plan:
+        """
+        Choose the cheapest engine to count the permutations.
+        """
+        if not self.is_feasible():
+            return Plan("infeasible", {"infeasible": 0.0})
+
+        return plan_permutation(list(self.frequencies.values()), len(self.constraint_names))
+
+    def count(self, engine: Optional[str] = None) -> int:
         """
         Number of permutations of the sequence that meets the
         specified constraints.
+
+        The engine used is chosen by the planner, unless specified.
         """
-        if not self.constraints:
-            return self.count_unconstrained_permutations()
+        if self.constraint_names and engine is None:
+            engine = self.plan().engine
 
-        terms = prod(self.polynomials.values()).apart().as_ordered_terms()
-        return abs(sum(eval_gamma(t) for t in terms)) * self._correction_factor
+        return count_permutation_runs(self.runs, self.constraint_names, self.same_distinct, engine)
 
 
-def eval_gamma(term):
+def count_permutation_runs(
+    runs: Runs,
+    constraint_names: Sequence[str],
+    same_distinct: bool,
+    engine: Optional[str],
+) -> int:
     """
-    Evaluate the term k*x**n as k*n!
+    Number of permutations of the sequence given by its runs of (item,
+    number of consecutive instances) that meet the named constraints,
+    using the named engine (which is not needed if there are none).
+
+    Only the arguments are read, so this is safe to call from any thread.
     """
-    coeff, exp = term.as_coeff_exponent(x)
-    return coeff * factorial(exp)
+    frequencies: Counter = Counter()
+
+    for item, length in runs:
+        frequencies[item] += length
+
+    if not constraint_names:
+        return _count_unconstrained(list(frequencies.values()), same_distinct)
+
+    return _ENGINES[engine](runs, frequencies, constraint_names, same_distinct)
+
+
+def probability_permutation_runs(
+    runs: Runs,
+    constraint_names: Sequence[str],
+    same_distinct: bool,
+    engine: Optional[str],
+) -> Rational:
+    """
+    Probability that a permutation of the sequence is counted by
+    count_permutation_runs.
+    """
+    count = count_permutation_runs(runs, constraint_names, same_distinct, engine)
+    return Rational(count, count_permutation_runs(runs, (), same_distinct, None))
+
+
+def _count_unconstrained(frequencies: List[int], same_distinct: bool) -> int:
+    if same_distinct:
+        return factorial(sum(frequencies))
+
+    return factorial(sum(frequencies)) // prod(factorial(freq) for freq in frequencies)
+
+
+def _count_infeasible(
+    runs: Runs,
+    frequencies: Counter,
+    constraint_names: Sequence[str],
+    same_distinct: bool,
+) -> int:
+    return 0
+
+
+def _count_laguerre(
+    runs: Runs,
+    frequencies: Counter,
+    constraint_names: Sequence[str],
+    same_distinct: bool,
+) -> int:
+    """
+    Derangements (no item in its original position) use the Laguerre
+    polynomial approach detailed in "Derangements and Laguerre
+    polynomials", S. Even & J. Gillis, Mathematical Proceedings of the
+    Cambridge Philosophical Society, Volume 79, Issue 1 January 1976,
+    pp. 135-143.
+
+    Permutations with no consecutive items equal to each other use the
+    generalised Laguerre polynomial approach detailed in "Counting words
+    with Laguerre series", J. Taylor, The Electronic Journal of
+    Combinatorics (E-JC), Volume 21, Issue 2 (2014).
+
+    (https://www.combinatorics.org/ojs/index.php/eljc/article/view/v21i2p1)
+
+    """
+    if len(constraint_names) > 1:
+        raise ConstraintNotImplementedError(
+            "Laguerre polynomials can only be used for a single constraint"
+        )
+
+    alpha = LAGUERRE_ALPHA[constraint_names[0]]
+    count = abs(laguerre_integral(list(frequencies.values()), alpha))
+
+    if same_distinct:
+        count *= prod(factorial(freq) for freq in frequencies.values())
+
+    return count
+
+
+def _count_transfer_matrix(
+    runs: Runs,
+    frequencies: Counter,
+    constraint_names: Sequence[str],
+    same_distinct: bool,
+) -> int:
+    items = list(frequencies)
+    index = {item: i for i, item in enumerate(items)}
+
+    count = count_arrangements(
+        [frequencies[item] for item in items],
+        [(index[item], length) for item, length in runs],
+        derangement="derangement" in constraint_names,
+        no_adjacent="no_adjacent" in constraint_names,
+    )
+
+    if same_distinct:
+        count *= prod(factorial(freq) for freq in frequencies.values())
+
+    return count
+
+
+def count_arrangements(
+    frequencies: List[int], runs: List[Tuple[int, int]], derangement: bool, no_adjacent: bool
+) -> int:
+    """
+    Count arrangements of items with the given frequencies, filling one
+    position at a time (a transfer-matrix method).
+
+    Items are numbered by their index in frequencies. The original order
+    is given by runs of (item, length), e.g. [(0, 2), (1, 1), (0, 1)] for
+    the sequence 0, 0, 1, 0. Derangements never place an item in its
+    original position. If no_adjacent is set, no item is placed next to
+    itself.
+
+    The state after each position is the count of each item left to
+    place and (if needed) the last item placed. For a fixed number of
+    distinct items, the number of states is polynomial in the length.
+    """
+    states: Dict[Tuple[Tuple[int, ...], int], int] = {(tuple(frequencies), -1): 1}
+    # the item originally held by each position, in turn
+    originals = (item for item, length in runs for _ in range(length))
+
+    for original in originals:
+        check_cancelled()
+        excluded = original if derangement else -1
+        next_states: Dict[Tuple[Tuple[int, ...], int], int] = defaultdict(int)
+
+        for (remaining, last), ways in states.items():
+            for item, left in enumerate(remaining):
+
+                if not left or item == excluded or item == last:
+                    continue
+
+                placed = remaining[:item] + (left - 1,) + remaining[item + 1 :]
+                next_states[placed, item if no_adjacent else -1] += ways
+
+        states = next_states
+
+    return sum(states.values())
+
+
+def laguerre_integral(frequencies: List[int], alpha: int) -> int:
+    """
+    Integrate the product of the generalised Laguerre polynomials
+    L_n^(alpha)(x) for each frequency n, against exp(-x) from 0 to
+    infinity: the sum of k! times each coefficient of x**k.
+
+    Each polynomial is multiplied by n!, so that its coefficients
+
+        (-1)**k * binomial(n + alpha, n - k) * n! / k!
+
+    are integers, and the product is found with multiply_signed (so a
+    cancelled evaluation stops between multiplications). The factorials
+    are built up one multiplication at a time, since large ones are not
+    kept in the shared table.
+    """
+    product = [1]
+    scale = 1
+
+    for n in frequencies:
+        check_cancelled()
+        coeffs = [0] * (n + 1)
+        row = binomial_row(n + alpha, n)
+        # n! / k!, from k = n down to 0
+        ratio = 1
+
+        for k in range(n, -1, -1):
+            coeffs[k] = (-1) ** k * row[n - k] * ratio
+            ratio *= k or 1
+
+        product = multiply_signed(product, coeffs)
+        scale *= ratio
+
+    total = 0
+    running = 1
+
+    for k, coeff in enumerate(product):
+        running *= k or 1
+        total += coeff * running
+
+    return total // scale
+
+
+_ENGINES: Dict[str, Callable[[Runs, Counter, Sequence[str], bool], int]] = {
+    "infeasible": _count_infeasible,
+    "laguerre": _count_laguerre,
+    "transfer_matrix": _count_transfer_matrix,
+}
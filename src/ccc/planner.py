@@ -0,0 +1,230 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ccc.series import is_sparse
+from ccc.util.degrees import Degrees, highest_degree, interval_bounds, lowest_degree
+
+# Relative cost of one coefficient operation in each engine. The packed
+# engine multiplies big integers in C, while the others loop in Python
+# (sympy's dense polynomial arithmetic carries the most overhead). The
+# sparse engine mixes both kinds of step, so its model weighs each one.
+ENGINE_WEIGHTS = {
+    "closed_form": 1.0,
+    "laguerre": 4.0,
+    "multinomial": 1.5,
+    "packed": 0.02,
+    "polynomial": 4.0,
+    "recurrence": 0.05,
+    "sparse": 1.0,
+    "transfer_matrix": 1.5,
+}
+
+
+class Plan(NamedTuple):
+    """
+    The engine chosen to evaluate a tracker, along with the estimated
+    cost of every engine that could have been used.
+    """
+
+    engine: str
+    costs: Dict[str, float]
+
+    def __str__(self) -> str:
+        estimates = ", ".join(
+            f"{engine} ~ {cost:.3g}"
+            for engine, cost in sorted(self.costs.items(), key=lambda item: item[1])
+        )
+        return f"{self.engine} (estimated cost: {estimates})"
+
+
+def plan(tracker) -> Plan:
+    """
+    Choose the cheapest engine that can evaluate the tracker.
+
+    The tracker lists the engines it implements with engines(), and
+    the degrees each item contributes to the product with factor_degrees().
+    Trackers that cannot meet their constraints need no engine at all.
+    """
+    if not tracker.is_feasible():
+        return Plan("infeasible", {"infeasible": 0.0})
+
+    lowest = sum(lowest_degree(degrees) for degrees in tracker.factor_degrees())
+    factors = [
+        _shape(degrees, tracker.size - (lowest - lowest_degree(degrees)))
+        for degrees in tracker.factor_degrees()
+    ]
+    costs = {}
+
+    for engine in tracker.engines():
+        cost = COST_MODELS[engine](factors, tracker.size)
+        if cost is not None:
+            costs[engine] = cost * ENGINE_WEIGHTS[engine]
+
+    return Plan(min(costs, key=costs.get), costs)
+
+
+def plan_permutation(frequencies: List[int], constraints: int) -> Plan:
+    """
+    Choose the cheapest engine to count permutations of a sequence with
+    the given item frequencies and number of distinct named constraints.
+    """
+    if constraints == 0:
+        # the multinomial coefficient: one factorial per item
+        return Plan("formula", {"formula": float(len(frequencies))})
+
+    length = sum(frequencies)
+    costs = {}
+
+    # sympy multiplies one Laguerre polynomial per item, then expands the product
+    if constraints == 1:
+        costs["laguerre"] = length ** 2 * len(frequencies) * ENGINE_WEIGHTS["laguerre"]
+
+    # one state for each count of each item left to place (and the last item placed)
+    states = 1
+    for frequency in frequencies:
+        states *= frequency + 1
+
+    costs["transfer_matrix"] = states * len(frequencies) ** 2 * ENGINE_WEIGHTS["transfer_matrix"]
+
+    return Plan(min(costs, key=costs.get), costs)
+
+
+# Each factor is described by (number of terms, highest degree, interval bounds,
+# total degree when written as a ratio of polynomials)
+Shape = Tuple[int, int, Optional[Tuple[int, int]], int]
+
+
+def _shape(degrees: Degrees, reach: int) -> Shape:
+    """
+    Describe a factor, given the highest of its degrees that can be part
+    of a collection of the required size.
+    """
+    highest = highest_degree(degrees)
+
+    # see degrees_to_fraction
+    if isinstance(degrees, range) and len(degrees) > 1:
+        stop = degrees.start + degrees.step * len(degrees)
+        rational = degrees.step + (stop if stop <= reach else degrees.start)
+    else:
+        rational = highest
+
+    return len(degrees), highest, interval_bounds(degrees), rational
+
+
+def _cost_closed_form(factors: List[Shape], size: int) -> Optional[float]:
+    """
+    Number of binomials summed: one for each distinct total of the upper
+    bounds over subsets of items that can exceed their bound.
+    """
+    if any(bounds is None for _, _, bounds, _ in factors):
+        return None
+
+    remaining = size - sum(bounds[0] for _, _, bounds, _ in factors)
+    bounded = sum(1 for _, highest, (lowest, _), _ in factors if highest - lowest < remaining)
+    return len(factors) + min(2 ** bounded, max(remaining, 0) + 1) * len(factors)
+
+
+def _cost_packed(factors: List[Shape], size: int) -> float:
+    """
+    Each product is one big integer multiplication (Karatsuba) of length
+    proportional to the number of terms in both polynomials.
+    """
+    cost = 0.0
+    degree = 0
+
+    for _, highest, _, _ in factors:
+        cost += (degree + min(highest, size) + 2) ** 1.585
+        degree = min(degree + max(highest, 0), size)
+
+    return cost
+
+
+def _cost_multinomial(factors: List[Shape], size: int) -> float:
+    """
+    Each item visits every term of the running (truncated) product once
+    for each of its degrees.
+    """
+    cost = 0.0
+    degree = 0
+
+    for terms, highest, _, _ in factors:
+        cost += (degree + 1) * terms
+        degree = min(degree + max(highest, 0), size)
+
+    return cost
+
+
+def _cost_polynomial(factors: List[Shape], size: int) -> float:
+    """
+    Sympy multiplies dense polynomials without truncating them, so the
+    running product grows to the sum of the highest degrees.
+    """
+    cost = 0.0
+    degree = 0
+
+    for terms, highest, _, _ in factors:
+        cost += (degree + 1) * terms
+        degree += max(highest, 0)
+
+    return cost
+
+
+def _cost_sparse(factors: List[Shape], size: int) -> Optional[float]:
+    """
+    Follows sparse_product: the terms of the running product and a factor
+    are multiplied pairwise in Python while both are sparse. After that,
+    a sparse polynomial costs one packed addition per term and two dense
+    ones a packed multiplication, and a dense product is read back into
+    sparse form in Python. The factor with the most terms is left out of
+    the product: it is only looked up once for each term.
+    """
+    if not factors:
+        return None
+
+    *factors, _ = sorted(factors, key=lambda factor: factor[0])
+    cost = 0.0
+    terms, degree = 1, 0
+    dense = False
+
+    for count, highest, _, _ in factors:
+        highest = min(max(highest, 0), size)
+        reach = min(degree + highest, size)
+        factor_is_sparse = is_sparse(count, highest)
+        product_is_sparse = not dense and is_sparse(terms, degree)
+
+        if product_is_sparse and factor_is_sparse:
+            cost += terms * count * ENGINE_WEIGHTS["multinomial"]
+            terms = min(terms * count, reach + 1)
+        else:
+            if factor_is_sparse or product_is_sparse:
+                shifts = count if factor_is_sparse else terms
+                cost += shifts * (reach + 1) * ENGINE_WEIGHTS["packed"]
+            else:
+                cost += (degree + highest + 2) ** 1.585 * ENGINE_WEIGHTS["packed"]
+            dense = True
+            terms = reach + 1
+
+        degree = reach
+
+    # a dense product is read back into sparse form, then each term looks up the last factor
+    lookups = (degree + 1 if dense else 0) + terms
+    return cost + lookups * ENGINE_WEIGHTS["multinomial"]
+
+
+def _cost_recurrence(factors: List[Shape], size: int) -> float:
+    """
+    Each halving of the size multiplies the numerator and denominator
+    by a polynomial as long as the denominator: eight big integer
+    multiplications, since the coefficients may be negative.
+    """
+    degree = sum(rational for _, _, _, rational in factors) + 1
+    return 8 * size.bit_length() * (2 * degree) ** 1.585
+
+
+COST_MODELS: Dict[str, Callable[[List[Shape], int], Optional[float]]] = {
+    "closed_form": _cost_closed_form,
+    "multinomial": _cost_multinomial,
+    "packed": _cost_packed,
+    "polynomial": _cost_polynomial,
+    "recurrence": _cost_recurrence,
+    "sparse": _cost_sparse,
+}
@@ -1,8 +1,28 @@
-from typing import Iterable
+from typing import Iterable, List, Tuple
 
-from sympy import Poly, Rational, factorial, binomial
+from sympy import Poly, Rational
 from sympy.abc import x
 
+from ccc.series import Sparse, is_sparse
+from ccc.tables import binomial, binomial_row, factorial
+from ccc.util.cancellation import check_cancelled
+from ccc.util.degrees import clip_degrees, intersect_ranges
+
+
+def multiply_polynomials(polys: Iterable[Poly]) -> Poly:
+    """
+    Multiply the polynomials together, one at a time, so that a cancelled
+    evaluation stops between multiplications (as the engines in
+    ccc.series do).
+    """
+    product = Poly(1, x)
+
+    for poly in polys:
+        check_cancelled()
+        product = product * poly
+
+    return product
+
 
 def degrees_to_polynomial(degrees: Iterable[int]) -> Poly:
     """
@@ -27,7 +47,7 @@ def degrees_to_polynomial_with_fractional_coeff(degrees: Iterable[int], n: int,
     degree_coeff_dict = {}
 
     for degree in degrees:
-        degree_coeff_dict[degree] = Rational(n, total) ** degree / factorial(degree)
+        degree_coeff_dict[degree] = Rational(n ** degree, total ** degree * factorial(degree))
 
     return Poly.from_dict(degree_coeff_dict, x)
 
@@ -40,11 +60,13 @@ def degrees_to_polynomial_with_binomial_coeff(degrees: Iterable[int], n: int) ->
         {0, 2, 5} -> bin(n, 5)*x**5 + bin(n, 2)*x**2 + 1
 
     """
-    degree_coeff_dict = {}
+    if isinstance(degrees, range):
+        degrees = intersect_ranges(degrees, range(n + 1))
 
-    for degree in degrees:
-        degree_coeff_dict[degree] = binomial(n, degree)
+    degrees = [degree for degree in degrees if 0 <= degree <= n]
+    row = binomial_row(n, max(degrees, default=0))
 
+    degree_coeff_dict = {degree: row[degree] for degree in degrees}
     return Poly.from_dict(degree_coeff_dict, x)
 
 
@@ -59,6 +81,113 @@ def degrees_to_polynomial_with_factorial_coeff(degrees: Iterable[int]) -> Poly:
     degree_coeff_dict = {}
 
     for degree in degrees:
-        degree_coeff_dict[degree] = 1 / factorial(degree)
+        degree_coeff_dict[degree] = Rational(1, factorial(degree))
 
     return Poly.from_dict(degree_coeff_dict, x)
+
+
+def degrees_to_list(degrees: Iterable[int], max_degree: int) -> List[int]:
+    """
+    As degrees_to_polynomial, but return the list of coefficients
+    (lowest degree first) up to max_degree, e.g.:
+
+        {0, 2, 5}, 3 -> [1, 0, 1, 0]
+
+    """
+    coeffs = [0] * (max_degree + 1)
+
+    for degree in clip_degrees(degrees, max_degree):
+        coeffs[degree] = 1
+
+    return coeffs
+
+
+def degrees_to_list_with_binomial_coeff(
+    degrees: Iterable[int], n: int, max_degree: int
+) -> List[int]:
+    """
+    As degrees_to_polynomial_with_binomial_coeff, but return the list of
+    coefficients (lowest degree first) up to max_degree, e.g.:
+
+        {0, 2, 5}, 5, 3 -> [1, 0, 10, 0]
+
+    """
+    degrees = clip_degrees(degrees, min(n, max_degree))
+    row = binomial_row(n, min(n, max_degree))
+
+    coeffs = [0] * (max_degree + 1)
+
+    for degree in degrees:
+        coeffs[degree] = row[degree]
+
+    return coeffs
+
+
+def degrees_to_sparse(degrees: Iterable[int], max_degree: int) -> Sparse:
+    """
+    As degrees_to_list, but return the degrees up to max_degree and
+    their coefficients as a pair of lists, e.g.:
+
+        {0, 2, 5000}, 5000 -> ([0, 2, 5000], [1, 1, 1])
+
+    """
+    degrees = sorted(clip_degrees(degrees, max_degree))
+    return degrees, [1] * len(degrees)
+
+
+def degrees_to_sparse_with_binomial_coeff(
+    degrees: Iterable[int], n: int, max_degree: int
+) -> Sparse:
+    """
+    As degrees_to_list_with_binomial_coeff, but return the degrees and
+    their coefficients as a pair of lists, e.g.:
+
+        {0, 2, 5}, 5, 3 -> ([0, 2], [1, 10])
+
+    """
+    degrees = sorted(clip_degrees(degrees, min(n, max_degree)))
+
+    if not degrees:
+        return [], []
+
+    if is_sparse(len(degrees), degrees[-1]):
+        return degrees, [binomial(n, degree) for degree in degrees]
+
+    row = binomial_row(n, degrees[-1])
+    return degrees, [row[degree] for degree in degrees]
+
+
+def degrees_to_fraction(degrees: Iterable[int], max_degree: int) -> Tuple[List[int], List[int]]:
+    """
+    As degrees_to_list, but return the polynomial as a (numerator,
+    denominator) pair of coefficient lists. A range of degrees a, a + s,
+    a + 2s, ... is a geometric series, so is written in closed form, e.g.:
+
+        range(1, 11, 3), 10 -> [0, 1], [1, 0, 0, -1]  (x / (1 - x**3))
+
+    The numerator also has a term -x**b if the range stops at b before
+    max_degree. Otherwise it only differs above max_degree, which is
+    never needed. Any other degrees are written over a denominator of 1.
+
+    """
+    degrees = clip_degrees(degrees, max_degree)
+
+    if isinstance(degrees, range) and len(degrees) > 1:
+        start, step = degrees.start, degrees.step
+        stop = start + step * len(degrees)
+
+        numerator = [0] * start + [1]
+        if stop <= max_degree:
+            numerator += [0] * (stop - start - 1) + [-1]
+
+        return numerator, [1] + [0] * (step - 1) + [-1]
+
+    if not degrees:
+        return [], [1]
+
+    coeffs = [0] * (max(degrees) + 1)
+
+    for degree in degrees:
+        coeffs[degree] = 1
+
+    return coeffs, [1]
@@ -1,6 +1,15 @@
 from typing import Optional, Collection, Dict, List, Tuple, MutableSet
 
-from ccc.errors import ConstraintNotImplementedError
+from ccc.errors import CollectionError, ConstraintNotImplementedError
+from ccc.planner import Plan, plan
+from ccc.util.degrees import (
+    Degrees,
+    clip_degrees,
+    freeze_degrees,
+    intersect_degrees,
+    subtract_degrees,
+    tighten_degrees,
+)
 
 
 class PolynomialTracker:
@@ -20,13 +29,14 @@ class PolynomialTracker:
         self._max_degree = size
         self._collection = collection
         self._constraints = constraints
-        self._degrees: Dict[str, MutableSet[int]] = {}
+        self._domains: Dict[str, Degrees] = {}
+        self._factors: Optional[List[Degrees]] = None
 
         # do not allow constraints on items that are not in the collection
         if collection is not None and constraints is not None:
             missing = _constraint_items_missing_from_collection(constraints, collection)
             if missing:
-                raise ValueError(
+                raise CollectionError(
                     f"The following items are not in the collection: {', '.join(missing)}"
                 )
 
@@ -38,13 +48,33 @@ class PolynomialTracker:
                 except AttributeError:
                     raise ConstraintNotImplementedError(f"Constraint '{op}' is not implemented")
 
+        # the degrees imposed by the constraints alone, before any collection
+        self._imposed = dict(self._domains)
+
         # add items from the collection that were not constrained
         self._add_unconstrained_items()
 
+    def constrained_items(self) -> List[str]:
+        """
+        The items named by the constraints.
+        """
+        return list(self._imposed)
+
+    def constrained_degrees(self) -> Dict[str, Degrees]:
+        """
+        The normalised degrees (see factor_degrees) of each item named by
+        the constraints.
+        """
+        return {
+            item: degrees
+            for item, degrees in zip(self._domains, self.factor_degrees())
+            if item in self._imposed
+        }
+
     def _add_unconstrained_items(self) -> None:
         if self._collection is not None:
             for item, count in self._collection.items():
-                if item not in self._degrees:
+                if item not in self._domains:
                     self.impose_constraint_le(item, count)
 
     def impose_constraint_eq(self, item: str, number: int) -> None:
@@ -54,46 +84,115 @@ class PolynomialTracker:
         self.impose_constraint_not_in(item, [number])
 
     def impose_constraint_lt(self, item: str, number: int) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(range(number))
-        else:
-            self._degrees[item] = set(range(number))
+        self._restrict(item, range(number))
 
     def impose_constraint_le(self, item: str, number: int) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(range(number + 1))
-        else:
-            self._degrees[item] = set(range(number + 1))
+        self._restrict(item, range(number + 1))
 
     def impose_constraint_gt(self, item: str, number: int) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(range(number + 1, self._max_degree + 1))
-        else:
-            self._degrees[item] = set(range(number + 1, self._max_degree + 1))
+        self._restrict(item, range(number + 1, self._max_degree + 1))
 
     def impose_constraint_ge(self, item: str, number: int) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(range(number, self._max_degree + 1))
-        else:
-            self._degrees[item] = set(range(number, self._max_degree + 1))
+        self._restrict(item, range(number, self._max_degree + 1))
 
     def impose_constraint_in(self, item: str, numbers: Collection[int]) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(numbers)
-        else:
-            self._degrees[item] = set(numbers)
+        self._restrict(item, set(numbers))
 
     def impose_constraint_not_in(self, item: str, numbers: Collection[int]) -> None:
-        if item in self._degrees:
-            self._degrees[item] -= set(numbers)
+        self._factors = None
+
+        if item in self._domains:
+            self._domains[item] = subtract_degrees(self._domains[item], set(numbers))
         else:
-            self._degrees[item] = set(range(self._max_degree + 1)) - set(numbers)
+            self._domains[item] = subtract_degrees(range(self._max_degree + 1), set(numbers))
 
     def impose_constraint_mod(self, item: str, mod: int, rem: int) -> None:
-        if item in self._degrees:
-            self._degrees[item] &= set(range(rem, self._max_degree + 1, mod))
+        self._restrict(item, range(rem, self._max_degree + 1, mod))
+
+    def _restrict(self, item: str, degrees: Degrees) -> None:
+        """
+        Restrict the degrees the item may take to those given.
+        """
+        self._factors = None
+
+        if item in self._domains:
+            self._domains[item] = intersect_degrees(self._domains[item], degrees)
         else:
-            self._degrees[item] = set(range(rem, self._max_degree + 1, mod))
+            self._domains[item] = degrees
+
+    @property
+    def _degrees(self) -> Dict[str, MutableSet[int]]:
+        """
+        The degrees of each item as explicit sets of integers.
+
+        Ranges are held lazily in _domains and only materialised here.
+        """
+        return {
+            item: set(degrees) if isinstance(degrees, range) else degrees
+            for item, degrees in self._domains.items()
+        }
+
+    def engines(self) -> Tuple[str, ...]:
+        """
+        Names of the engines that can evaluate this tracker.
+        """
+        return ()
+
+    def factor_degrees(self) -> List[Degrees]:
+        """
+        For each item, the degrees that can contribute to a collection
+        of the given size.
+
+        The degrees imposed by the constraints are normalised first: each
+        item is limited to the degrees it can take in a collection whose
+        counts sum to the size. If no collection can meet the constraints,
+        every item's degrees are empty.
+        """
+        if self._factors is None:
+            self._factors = tighten_degrees(self._clipped_degrees(), self._max_degree)
+
+        return self._factors
+
+    def is_feasible(self) -> bool:
+        """
+        Whether any collection of the given size can meet the constraints.
+        """
+        return all(self.factor_degrees())
+
+    def signature(self) -> Tuple:
+        """
+        Hashable description of the normalised degrees of each item: two
+        trackers of the same kind and size with equal signatures give the
+        same count.
+        """
+        return tuple(
+            (item, freeze_degrees(degrees))
+            for item, degrees in zip(self._domains, self.factor_degrees())
+        )
+
+    def _clipped_degrees(self) -> List[Degrees]:
+        """
+        Each item's degrees, limited to the most of the item that could
+        be in a collection.
+        """
+        return [
+            clip_degrees(degrees, self._item_limit(item)) for item, degrees in self._domains.items()
+        ]
+
+    def _item_limit(self, item: str) -> int:
+        """
+        The most of the item that can be in a collection of the given
+        size (no more than the collection holds, if one is given).
+        """
+        if self._collection is not None:
+            return min(self._collection[item], self._max_degree)
+        return self._max_degree
+
+    def plan(self) -> Plan:
+        """
+        Choose the cheapest engine to evaluate this tracker.
+        """
+        return plan(self)
 
     def total_items_in_collection(self) -> Optional[int]:
         """
@@ -0,0 +1,209 @@
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from ccc.evaluate import (
+    Disjuncts,
+    Term,
+    draw_terms,
+    multiset_terms,
+    permutation_terms,
+    sequence_terms,
+)
+from ccc.draw import count_draw_factors, probability_draw_factors
+from ccc.multiset import count_multiset_factors
+from ccc.permutation import (
+    PermutationCounter,
+    count_permutation_runs,
+    probability_permutation_runs,
+)
+from ccc.sequence import count_sequence_factors
+from ccc.util.degrees import freeze_degrees
+
+
+class CompiledTerm(NamedTuple):
+    """
+    One inclusion-exclusion term: its coefficient, the engine the planner
+    chose for it, and the pure function that evaluates it along with the
+    frozen arguments it is called with (normalised degrees are ranges and
+    frozensets, and everything else is a tuple or a number).
+    """
+
+    coefficient: int
+    engine: str
+    function: Callable[..., Any]
+    args: Tuple
+
+    def evaluate(self):
+        """
+        The value of the term (without its coefficient).
+        """
+        return self.function(*self.args, self.engine)
+
+
+class Query(NamedTuple):
+    """
+    A question compiled into the terms needed to answer it.
+
+    Everything is worked out when the query is compiled: the terms, their
+    normalised degrees and the engine for each. Nothing in a query can
+    change, and evaluating it only calls pure functions of its terms, so
+    one query can be shared between threads and evaluated any number of
+    times without copying it.
+
+    Queries are hashable. Two queries are equal when they ask for the same
+    thing of the same objects and their terms have the same coefficients
+    and signatures, so they can be used as keys of a cache of answers.
+    """
+
+    method: str
+    key: Hashable
+    terms: Tuple[CompiledTerm, ...]
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Query) and self.key == other.key
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+
+def compile_terms(
+    terms: Iterable[Term],
+    method: str,
+    description: Hashable,
+    function: Callable[..., Any],
+    arguments: Callable[[Any], Tuple],
+) -> Query:
+    """
+    Freeze the terms into a query whose answer is found by calling the
+    function with the arguments taken from each tracker, then the engine
+    chosen for the tracker.
+
+    The description identifies the objects being counted (e.g. their
+    size and collection), which the signatures of the terms do not.
+    """
+    compiled = []
+    key = [method, description]
+
+    for coefficient, _, tracker in terms:
+        # planning normalises the tracker's degrees, which are frozen from then on
+        engine = tracker.plan().engine
+        compiled.append(CompiledTerm(coefficient, engine, function, arguments(tracker)))
+        key.append((coefficient, tracker.signature()))
+
+    return Query(method, tuple(key), tuple(compiled))
+
+
+def compile_multisets(
+    size: int, collection: Optional[Dict[str, int]] = None, constraints: Optional[Disjuncts] = None
+) -> Query:
+    """
+    Compile the count of multisets of the given size that meet zero or
+    more constraints.
+    """
+    description = ("multisets", size, _freeze_collection(collection))
+    terms = multiset_terms(size, collection, constraints)
+    return compile_terms(terms, "count", description, count_multiset_factors, _degree_arguments)
+
+
+def compile_draws(
+    size: int,
+    collection: Dict[str, int],
+    constraints: Optional[Disjuncts] = None,
+    replace: bool = False,
+    method: str = "probability",
+) -> Query:
+    """
+    Compile the probability (or with method="count", the number) of draws
+    of the given size from a collection that meet the constraints.
+    """
+    if method == "probability":
+        # every draw is weighted the same, which the multiset count would not do
+        constraints = constraints or [[]]
+
+    description = ("draws", size, _freeze_collection(collection), replace)
+    terms = draw_terms(size, collection, constraints, replace)
+
+    if method == "count":
+        return compile_terms(terms, method, description, count_draw_factors, _draw_arguments)
+
+    return compile_terms(
+        terms, method, description, probability_draw_factors, _probability_draw_arguments
+    )
+
+
+def compile_sequences(
+    size: int, collection: Optional[Dict[str, int]], constraints: Disjuncts
+) -> Query:
+    """
+    Compile the count of sequences of the given size that meet the
+    constraints.
+    """
+    description = ("sequences", size, _freeze_collection(collection))
+    terms = sequence_terms(size, collection, constraints)
+    return compile_terms(terms, "count", description, count_sequence_factors, _degree_arguments)
+
+
+def compile_permutations(
+    sequence: Union[Sequence[Hashable], Mapping[Hashable, int]],
+    constraints: Optional[Disjuncts] = None,
+    same_distinct: bool = False,
+    method: str = "count",
+) -> Query:
+    """
+    Compile the count (or with method="probability", the probability) of
+    permutations of the sequence that meet zero or more constraints.
+    """
+    description = ("permutations", tuple(PermutationCounter(sequence).runs), same_distinct)
+    terms = permutation_terms(sequence, constraints, same_distinct)
+    function = count_permutation_runs if method == "count" else probability_permutation_runs
+    return compile_terms(terms, method, description, function, _permutation_arguments)
+
+
+def evaluate_query(query: Query):
+    """
+    Answer a compiled query. The query is not changed, so this can be
+    called from any number of threads at once.
+    """
+    answer = 0
+
+    for term in query.terms:
+        answer += term.coefficient * term.evaluate()
+
+    return answer
+
+
+def _degree_arguments(tracker: Any) -> Tuple:
+    return tuple(freeze_degrees(degrees) for degrees in tracker.factor_degrees()), tracker.size
+
+
+def _draw_arguments(tracker: Any) -> Tuple:
+    degrees, size = _degree_arguments(tracker)
+    return degrees, tuple(tracker.factor_counts()), size
+
+
+def _probability_draw_arguments(tracker: Any) -> Tuple:
+    return _draw_arguments(tracker) + (tracker.replace,)
+
+
+def _permutation_arguments(tracker: Any) -> Tuple:
+    return tuple(tracker.runs), tuple(tracker.constraint_names), tracker.same_distinct
+
+
+def _freeze_collection(collection: Optional[Dict[str, int]]) -> Optional[Tuple]:
+    if collection is None:
+        return None
+    return tuple(collection.items())
@@ -0,0 +1,261 @@
+# Reference answers, found by listing every draw, multiset, sequence or
+# permutation explicitly and checking the constraints against each one.
+#
+# This takes time exponential in the size, so is only for small questions:
+# it is the oracle the engines are tested against. The functions have the
+# same names and arguments as those in ccc.evaluate.
+import time
+from collections import Counter
+from itertools import combinations, permutations, product
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sympy import Rational
+
+from ccc.evaluate import Disjuncts
+
+# How each constraint tuple is checked against the count of its item
+PREDICATES: Dict[str, Callable[..., bool]] = {
+    "eq": lambda count, number: count == number,
+    "ne": lambda count, number: count != number,
+    "lt": lambda count, number: count < number,
+    "le": lambda count, number: count <= number,
+    "gt": lambda count, number: count > number,
+    "ge": lambda count, number: count >= number,
+    "in": lambda count, numbers: count in numbers,
+    "not_in": lambda count, numbers: count not in numbers,
+    "mod": lambda count, mod, rem: count % mod == rem,
+}
+
+
+def meets(counts: Mapping[Hashable, int], constraints: Optional[Disjuncts]) -> bool:
+    """
+    Whether the counts of each item meet any of the disjuncts (or there
+    are no constraints).
+    """
+    if constraints is None:
+        return True
+
+    return any(
+        all(PREDICATES[op](counts.get(item, 0), *args) for op, item, *args in conjunct)
+        for conjunct in constraints
+    )
+
+
+def constrained_items(constraints: Optional[Disjuncts]) -> List[str]:
+    """
+    The items named by the constraints, in the order they are first named.
+    """
+    items: Dict[str, None] = {}
+
+    for conjunct in constraints or []:
+        for _, item, *_ in conjunct:
+            items[item] = None
+
+    return list(items)
+
+
+def count_multisets(
+    size: int, collection: Optional[Dict[str, int]] = None, constraints: Optional[Disjuncts] = None
+) -> int:
+    """
+    Count multisets of the given size that meet zero or more constraints.
+    """
+    if collection is None:
+        limits = {item: size for item in constrained_items(constraints)}
+    else:
+        limits = collection
+
+    return sum(
+        1
+        for counts in product(*(range(min(limit, size) + 1) for limit in limits.values()))
+        if sum(counts) == size and meets(dict(zip(limits, counts)), constraints)
+    )
+
+
+def count_draws(
+    size: int, collection: Dict[str, int], constraints: Optional[Disjuncts] = None
+) -> int:
+    """
+    Count draws (without replacement) of the given size from a
+    collection which meet zero or more constraints.
+
+    As in ccc.evaluate, the objects drawn are told apart when there are
+    constraints; without any, the distinct draws are counted.
+    """
+    if constraints is None:
+        return count_multisets(size, collection)
+
+    return sum(1 for drawn in _draws(size, collection) if meets(Counter(drawn), constraints))
+
+
+def probability_draw(
+    size: int, collection: Dict[str, int], constraints: Optional[Disjuncts], replace: bool = False
+) -> Rational:
+    """
+    Probability of drawing a collection of the given size such that
+    the constraints are met.
+    """
+    met = total = 0
+
+    for drawn in _draws(size, collection, replace):
+        met += meets(Counter(drawn), constraints)
+        total += 1
+
+    return Rational(met, total)
+
+
+def count_sequences(size: int, collection: Optional[Dict[str, int]], constraints: Disjuncts) -> int:
+    """
+    Count sequences of the given size that meet the constraints.
+    """
+    items = list(collection) if collection is not None else constrained_items(constraints)
+    met = 0
+
+    for sequence in product(items, repeat=size):
+        counts = Counter(sequence)
+
+        if collection is not None and any(counts[item] > collection[item] for item in counts):
+            continue
+
+        met += meets(counts, constraints)
+
+    return met
+
+
+def count_permutations(
+    sequence: Union[Sequence[Hashable], Mapping[Hashable, int]],
+    constraints: Optional[Disjuncts] = None,
+    same_distinct: bool = False,
+) -> int:
+    """
+    Count permutations of the sequence that meet zero or more of the
+    named constraints ('derangement' or 'no_adjacent').
+    """
+    return sum(1 for _ in _permutations(sequence, constraints, same_distinct))
+
+
+def probability_permutation(
+    sequence: Union[Sequence[Hashable], Mapping[Hashable, int]],
+    constraints: Disjuncts,
+    same_distinct: bool = False,
+) -> Rational:
+    """
+    Probability that a random permutation of the sequence meets
+    the constraints.
+    """
+    met = count_permutations(sequence, constraints, same_distinct)
+    return Rational(met, count_permutations(sequence, None, same_distinct))
+
+
+def probability_staged_draw(
+    collection: Dict[str, int], stages: Sequence[Tuple[int, Optional[Disjuncts]]]
+) -> Rational:
+    """
+    Probability that drawing from the collection in stages of the given
+    sizes (without replacement) meets the constraints of every stage.
+    """
+    objects = _objects(collection)
+    met = total = 0
+
+    def draw(remaining: List[int], stage: int) -> Iterable[bool]:
+        if stage == len(stages):
+            yield True
+            return
+
+        size, constraints = stages[stage]
+
+        for chosen in combinations(remaining, size):
+            ok = meets(Counter(objects[i] for i in chosen), constraints)
+            rest = [i for i in remaining if i not in chosen]
+            for later in draw(rest, stage + 1):
+                yield ok and later
+
+    for ok in draw(list(range(len(objects))), 0):
+        met += ok
+        total += 1
+
+    return Rational(met, total)
+
+
+def time_engines(
+    build: Callable[[int], object], sizes: Iterable[int], method: str = "count"
+) -> Dict[str, List[Tuple[int, float]]]:
+    """
+    Time each engine of the tracker made by build(size), for each size.
+
+    Returns the (size, seconds) pairs of each engine, to check that the
+    time each takes grows as its cost model says it should.
+    """
+    timings: Dict[str, List[Tuple[int, float]]] = {}
+
+    for size in sizes:
+        tracker = build(size)
+
+        for engine in tracker.plan().costs:
+            start = time.perf_counter()
+            getattr(tracker, method)(engine)
+            timings.setdefault(engine, []).append((size, time.perf_counter() - start))
+
+    return timings
+
+
+def _objects(collection: Dict[str, int]) -> List[str]:
+    return [item for item, count in collection.items() for _ in range(count)]
+
+
+def _draws(size: int, collection: Dict[str, int], replace: bool = False) -> Iterable[List[str]]:
+    """
+    Every draw of distinct objects: sets of them, or with replacement,
+    sequences of them.
+    """
+    objects = _objects(collection)
+    indices = range(len(objects))
+    chosen = product(indices, repeat=size) if replace else combinations(indices, size)
+
+    for draw in chosen:
+        yield [objects[i] for i in draw]
+
+
+def _permutations(
+    sequence: Union[Sequence[Hashable], Mapping[Hashable, int]],
+    constraints: Optional[Disjuncts],
+    same_distinct: bool,
+) -> Iterable[Tuple[Hashable, ...]]:
+    if isinstance(sequence, Mapping):
+        sequence = [item for item, count in sequence.items() for _ in range(count)]
+
+    sequence = list(sequence)
+    seen = set()
+
+    for order in permutations(range(len(sequence))):
+        arranged = tuple(sequence[i] for i in order)
+
+        if not same_distinct:
+            if arranged in seen:
+                continue
+            seen.add(arranged)
+
+        if constraints is None or any(
+            all(_permutation_meets(sequence, arranged, op) for op, *_ in conjunct)
+            for conjunct in constraints
+        ):
+            yield arranged
+
+
+def _permutation_meets(original: List[Hashable], arranged: Tuple[Hashable, ...], op: str) -> bool:
+    if op == "derangement":
+        return all(a != b for a, b in zip(original, arranged))
+    if op == "no_adjacent":
+        return all(a != b for a, b in zip(arranged, arranged[1:]))
+    raise ValueError(f"Constraint '{op}' is not a permutation constraint")
@@ -1,10 +1,12 @@
-from typing import Optional, Dict, List, Tuple
+from typing import Callable, Collection, Optional, Dict, List, Tuple
 
-from sympy import prod, factorial
 from sympy.abc import x
 
-from ccc.polynomial import degrees_to_polynomial_with_factorial_coeff
+from ccc.polynomial import degrees_to_polynomial_with_factorial_coeff, multiply_polynomials
 from ccc.polynomialtracker import PolynomialTracker
+from ccc.series import multinomial_product
+from ccc.tables import factorial
+from ccc.util.degrees import Degrees
 
 
 class Sequence(PolynomialTracker):
@@ -25,12 +27,51 @@ class Sequence(PolynomialTracker):
 
         super().__init__(size, collection, constraints)
 
-    def count(self) -> int:
+    def engines(self) -> Tuple[str, ...]:
+        return ("multinomial", "polynomial")
+
+    def count(self, engine: Optional[str] = None) -> int:
         """
         Count number of sequences that meet constraints.
+
+        The engine used is chosen by the planner, unless specified.
         """
-        poly = prod(
-            degrees_to_polynomial_with_factorial_coeff(degrees)
-            for degrees in self._degrees.values()
-        )
-        return poly.coeff_monomial(x ** self._max_degree) * factorial(self._max_degree)
+        if engine is None:
+            engine = self.plan().engine
+
+        return count_sequence_factors(self.factor_degrees(), self._max_degree, engine)
+
+
+def count_sequence_factors(factors: Collection[Degrees], size: int, engine: str) -> int:
+    """
+    Count sequences of the given size in which the count of each item is
+    one of the degrees of its factor, using the named engine.
+
+    Only the arguments are read, so this is safe to call from any thread.
+    """
+    return _ENGINES[engine](factors, size)
+
+
+def _count_infeasible(factors: Collection[Degrees], size: int) -> int:
+    return 0
+
+
+def _count_multinomial(factors: Collection[Degrees], size: int) -> int:
+    """
+    Uses exact integer arithmetic (no rational coefficients).
+    """
+    return multinomial_product(factors, size)[size]
+
+
+def _count_polynomial(factors: Collection[Degrees], size: int) -> int:
+    poly = multiply_polynomials(
+        degrees_to_polynomial_with_factorial_coeff(degrees) for degrees in factors
+    )
+    return poly.coeff_monomial(x ** size) * factorial(size)
+
+
+_ENGINES: Dict[str, Callable[[Collection[Degrees], int], int]] = {
+    "infeasible": _count_infeasible,
+    "multinomial": _count_multinomial,
+    "polynomial": _count_polynomial,
+}
@@ -0,0 +1,381 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ccc.backend import flint_multiply, get_backend
+from ccc.util.cancellation import check_cancelled
+from ccc.util.progress import start_product
+
+# A polynomial given by its degrees with nonzero coefficients (in
+# increasing order) and those coefficients
+Sparse = Tuple[List[int], List[int]]
+
+# A polynomial is sparse when no more than one in this many of its
+# coefficients (up to its highest degree) are nonzero
+SPARSE_RATIO = 8
+
+
+def multinomial_product(
+    degree_sets: Iterable[Iterable[int]], max_degree: int, bases: Optional[Iterable[int]] = None
+) -> List[int]:
+    """
+    Count sequences of each length up to max_degree, where each item
+    must appear a number of times given by its set of degrees.
+
+    If bases are given, each sequence is weighted by the product of
+    base**d over the items, where d is the number of times the item
+    appears (e.g. the number of distinct objects each item stands for).
+
+    Coefficients are exact integers throughout. Appending an item that
+    occurs d times to a sequence of length m can be done in
+
+        binomial(m + d, d)
+
+    ways, so each item is added by a binomial-weighted convolution:
+
+        {0, 1}, {2} -> [0, 0, 1, 3]
+
+    With the flint backend, the convolutions are done as products of
+    polynomials instead (see scaled_multinomial_product).
+    """
+    degree_sets = list(degree_sets)
+
+    if bases is None:
+        bases = [1] * len(degree_sets)
+
+    if get_backend() == "flint":
+        return scaled_multinomial_product(degree_sets, max_degree, bases)
+
+    counts = [1] + [0] * max_degree
+
+    for degrees, base in zip(degree_sets, bases):
+        check_cancelled()
+        degrees = sorted(d for d in degrees if 0 <= d <= max_degree)
+        powers = [base ** d for d in degrees]
+        new_counts = [0] * (max_degree + 1)
+
+        if not degrees:
+            return new_counts
+
+        for m, count in enumerate(counts):
+
+            if not count:
+                continue
+
+            # walk along the row binomial(m + d, d) for d = 0, 1, 2, ...
+            weight = 1
+            d = 0
+
+            for degree, power in zip(degrees, powers):
+
+                if m + degree > max_degree:
+                    break
+
+                while d < degree:
+                    d += 1
+                    weight = weight * (m + d) // d
+
+                new_counts[m + degree] += count * weight * power
+
+        counts = new_counts
+
+    return counts
+
+
+def scaled_multinomial_product(
+    degree_sets: Iterable[Iterable[int]], max_degree: int, bases: Iterable[int]
+) -> List[int]:
+    """
+    As multinomial_product, using the exponential generating function of
+    each item: the number of sequences of length m is m! times the x**m
+    coefficient of the product of
+
+        sum(base**d * x**d / d!)
+
+    over the items, summing over the item's degrees d. Each of these is
+    multiplied by D!, where D is the item's highest degree, so that its
+    coefficients are integers and the product can be found by multiply().
+
+    The factorials are built up one multiplication at a time, rather than
+    looked up, since large ones are not kept in the shared table.
+    """
+    factors = []
+    scale = 1
+
+    for degrees, base in zip(degree_sets, bases):
+        degrees = set(d for d in degrees if 0 <= d <= max_degree)
+
+        if not degrees:
+            return [0] * (max_degree + 1)
+
+        highest = max(degrees)
+        coeffs = [0] * (highest + 1)
+        # D! / d!, from d = D down to 0
+        ratio = 1
+
+        for degree in range(highest, -1, -1):
+            if degree in degrees:
+                coeffs[degree] = base ** degree * ratio
+            ratio *= degree or 1
+
+        factors.append(coeffs)
+        scale *= ratio
+
+    counts = []
+    running = 1
+
+    for m, coeff in enumerate(truncated_product(factors, max_degree)):
+        running *= m or 1
+        counts.append(coeff * running // scale)
+
+    return counts
+
+
+def truncated_product(factors: Iterable[List[int]], max_degree: int) -> List[int]:
+    """
+    Multiply polynomials with non-negative integer coefficients (given
+    as lists, lowest degree first), discarding terms above max_degree.
+
+        [1, 1], [1, 2, 1] -> [1, 3, 3, 1]
+
+    If the evaluation saves its progress (see ccc.util.progress), the
+    product is saved after each factor, and resumed from a saved one.
+    """
+    progress = start_product()
+    start, result = 0, [1]
+
+    if progress is not None and progress.saved is not None:
+        start, (result,) = progress.saved
+
+    for index, factor in enumerate(factors):
+        if index < start:
+            continue
+
+        check_cancelled()
+        result = multiply(result, factor[: max_degree + 1], max_degree)
+
+        if progress is not None:
+            progress.save((index + 1, (result,)))
+
+    return result + [0] * (max_degree + 1 - len(result))
+
+
+def multiply(first: List[int], second: List[int], max_degree: int) -> List[int]:
+    """
+    Multiply two polynomials with non-negative integer coefficients,
+    discarding terms above max_degree.
+
+    Uses Kronecker substitution: each polynomial is packed into a single
+    integer, with every coefficient in its own fixed-width slot, so that
+    the multiplication itself is done by Python's big integer arithmetic
+    (or with the flint backend, by python-flint).
+    """
+    if not first or not second:
+        return []
+
+    first = first[: max_degree + 1]
+    second = second[: max_degree + 1]
+
+    if get_backend() == "flint":
+        return flint_multiply(first, second, max_degree)
+
+    # each product coefficient is a sum of at most min(len) terms, so must fit in this width
+    terms = min(len(first), len(second))
+    bits = max(first).bit_length() + max(second).bit_length() + terms.bit_length()
+    width = bits // 8 + 1
+
+    product = _pack(first, width) * _pack(second, width)
+    return _unpack(product, width, min(len(first) + len(second) - 1, max_degree + 1))
+
+
+def sparse_product(factors: Iterable[Sparse], max_degree: int) -> Sparse:
+    """
+    Multiply polynomials with non-negative integer coefficients, given
+    as sparse (degrees, coefficients) pairs, discarding terms above
+    max_degree.
+
+        ([0, 5], [1, 1]), ([0, 7], [1, 2]) -> ([0, 5, 7, 12], [1, 1, 2, 2])
+
+    While the running product and the next factor are both sparse, their
+    terms are multiplied pairwise. Otherwise the product is held as a
+    list of coefficients from then on: a sparse polynomial is multiplied
+    by a dense one as a sum of shifted copies of the dense one (packed
+    as in multiply), and two dense ones by multiply() itself.
+
+    Progress is saved and resumed as by truncated_product.
+    """
+    progress = start_product()
+    start = 0
+    product: Dict[int, int] = {0: 1}
+    dense: Optional[List[int]] = None
+
+    if progress is not None and progress.saved is not None:
+        start, held = progress.saved
+        if len(held) == 1:
+            (dense,) = held
+        else:
+            product = dict(zip(*held))
+
+    for index, (degrees, coeffs) in enumerate(factors):
+        if index < start:
+            continue
+
+        check_cancelled()
+        terms = [(d, c) for d, c in zip(degrees, coeffs) if d <= max_degree and c]
+
+        if not terms:
+            return [], []
+
+        factor_is_sparse = is_sparse(len(terms), terms[-1][0])
+
+        if dense is None and not is_sparse(len(product), max(product)):
+            dense = _to_list(product.items())
+
+        if dense is None:
+            if factor_is_sparse:
+                product = _multiply_sparse(product, terms, max_degree)
+                if not product:
+                    return [], []
+            else:
+                dense = _multiply_shifted(_to_list(terms), sorted(product.items()), max_degree)
+        elif factor_is_sparse:
+            dense = _multiply_shifted(dense, terms, max_degree)
+        else:
+            dense = multiply(dense, _to_list(terms), max_degree)
+
+        if progress is not None:
+            held = (dense,) if dense is not None else (list(product), list(product.values()))
+            progress.save((index + 1, held))
+
+    if dense is None:
+        degrees = sorted(product)
+        return degrees, [product[d] for d in degrees]
+
+    degrees = [d for d, c in enumerate(dense) if c]
+    return degrees, [dense[d] for d in degrees]
+
+
+def is_sparse(terms: int, highest: int) -> bool:
+    """
+    Whether a polynomial with this many nonzero terms up to the highest
+    degree is sparse (a single term always is).
+    """
+    return terms == 1 or terms * SPARSE_RATIO <= highest + 1
+
+
+def _multiply_sparse(
+    product: Dict[int, int], terms: List[Tuple[int, int]], max_degree: int
+) -> Dict[int, int]:
+    result: Dict[int, int] = {}
+
+    for degree, coeff in product.items():
+        for d, c in terms:
+            if degree + d > max_degree:
+                break
+            result[degree + d] = result.get(degree + d, 0) + coeff * c
+
+    return result
+
+
+def _multiply_shifted(dense: List[int], terms: List[Tuple[int, int]], max_degree: int) -> List[int]:
+    """
+    Multiply a dense polynomial by a sparse one (given as its terms in
+    increasing order of degree), adding a copy of the packed dense
+    polynomial for each term, shifted by its degree.
+    """
+    dense = dense[: max_degree + 1]
+
+    if not any(dense):
+        return []
+
+    bits = max(dense).bit_length() + max(c for _, c in terms).bit_length()
+    width = (bits + len(terms).bit_length()) // 8 + 1
+    packed = _pack(dense, width)
+    total = 0
+
+    for d, c in terms:
+        if d > max_degree:
+            break
+        total += (packed * c) << (8 * width * d)
+
+    return _unpack(total, width, min(len(dense) + terms[-1][0], max_degree + 1))
+
+
+def _to_list(terms: Iterable[Tuple[int, int]]) -> List[int]:
+    terms = list(terms)
+    coeffs = [0] * (max(d for d, _ in terms) + 1)
+
+    for d, c in terms:
+        coeffs[d] = c
+
+    return coeffs
+
+
+def multiply_signed(first: List[int], second: List[int]) -> List[int]:
+    """
+    Multiply two polynomials with integer coefficients of any sign.
+
+    Each polynomial is split into its positive and negative parts, and
+    the four products of the parts are found with multiply(). The flint
+    backend multiplies them as they are.
+    """
+    if not first or not second:
+        return []
+
+    degree = len(first) + len(second) - 2
+
+    if get_backend() == "flint":
+        return flint_multiply(first, second, degree)
+
+    first_pos, first_neg = _split_signs(first)
+    second_pos, second_neg = _split_signs(second)
+
+    plus = _add(multiply(first_pos, second_pos, degree), multiply(first_neg, second_neg, degree))
+    minus = _add(multiply(first_pos, second_neg, degree), multiply(first_neg, second_pos, degree))
+
+    return [p - m for p, m in zip(plus, minus)]
+
+
+def rational_coefficient(numerator: List[int], denominator: List[int], n: int) -> int:
+    """
+    The coefficient of x**n in the power series of numerator / denominator
+    (lists of integer coefficients, lowest degree first), where the
+    denominator has constant term 1:
+
+        [0, 1], [1, -1, -1], 10 -> 55  (the Fibonacci numbers)
+
+    Uses the Bostan-Mori algorithm. Multiplying above and below by Q(-x)
+    leaves a denominator Q(x)Q(-x) with only even powers, so the x**n
+    coefficient only needs the terms of the numerator with the same
+    parity as n. Both polynomials are then halved in degree, and so is
+    n, so only O(log n) products of short polynomials are needed.
+    """
+    p, q = numerator[: n + 1], denominator
+
+    while n and p:
+        check_cancelled()
+        q_minus = [c if i % 2 == 0 else -c for i, c in enumerate(q)]
+        p = multiply_signed(p, q_minus)[n % 2 :: 2]
+        q = multiply_signed(q, q_minus)[::2]
+        n //= 2
+        p = p[: n + 1]
+
+    return p[0] if p else 0
+
+
+def _split_signs(coeffs: List[int]) -> Tuple[List[int], List[int]]:
+    return [max(c, 0) for c in coeffs], [max(-c, 0) for c in coeffs]
+
+
+def _add(first: List[int], second: List[int]) -> List[int]:
+    if len(first) < len(second):
+        first, second = second, first
+    return [a + b for a, b in zip(first, second)] + first[len(second) :]
+
+
+def _pack(coeffs: List[int], width: int) -> int:
+    return int.from_bytes(b"".join(c.to_bytes(width, "little") for c in coeffs), "little")
+
+
+def _unpack(packed: int, width: int, length: int) -> List[int]:
+    packed &= (1 << (8 * width * length)) - 1
+    data = packed.to_bytes(width * length, "little")
+    return [int.from_bytes(data[i : i + width], "little") for i in range(0, len(data), width)]
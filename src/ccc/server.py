@@ -0,0 +1,313 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ccc import evaluate
+from ccc.errors import CollectionError, ConstraintError, ConstraintNotImplementedError
+from ccc.util.cancellation import run_cancellable
+from ccc.util.constraints import process_constraint_string
+from ccc.util.collection import process_collection_string
+from ccc.util.output import format_number
+
+
+class QueryError(Exception):
+    """
+    A parameter of the query is missing or has the wrong type.
+    """
+
+
+# Errors raised by bad queries: reported back to the client as a 400. Any
+# other error is a bug, and is reported as a 500.
+QUERY_ERRORS = (
+    QueryError,
+    CollectionError,
+    ConstraintError,
+    ConstraintNotImplementedError,
+)
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    504: "Gateway Timeout",
+}
+
+
+def _integer(params: Dict[str, Any], key: str) -> int:
+    value = params.get(key)
+
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise QueryError(f"'{key}' must be an integer, got {value!r}")
+
+    return value
+
+
+def _string(params: Dict[str, Any], key: str, required: bool = False) -> Optional[str]:
+    value = params.get(key)
+
+    if value is None and not required:
+        return None
+
+    if not isinstance(value, str):
+        raise QueryError(f"'{key}' must be a string, got {value!r}")
+
+    return value
+
+
+def _collection(
+    params: Dict[str, Any], key: str, required: bool = False
+) -> Optional[Dict[str, int]]:
+    collection = _string(params, key, required)
+    if collection is None:
+        return None
+    return process_collection_string(collection)
+
+
+def _constraints(params: Dict[str, Any], required: bool = False) -> Optional[evaluate.Disjuncts]:
+    constraints = _string(params, "where", required)
+    if constraints is None:
+        return None
+    return process_constraint_string(constraints)
+
+
+def _sequence(params: Dict[str, Any]) -> Any:
+    if params.get("counts") is not None:
+        return _collection(params, "counts")
+    return _string(params, "sequence", required=True)
+
+
+def _count_multisets(params: Dict[str, Any]) -> Any:
+    collection = _collection(params, "collection")
+    constraints = _constraints(params)
+
+    if collection is None and constraints is None:
+        raise QueryError("Give 'collection', 'where', or both")
+
+    return evaluate.count_multisets(_integer(params, "size"), collection, constraints)
+
+
+def _count_draws(params: Dict[str, Any]) -> Any:
+    return evaluate.count_draws(
+        _integer(params, "size"), _collection(params, "collection", True), _constraints(params)
+    )
+
+
+def _count_sequences(params: Dict[str, Any]) -> Any:
+    return evaluate.count_sequences(
+        _integer(params, "size"), _collection(params, "collection"), _constraints(params, True)
+    )
+
+
+def _count_permutations(params: Dict[str, Any]) -> Any:
+    return evaluate.count_permutations(
+        _sequence(params), _constraints(params), bool(params.get("same_distinct", False))
+    )
+
+
+def _probability_draw(params: Dict[str, Any]) -> Any:
+    return evaluate.probability_draw(
+        _integer(params, "number"),
+        _collection(params, "from", True),
+        _constraints(params, True),
+        bool(params.get("replace", False)),
+    )
+
+
+def _probability_permutation(params: Dict[str, Any]) -> Any:
+    return evaluate.probability_permutation(
+        _sequence(params), _constraints(params, True), bool(params.get("same_distinct", False))
+    )
+
+
+# Each path takes the same parameters as the corresponding command-line
+# options, and requires the same ones
+ROUTES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "/count/multisets": _count_multisets,
+    "/count/draws": _count_draws,
+    "/count/sequences": _count_sequences,
+    "/count/permutations": _count_permutations,
+    "/probability/draw": _probability_draw,
+    "/probability/permutation": _probability_permutation,
+}
+
+
+def run_query(path: str, params: Dict[str, Any], cancelled: Any = None) -> Dict[str, Any]:
+    """
+    Evaluate a single query. This runs inside a worker process, and stops
+    (raising EvaluationCancelled) once the cancelled event is set.
+
+    The exact answer is returned as a string (it may not fit in a JSON
+    number), written with format_number so that answers of any size can
+    be converted. Probabilities are also given as a float.
+    """
+    if cancelled is None:
+        cancelled = threading.Event()
+
+    answer = run_cancellable(cancelled, ROUTES[path], params)
+    result = {"result": format_number(answer)}
+
+    if path.startswith("/probability"):
+        result["float"] = float(answer)
+
+    return result
+
+
+class _InFlight:
+    """
+    A query being evaluated, and how many requests are waiting for it.
+    """
+
+    def __init__(self, future: asyncio.Future, cancelled: Any) -> None:
+        self.future = future
+        self.cancelled = cancelled
+        self.waiting = 0
+
+
+def _discard(future: asyncio.Future) -> None:
+    # retrieve the EvaluationCancelled of a query nobody is waiting for
+    if not future.cancelled():
+        future.exception()
+
+
+class QueryServer:
+    """
+    Serve count and probability queries as JSON over HTTP.
+
+    Queries are evaluated by the executor (usually a process pool) so
+    that the event loop stays responsive. Identical queries that arrive
+    while one is already being evaluated wait for the same result.
+
+    A query that every request has stopped waiting for is cancelled by
+    setting an event made by new_event. The event must reach the worker
+    evaluating the query, so a process pool needs events made by a
+    multiprocessing manager. Engines check for cancellation between
+    multiplications, so the worker is freed once the multiplication in
+    progress is done.
+
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        timeout: Optional[float] = None,
+        new_event: Callable[[], Any] = threading.Event,
+    ) -> None:
+        self.executor = executor
+        self.timeout = timeout
+        self.new_event = new_event
+        self._in_flight: Dict[Tuple[str, str], _InFlight] = {}
+
+    async def evaluate(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate the query, sharing the work with any identical query
+        already in flight. Raises asyncio.TimeoutError if the answer
+        is not ready within the timeout.
+        """
+        key = (path, json.dumps(params, sort_keys=True))
+        query = self._in_flight.get(key)
+
+        if query is None:
+            loop = asyncio.get_running_loop()
+            cancelled = self.new_event()
+            future = loop.run_in_executor(self.executor, run_query, path, params, cancelled)
+            query = self._in_flight[key] = _InFlight(future, cancelled)
+            future.add_done_callback(lambda _: self._forget(key, query))
+
+        query.waiting += 1
+
+        try:
+            # a timeout abandons this request, not the computation other requests share
+            return await asyncio.wait_for(asyncio.shield(query.future), self.timeout)
+        finally:
+            query.waiting -= 1
+
+            if not query.waiting and not query.future.done():
+                # no request is waiting for the answer, so stop computing it
+                query.cancelled.set()
+                query.future.add_done_callback(_discard)
+                self._forget(key, query)
+
+    def _forget(self, key: Tuple[str, str], query: _InFlight) -> None:
+        # a cancelled query may finish after an identical one has replaced it
+        if self._in_flight.get(key) is query:
+            del self._in_flight[key]
+
+    async def respond(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """
+        Compute the HTTP status code and JSON response for a request.
+        """
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+
+        if path not in ROUTES:
+            return 404, {"error": f"Unknown path '{path}'"}
+
+        if method != "POST":
+            return 405, {"error": "Queries must be sent using POST"}
+
+        try:
+            params = json.loads(body.decode() or "{}")
+        except ValueError:
+            return 400, {"error": "Request body must be a JSON object"}
+
+        if not isinstance(params, dict):
+            return 400, {"error": "Request body must be a JSON object"}
+
+        try:
+            return 200, await self.evaluate(path, params)
+        except asyncio.TimeoutError:
+            return 504, {"error": f"Query did not finish within {self.timeout} seconds"}
+        except QUERY_ERRORS as err:
+            return 400, {"error": f"{type(err).__name__}: {err}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Read one HTTP request from the connection and write the response.
+
+        The connection is always closed, and any error the query did not
+        anticipate is reported as a 500 rather than left unanswered.
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if len(request_line) == 3:
+                method, path, _ = request_line
+                status, response = await self.respond(method.upper(), path, body)
+            else:
+                status, response = 400, {"error": "Malformed request line"}
+
+        except (ValueError, asyncio.IncompleteReadError):
+            status, response = 400, {"error": "Malformed request"}
+
+        except Exception as err:  # pylint: disable=broad-except
+            status, response = 500, {"error": f"{type(err).__name__}: {err}"}
+
+        payload = json.dumps(response).encode()
+
+        try:
+            writer.write(
+                (
+                    f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+                + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
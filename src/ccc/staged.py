@@ -0,0 +1,167 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sympy import Rational
+
+from ccc.draw import Draw
+from ccc.tables import binomial, factorial
+from ccc.util.cancellation import check_cancelled
+from ccc.util.degrees import Degrees
+
+# Counts of an item (or a total) drawn at each stage
+Cell = Tuple[int, ...]
+
+
+class StagedDraw:
+    """
+    Track ways of drawing from the collection in stages, without
+    replacement, such that the items drawn at each stage meet that
+    stage's constraints.
+
+    Each stage is given as its size and its constraints. Items are
+    drawn at each stage from whatever the earlier stages left.
+
+    """
+
+    def __init__(
+        self, collection: Dict[str, int], stages: Sequence[Tuple[int, Optional[List[Tuple]]]]
+    ) -> None:
+
+        if not stages:
+            raise ValueError("there must be at least one stage")
+
+        self._collection = collection
+        self.sizes: Cell = tuple(size for size, _ in stages)
+
+        if sum(self.sizes) > sum(collection.values()):
+            raise ValueError("the stages draw more items than are in the collection")
+
+        # each stage on its own normalises the degrees of its constrained items
+        self._draws = [Draw(size, collection, constraints) for size, constraints in stages]
+
+    def is_feasible(self) -> bool:
+        """
+        Whether the items drawn at every stage can meet its constraints
+        (considering each stage on its own).
+        """
+        return all(draw.is_feasible() for draw in self._draws)
+
+    def stage_degrees(self) -> Dict[str, List[Degrees]]:
+        """
+        For each item constrained at any stage, the degrees it can take
+        at each stage.
+        """
+        constrained = [draw.constrained_degrees() for draw in self._draws]
+        items = [item for item in self._collection if any(item in c for c in constrained)]
+
+        return {
+            item: [
+                degrees.get(item, range(min(self._collection[item], size) + 1))
+                for degrees, size in zip(constrained, self.sizes)
+            ]
+            for item in items
+        }
+
+    def count(self) -> int:
+        """
+        Count the ways of drawing the stages (as sets of items at each
+        stage) that meet the constraints.
+
+        Each item has a factor in as many variables as there are stages:
+        drawing k_1, k_2, ... of an item with count n at the stages can be
+        done in n! / (k_1! k_2! ... (n - k_1 - k_2 - ...)!) ways. The
+        product of the factors is truncated to the size of each stage.
+        Items that no stage constrains are pooled, and only the cells of
+        the pool's factor that complete the sizes are computed.
+        """
+        if not self.is_feasible():
+            return 0
+
+        degrees = self.stage_degrees()
+        product: Dict[Cell, int] = {tuple(0 for _ in self.sizes): 1}
+
+        for item, degree_sets in degrees.items():
+            check_cancelled()
+            product = _truncated_product(
+                product, _stage_factor(self._collection[item], degree_sets), self.sizes
+            )
+
+        pooled = sum(count for item, count in self._collection.items() if item not in degrees)
+
+        return sum(
+            value * _multinomial(pooled, tuple(s - k for s, k in zip(self.sizes, cell)))
+            for cell, value in product.items()
+        )
+
+    def probability(self) -> Rational:
+        """
+        Probability that drawing the stages from the collection meets the
+        constraints of every stage.
+        """
+        total = _multinomial(sum(self._collection.values()), self.sizes)
+        return Rational(self.count(), total)
+
+    def signature(self) -> Tuple:
+        """
+        Hashable description of the sizes and the degrees of each item at
+        each stage: stages with equal signatures give the same count.
+        """
+        return (self.sizes,) + tuple(
+            (item, tuple(d if isinstance(d, range) else frozenset(d) for d in degree_sets))
+            for item, degree_sets in self.stage_degrees().items()
+        )
+
+
+def _stage_factor(count: int, degree_sets: List[Degrees]) -> Dict[Cell, int]:
+    """
+    The ways of drawing k_1, k_2, ... of an item with the given count at
+    each stage, for each k_i in the degrees of the stage.
+    """
+    factor: Dict[Cell, int] = {(): 1}
+
+    for degrees in degree_sets:
+        extended = {}
+
+        for cell, value in factor.items():
+            remaining = count - sum(cell)
+            for k in degrees:
+                if k <= remaining:
+                    extended[cell + (k,)] = value * binomial(remaining, k)
+
+        factor = extended
+
+    return factor
+
+
+def _truncated_product(
+    first: Dict[Cell, int], second: Dict[Cell, int], sizes: Cell
+) -> Dict[Cell, int]:
+    """
+    Product of two factors, keeping only the cells within the sizes.
+    """
+    product: Dict[Cell, int] = {}
+
+    for cell, value in first.items():
+        for other, coefficient in second.items():
+            total = tuple(a + b for a, b in zip(cell, other))
+
+            if all(t <= s for t, s in zip(total, sizes)):
+                product[total] = product.get(total, 0) + value * coefficient
+
+    return product
+
+
+def _multinomial(count: int, cell: Cell) -> int:
+    """
+    Ways of drawing the counts in the cell at each stage from count items
+    (which are not told apart).
+    """
+    drawn = sum(cell)
+
+    if drawn > count:
+        return 0
+
+    denominator = factorial(count - drawn)
+    for k in cell:
+        denominator *= factorial(k)
+
+    return factorial(count) // denominator
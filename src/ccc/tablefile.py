@@ -0,0 +1,157 @@
+import mmap
+import struct
+import sys
+from array import array
+from math import lgamma
+from typing import Dict, Iterable, Sequence, Tuple
+
+from ccc.util.misc import is_prime
+
+# A table file holds, for every n below its size:
+#
+#   - log(n!) as a float64
+#   - n! and the inverse of n! modulo each of its primes, as uint64
+#   - n! exactly if n is a multiple of the stride, as little-endian bytes
+#     located by a table of offsets
+#
+# Storing every exact n! would make the file quadratic in its size; any
+# other factorial is found from the one below it with fewer than stride
+# multiplications.
+#
+# All numbers are little-endian (the byte order of the machines that can
+# map the file). The file starts with a fixed header, then the moduli:
+_MAGIC = b"ccc-tables\x00\x00\x00\x00\x00\x03"
+_HEADER = struct.Struct("<QQQ")  # size, stride, number of moduli
+_WORD = 8
+
+# Distance between the factorials stored in a table file
+DEFAULT_STRIDE = 1024
+
+
+class TableFile:
+    """
+    A table file mapped read-only into memory.
+
+    Nothing is read until it is looked up, and the numbers are used in
+    place (except exact factorials, which are turned into Python ints
+    when looked up). Every process that maps the same file shares the
+    operating system's single copy of its pages.
+    """
+
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != "little":
+            raise ValueError("Table files can only be mapped on little-endian machines")
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+
+        if bytes(view[: len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"'{path}' is not a ccc table file")
+
+        offset = len(_MAGIC)
+        self.size, self.stride, count = _HEADER.unpack_from(view, offset)
+        offset += _HEADER.size
+
+        if self.stride < 1:
+            raise ValueError(f"'{path}' is not a complete ccc table file")
+
+        moduli = view[offset : offset + count * _WORD].cast("Q")
+        offset += count * _WORD
+
+        self.log_factorials: Sequence[float] = view[offset : offset + self.size * _WORD].cast("d")
+        offset += self.size * _WORD
+
+        # modulus -> (factorials, inverse factorials) reduced modulo that prime
+        self.modular: Dict[int, Tuple[Sequence[int], Sequence[int]]] = {}
+
+        for modulus in moduli:
+            factorials = view[offset : offset + self.size * _WORD].cast("Q")
+            offset += self.size * _WORD
+            inverses = view[offset : offset + self.size * _WORD].cast("Q")
+            offset += self.size * _WORD
+            self.modular[modulus] = factorials, inverses
+
+        # the offsets of the factorials (relative to the first) are last in the file
+        checkpoints = -(-self.size // self.stride)
+        end = len(view) - (checkpoints + 1) * _WORD
+        self._offsets = view[end:].cast("Q")
+        self._factorials = view[offset:end]
+
+        if len(self._factorials) != self._offsets[-1]:
+            raise ValueError(f"'{path}' is not a complete ccc table file")
+
+    def checkpoint(self, n: int) -> Tuple[int, int]:
+        """
+        The largest k <= n whose factorial is stored (n must be below
+        the size), and k!.
+        """
+        index = n // self.stride
+        start, stop = self._offsets[index], self._offsets[index + 1]
+        return index * self.stride, int.from_bytes(self._factorials[start:stop], "little")
+
+
+def build_table_file(
+    path: str, size: int, stride: int = DEFAULT_STRIDE, moduli: Iterable[int] = ()
+) -> None:
+    """
+    Write a table file with entries for every n below size, including
+    factorials modulo each of the moduli (which must be primes, at least
+    size and below 2**64).
+
+    The exact factorials of every multiple of the stride take most of the
+    space: about size**2 * log(size) / (16 * stride) bytes.
+    """
+    if stride < 1:
+        raise ValueError(f"stride must be positive, got {stride}")
+
+    moduli = sorted(set(moduli))
+
+    for modulus in moduli:
+        if modulus < size or modulus >= 2 ** 64:
+            raise ValueError(f"modulus {modulus} must be at least {size} and below 2**64")
+        if not is_prime(modulus):
+            raise ValueError(f"modulus {modulus} is not prime")
+
+    with open(path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(_HEADER.pack(size, stride, len(moduli)))
+        _write_words(f, "Q", moduli)
+        _write_words(f, "d", [lgamma(n + 1) for n in range(size)])
+
+        for modulus in moduli:
+            factorials = [1] * size
+            for n in range(1, size):
+                factorials[n] = factorials[n - 1] * n % modulus
+
+            inverses = [1] * size
+            if size:
+                inverses[-1] = pow(factorials[-1], modulus - 2, modulus)
+            for n in range(size - 1, 0, -1):
+                inverses[n - 1] = inverses[n] * n % modulus
+
+            _write_words(f, "Q", factorials)
+            _write_words(f, "Q", inverses)
+
+        offsets = [0]
+        value = 1
+
+        for n in range(size):
+            if n:
+                value *= n
+            if n % stride == 0:
+                data = value.to_bytes((value.bit_length() + 7) // 8, "little")
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+
+        _write_words(f, "Q", offsets)
+
+
+def _write_words(f, typecode: str, values: Sequence) -> None:
+    words = array(typecode, values)
+
+    if sys.byteorder != "little":
+        words.byteswap()
+
+    f.write(words.tobytes())
@@ -0,0 +1,235 @@
+import math
+import os
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ccc.tablefile import TableFile
+from ccc.util.misc import is_prime
+
+# Tables shared by all engines. Each grows on demand and is kept for the
+# lifetime of the process, so factorials are never recomputed term by
+# term. Keeping every exact k! up to n would take O(n**2 log n) bits, so
+# only those below FACTORIAL_CACHE_SIZE are kept: larger ones are
+# computed when asked for. The other tables hold one machine-sized
+# number per entry, so they are kept up to LOG_FACTORIAL_CACHE_SIZE (log
+# factorials) or up to the modulus (modular factorials).
+#
+# A table is never changed in place: a copy at least twice as long is
+# built and then published by rebinding the name (or dictionary entry),
+# which is atomic. Threads reading a table always see a consistent list,
+# and threads that grow a table at the same time at worst repeat each
+# other's work.
+FACTORIAL_CACHE_SIZE = 1024
+LOG_FACTORIAL_CACHE_SIZE = 1 << 20
+
+_factorials: List[int] = [1]
+_log_factorials: Sequence[float] = array("d", [0.0])
+
+# modulus -> (factorials, inverse factorials) reduced modulo that prime
+_modular_tables: Dict[int, Tuple[Sequence[int], Sequence[int]]] = {}
+
+# Precomputed tables mapped from a file (see map_tables), looked up
+# before any factorial is computed
+_mapped: Optional[TableFile] = None
+
+
+def map_tables(path: Optional[str]) -> None:
+    """
+    Look up factorials (exact, logarithms and modular) in the table file
+    at the path (made by build_table_file) before computing them, or
+    stop if path is None.
+
+    Worker processes map the file when they start if the CCC_TABLES
+    environment variable gives its path, so they share the one copy.
+    """
+    global _mapped
+    _mapped = None if path is None else TableFile(path)
+
+
+def factorial(n: int) -> int:
+    """
+    Exact value of n!
+    """
+    global _factorials
+
+    if n < 0:
+        raise ValueError(f"factorial is not defined for negative integers, got {n}")
+
+    table = _factorials
+
+    if n < len(table):
+        return table[n]
+
+    mapped = _mapped
+
+    if mapped is not None and n < mapped.size:
+        start, value = mapped.checkpoint(n)
+        return value * _range_product(start + 1, n + 1)
+
+    if n >= FACTORIAL_CACHE_SIZE:
+        return math.factorial(n)
+
+    # at least double the table, so that asking for gradually larger n
+    # copies it only O(log n) times
+    start = len(table)
+    stop = min(max(n + 1, 2 * start), FACTORIAL_CACHE_SIZE)
+    table = table + [0] * (stop - start)
+    for i in range(start, stop):
+        table[i] = table[i - 1] * i
+    _factorials = table
+
+    return table[n]
+
+
+def log_factorial(n: int) -> float:
+    """
+    Natural logarithm of n! as a float.
+    """
+    global _log_factorials
+
+    if n < 0:
+        raise ValueError(f"factorial is not defined for negative integers, got {n}")
+
+    table = _log_factorials
+
+    if n < len(table):
+        return table[n]
+
+    mapped = _mapped
+
+    if mapped is not None and n < mapped.size:
+        return mapped.log_factorials[n]
+
+    if n >= LOG_FACTORIAL_CACHE_SIZE:
+        return math.lgamma(n + 1)
+
+    stop = min(max(n + 1, 2 * len(table)), LOG_FACTORIAL_CACHE_SIZE)
+    table = table + array("d", (math.lgamma(i + 1) for i in range(len(table), stop)))
+    _log_factorials = table
+
+    return table[n]
+
+
+def factorial_mod(n: int, modulus: int) -> int:
+    """
+    Value of n! reduced modulo a prime (which must exceed n).
+    """
+    return _grow_modular_tables(n, modulus)[0][n]
+
+
+def inverse_factorial_mod(n: int, modulus: int) -> int:
+    """
+    Multiplicative inverse of n! modulo a prime (which must exceed n).
+    """
+    return _grow_modular_tables(n, modulus)[1][n]
+
+
+def binomial_mod(n: int, k: int, modulus: int) -> int:
+    """
+    Value of binomial(n, k) reduced modulo a prime (which must exceed n).
+    """
+    if k < 0 or k > n:
+        return 0
+
+    factorials, inverses = _grow_modular_tables(n, modulus)
+    return factorials[n] * inverses[k] % modulus * inverses[n - k] % modulus
+
+
+def binomial(n: int, k: int) -> int:
+    """
+    Exact value of binomial(n, k) for non-negative n.
+
+    The falling factorial n * (n - 1) * ... * (n - k + 1) is formed by
+    binary splitting, then divided by k! from the factorial table.
+    """
+    if k < 0 or k > n:
+        return 0
+
+    k = min(k, n - k)
+    return _range_product(n - k + 1, n + 1) // factorial(k)
+
+
+def binomial_row(n: int, max_k: int) -> List[int]:
+    """
+    The binomial coefficients binomial(n, k) for k = 0, 1, ..., max_k.
+
+    Consecutive entries are related by
+
+        binomial(n, k + 1) = binomial(n, k) * (n - k) / (k + 1)
+
+    so the row costs one multiplication and one exact division per
+    entry. Entries with k > n are zero.
+    """
+    row = [0] * (max_k + 1)
+    coeff = 1
+
+    for k in range(min(n, max_k) + 1):
+        row[k] = coeff
+        coeff = coeff * (n - k) // (k + 1)
+
+    return row
+
+
+def _range_product(start: int, stop: int) -> int:
+    """
+    Product of the integers in range(start, stop), split recursively so
+    that the large multiplications are between numbers of similar size.
+    """
+    if stop - start <= 16:
+        result = 1
+        for i in range(start, stop):
+            result *= i
+        return result
+
+    middle = (start + stop) // 2
+    return _range_product(start, middle) * _range_product(middle, stop)
+
+
+def _grow_modular_tables(n: int, modulus: int) -> Tuple[Sequence[int], Sequence[int]]:
+    """
+    Return the factorial and inverse factorial tables for the modulus,
+    first extending them (at least doubling them) so they contain
+    entries up to n, unless the mapped file already does.
+    """
+    if n >= modulus:
+        raise ValueError(f"modulus {modulus} must be larger than {n}")
+
+    mapped = _mapped
+
+    if mapped is not None and n < mapped.size and modulus in mapped.modular:
+        return mapped.modular[modulus]
+
+    tables = _modular_tables.get(modulus)
+
+    if tables is None:
+        if not is_prime(modulus):
+            raise ValueError(f"modulus {modulus} is not prime")
+        tables = [1], [1]
+
+    factorials, inverses = tables
+    start = len(factorials)
+
+    if n < start:
+        return tables
+
+    stop = min(max(n + 1, 2 * start), modulus)
+    factorials = list(factorials) + [0] * (stop - start)
+
+    for i in range(start, stop):
+        factorials[i] = factorials[i - 1] * i % modulus
+
+    # one modular inversion for the top entry, then work back down
+    new_inverses = [0] * (stop - start)
+    inverse = pow(factorials[stop - 1], modulus - 2, modulus)
+
+    for i in range(stop - 1, start - 1, -1):
+        new_inverses[i - start] = inverse
+        inverse = inverse * i % modulus
+
+    tables = factorials, list(inverses) + new_inverses
+    _modular_tables[modulus] = tables
+    return tables
+
+
+if os.environ.get("CCC_TABLES"):
+    map_tables(os.environ["CCC_TABLES"])
@@ -0,0 +1,37 @@
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+from ccc.errors import EvaluationCancelled
+
+# Set while an evaluation that can be cancelled is running in this thread
+_cancelled: ContextVar[Optional[threading.Event]] = ContextVar("cancelled", default=None)
+
+
+def check_cancelled() -> None:
+    """
+    Raise EvaluationCancelled if the evaluation running in this thread
+    has been cancelled.
+
+    Engines call this between multiplications, so a cancelled evaluation
+    stops after the multiplication in progress rather than running on.
+    Outside of run_cancellable it does nothing.
+    """
+    event = _cancelled.get()
+
+    if event is not None and event.is_set():
+        raise EvaluationCancelled("Evaluation was cancelled")
+
+
+def run_cancellable(event: threading.Event, function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call the function, stopping it at its next check_cancelled once the
+    event is set.
+    """
+    token = _cancelled.set(event)
+
+    try:
+        check_cancelled()
+        return function(*args)
+    finally:
+        _cancelled.reset(token)
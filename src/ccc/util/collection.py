@@ -1,5 +1,8 @@
 import ast
-from typing import Dict, Tuple
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 from ccc.errors import CollectionError
 
@@ -40,7 +43,10 @@ def process_collection_string(collection_string: str) -> Dict[str, int]:
     """
     item_counts: Dict[str, int] = {}
 
-    nodes = ast.parse(collection_string).body
+    try:
+        nodes = ast.parse(collection_string).body
+    except SyntaxError:
+        raise CollectionError("Invalid syntax in collection string")
 
     for node in nodes:
 
@@ -57,3 +63,133 @@ def process_collection_string(collection_string: str) -> Dict[str, int]:
             raise CollectionError(f"Item '{item}' has multiple counts assigned")
 
     return item_counts
+
+
+def read_collection_string(collection: str) -> Dict[str, int]:
+    """
+    Process a string with counts of items in the collection, or if the
+    string is the path of a file, the contents of that file.
+
+    """
+    if os.path.isfile(collection):
+        with open(collection) as f:
+            collection = f.read()
+
+    return process_collection_string(collection)
+
+
+def read_collection_file(path: str) -> Dict[str, int]:
+    """
+    Read the counts of items in a collection from a file, checking
+    each count (and that no item is repeated) as it is read.
+
+    The format is given by the file extension:
+
+        .csv   - rows of item,count (a first row whose count is not a
+                 number, such as item,count, is skipped as a header)
+        .json  - an object mapping each item to its count
+        .jsonl - one {"item": ..., "count": ...} object, or one
+                 [item, count] array, per line
+
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    with open(path, newline="") as f:
+
+        if extension == ".csv":
+            return _collect(_csv_rows(f))
+
+        try:
+            if extension == ".json":
+                item_counts = json.load(f, object_pairs_hook=_collect)
+                if not isinstance(item_counts, dict):
+                    raise CollectionError("A .json collection must be an object of item counts")
+                return item_counts
+
+            if extension == ".jsonl":
+                return _collect(_jsonl_rows(f))
+
+        except json.JSONDecodeError as err:
+            raise CollectionError(f"Collection file '{path}' is not valid JSON: {err}")
+
+    raise CollectionError(f"Collection files must be .csv, .json or .jsonl, got '{path}'")
+
+
+def load_collection(
+    collection_string: Optional[str], path: Optional[str]
+) -> Optional[Dict[str, int]]:
+    """
+    Return the counts of items given either as a string or in a file,
+    or None if neither is given.
+
+    """
+    if collection_string is not None and path is not None:
+        raise CollectionError("Give the collection either as a string or as a file, not both")
+
+    if path is not None:
+        return read_collection_file(path)
+
+    if collection_string is not None:
+        return process_collection_string(collection_string)
+
+    return None
+
+
+def _collect(rows: Iterable[Tuple[Any, Any]]) -> Dict[str, int]:
+    item_counts: Dict[str, int] = {}
+
+    for item, count in rows:
+
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            raise CollectionError(f"Item counts must be positive integers, got {count}")
+
+        # items are named by strings, so 1 and "1" are the same item
+        item = str(item)
+
+        if item in item_counts:
+            raise CollectionError(f"Item '{item}' has multiple counts assigned")
+
+        item_counts[item] = count
+
+    return item_counts
+
+
+def _csv_rows(lines: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+    for number, row in enumerate(csv.reader(lines)):
+
+        if not row:
+            continue
+
+        if len(row) != 2:
+            raise CollectionError(f"Expected item,count on line {number + 1}, got {row}")
+
+        item, count = row[0].strip(), row[1].strip()
+
+        try:
+            yield item, int(count)
+        except ValueError:
+            if number == 0 and any(c.isdigit() for c in count):
+                raise CollectionError(
+                    f"Item counts must be positive integers, got {count} on line 1 "
+                    "(only a first row whose count is not a number is skipped as a header)"
+                )
+            if number > 0:
+                raise CollectionError(
+                    f"Item counts must be positive integers, got {count} on line {number + 1}"
+                )
+
+
+def _jsonl_rows(lines: Iterable[str]) -> Iterator[Tuple[Any, Any]]:
+    for number, line in enumerate(lines):
+
+        if not line.strip():
+            continue
+
+        row = json.loads(line)
+
+        if isinstance(row, dict) and row.keys() == {"item", "count"}:
+            yield row["item"], row["count"]
+        elif isinstance(row, list) and len(row) == 2:
+            yield row[0], row[1]
+        else:
+            raise CollectionError(f"Expected an item and count on line {number + 1}, got {row}")
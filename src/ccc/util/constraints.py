@@ -241,3 +241,39 @@ def process_constraint_string(constraint_string: str) -> List[List[AnyConstraint
         return [[(node.id,)]]
 
     raise ConstraintError(f"Invalid constraint: {constraint_string}")
+
+
+# Mappings from constraint ops back to the operators used to write them
+OP_SYMBOLS = {
+    "lt": "<",
+    "le": "<=",
+    "gt": ">",
+    "ge": ">=",
+    "eq": "==",
+    "ne": "!=",
+    "in": "in",
+    "not_in": "not in",
+}
+
+
+def constraint_to_string(constraint: AnyConstraintType) -> str:
+    """
+    Write a processed constraint the way it could be written in a
+    constraint string, e.g.:
+
+        ("le", "red", 3) -> "red <= 3"
+
+    """
+    op, *args = constraint
+
+    if op in OP_SYMBOLS:
+        item, number = args
+        if isinstance(number, (list, tuple)):
+            number = f"({', '.join(str(n) for n in number)})"
+        return f"{item} {OP_SYMBOLS[op]} {number}"
+
+    if op == "mod":
+        item, mod, rem = args
+        return f"{item} % {mod} == {rem}"
+
+    return op
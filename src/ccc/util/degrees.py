@@ -0,0 +1,170 @@
+from typing import AbstractSet, List, Optional, Set, Tuple, Union
+
+# The degrees an item may take are held either as a range (possibly with
+# a step), which is never materialised, or as an explicit set of integers.
+Degrees = Union[range, AbstractSet[int]]
+
+
+def intersect_degrees(first: Degrees, second: Degrees) -> Degrees:
+    """
+    Intersect two collections of degrees, keeping the result as a
+    range if both arguments are ranges.
+
+    """
+    if isinstance(first, range) and isinstance(second, range):
+        return intersect_ranges(first, second)
+
+    if len(second) < len(first):
+        first, second = second, first
+
+    return {degree for degree in first if degree in second}
+
+
+def subtract_degrees(degrees: Degrees, numbers: AbstractSet[int]) -> Set[int]:
+    """
+    Remove the numbers from the collection of degrees.
+
+    """
+    return set(degrees) - set(numbers)
+
+
+def intersect_ranges(first: range, second: range) -> range:
+    """
+    Intersect two ranges with positive steps, e.g.:
+
+        range(1, 20, 3), range(0, 12, 2) -> range(4, 12, 6)
+
+    The common terms of two arithmetic progressions form another
+    arithmetic progression (found using the Chinese remainder theorem).
+
+    """
+    if not first or not second:
+        return range(0)
+
+    start_1, step_1 = first.start, first.step
+    start_2, step_2 = second.start, second.step
+
+    g, inverse, _ = _extended_gcd(step_1, step_2)
+
+    if (start_2 - start_1) % g:
+        return range(0)
+
+    # x = start_1 + step_1 * t solves both congruences for this t
+    step = step_1 // g * step_2
+    t = (start_2 - start_1) // g * inverse % (step_2 // g)
+    solution = start_1 + step_1 * t
+
+    lowest = max(start_1, start_2)
+    start = solution + -((solution - lowest) // step) * step
+
+    stop = min(first.stop, second.stop)
+    return range(start, max(start, stop), step)
+
+
+def clip_degrees(degrees: Degrees, highest: int) -> Degrees:
+    """
+    Restrict the degrees to those between 0 and highest (inclusive).
+
+    """
+    if isinstance(degrees, range):
+        return intersect_ranges(degrees, range(highest + 1))
+
+    return {degree for degree in degrees if 0 <= degree <= highest}
+
+
+def tighten_degrees(degree_sets: List[Degrees], total: int) -> List[Degrees]:
+    """
+    Remove degrees that cannot appear when one degree is chosen from each
+    collection and the chosen degrees sum to total.
+
+    Each degree must be at least the total minus the highest degrees of
+    the other collections, and at most the total minus their lowest
+    degrees. Tightening one collection can tighten the others, so this
+    is repeated until nothing changes. If no choice can sum to the total,
+    every collection is returned empty:
+
+        [range(0, 11), {2, 5}], 6 -> [range(1, 5), {2, 5}]
+
+    """
+    degree_sets = list(degree_sets)
+    infeasible: List[Degrees] = [range(0)] * len(degree_sets)
+
+    while True:
+
+        if not all(degree_sets):
+            return infeasible
+
+        lows = [lowest_degree(degrees) for degrees in degree_sets]
+        highs = [highest_degree(degrees) for degrees in degree_sets]
+
+        low_sum, high_sum = sum(lows), sum(highs)
+
+        if low_sum > total or high_sum < total:
+            return infeasible
+
+        changed = False
+
+        for i, degrees in enumerate(degree_sets):
+            low = max(lows[i], total - (high_sum - highs[i]))
+            high = min(highs[i], total - (low_sum - lows[i]))
+
+            if (low, high) != (lows[i], highs[i]):
+                degree_sets[i] = intersect_degrees(degrees, range(low, high + 1))
+                changed = True
+
+        if not changed:
+            return degree_sets
+
+
+def lowest_degree(degrees: Degrees) -> int:
+    return degrees[0] if isinstance(degrees, range) else min(degrees)
+
+
+def highest_degree(degrees: Degrees) -> int:
+    return degrees[-1] if isinstance(degrees, range) else max(degrees)
+
+
+def freeze_degrees(degrees: Degrees) -> Degrees:
+    """
+    The degrees as an immutable, hashable value: a range is kept, and a
+    set becomes a frozenset.
+
+    """
+    return degrees if isinstance(degrees, range) else frozenset(degrees)
+
+
+def interval_bounds(degrees: Degrees) -> Optional[Tuple[int, int]]:
+    """
+    Return the (lowest, highest) degrees if the degrees form a
+    contiguous interval of integers, otherwise None.
+
+    """
+    if not degrees:
+        return None
+
+    if isinstance(degrees, range):
+        if degrees.step == 1 or len(degrees) == 1:
+            return degrees[0], degrees[-1]
+        return None
+
+    lowest, highest = min(degrees), max(degrees)
+
+    if highest - lowest + 1 == len(degrees):
+        return lowest, highest
+
+    return None
+
+
+def _extended_gcd(a: int, b: int) -> Tuple[int, int, int]:
+    """
+    Return (g, x, y) such that a*x + b*y == g == gcd(a, b).
+
+    """
+    x0, x1, y0, y1 = 1, 0, 0, 1
+
+    while b:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+
+    return a, x0, y0
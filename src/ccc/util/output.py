@@ -0,0 +1,164 @@
+import decimal
+import math
+from typing import Dict, Tuple, Union
+
+from sympy import Rational
+
+# Ways in which an answer can be written out
+OUTPUT_FORMATS = ("decimal", "sci", "hex", "digits", "log10")
+
+# Integers with fewer bits than this are converted to decimal directly
+_DIRECT_BITS = 3000
+
+_LOG10_2 = math.log10(2)
+
+
+def format_number(value: Union[int, Rational], style: str = "decimal", precision: int = 10) -> str:
+    """
+    Write an integer or rational answer in the given style:
+
+        decimal - every digit (numerator/denominator for rationals)
+        sci     - scientific notation with precision significant digits
+        hex     - hexadecimal
+        digits  - the number of decimal digits (of the numerator and
+                  denominator for rationals)
+        log10   - the base 10 logarithm
+
+    None of these convert the whole number using int.__str__, which is
+    quadratic in the number of digits and refuses very large integers.
+    """
+    numerator, denominator = _as_fraction(value)
+
+    if style == "decimal":
+        if denominator == 1:
+            return to_decimal_string(numerator)
+        return f"{to_decimal_string(numerator)}/{to_decimal_string(denominator)}"
+
+    if style == "sci":
+        return scientific(numerator, denominator, precision)
+
+    if style == "hex":
+        if denominator == 1:
+            return hex(numerator)
+        return f"{hex(numerator)}/{hex(denominator)}"
+
+    if style == "digits":
+        if denominator == 1:
+            return str(count_digits(numerator))
+        return f"{count_digits(numerator)}/{count_digits(denominator)}"
+
+    if style == "log10":
+        if numerator == 0:
+            return "-inf"
+        return repr(math.log10(numerator) - math.log10(denominator))
+
+    raise ValueError(f"Unknown output format '{style}'")
+
+
+def _as_fraction(value: Union[int, Rational]) -> Tuple[int, int]:
+    if isinstance(value, Rational):
+        return int(value.p), int(value.q)
+    return int(value), 1
+
+
+def to_decimal_string(n: int) -> str:
+    """
+    Convert an integer to a string of decimal digits in subquadratic time.
+
+    The integer is split in half by bits, each half is converted to a
+    Decimal, and the halves are recombined as hi * 2**k + lo using the
+    decimal module's arithmetic (which multiplies large numbers with a
+    number-theoretic transform). Turning the resulting Decimal into a
+    string takes linear time.
+    """
+    if n < 0:
+        return "-" + to_decimal_string(-n)
+
+    if n.bit_length() <= _DIRECT_BITS:
+        return str(n)
+
+    with decimal.localcontext() as context:
+        context.prec = decimal.MAX_PREC
+        context.Emax = decimal.MAX_EMAX
+        context.Emin = decimal.MIN_EMIN
+        context.traps[decimal.Inexact] = True
+
+        powers: Dict[int, decimal.Decimal] = {}
+
+        def power_of_two(k: int) -> decimal.Decimal:
+            if k not in powers:
+                powers[k] = decimal.Decimal(2) ** k
+            return powers[k]
+
+        def convert(m: int, bits: int) -> decimal.Decimal:
+            if bits <= _DIRECT_BITS:
+                return decimal.Decimal(m)
+            half = bits >> 1
+            hi = m >> half
+            lo = m - (hi << half)
+            return convert(lo, half) + convert(hi, bits - half) * power_of_two(half)
+
+        return str(convert(n, n.bit_length()))
+
+
+def count_digits(n: int) -> int:
+    """
+    Number of decimal digits in the integer (ignoring any sign).
+
+    The bit length gives the count to within one, which a single
+    comparison with a power of ten then settles.
+    """
+    n = abs(n)
+
+    if n < 10:
+        return 1
+
+    estimate = int((n.bit_length() - 1) * _LOG10_2) + 1
+    return estimate + 1 if n >= 10 ** estimate else estimate
+
+
+def scientific(numerator: int, denominator: int = 1, precision: int = 10) -> str:
+    """
+    Write numerator / denominator in scientific notation with the given
+    number of significant digits (rounding half to even), e.g.:
+
+        123456789, 1, 3 -> "1.23e+8"
+
+    Only the leading digits are found: the numbers are scaled by a power
+    of ten so that their quotient has just over precision digits.
+    """
+    if precision < 1:
+        raise ValueError("Precision must be at least 1")
+
+    if numerator == 0:
+        return "0e+0"
+
+    sign = "-" if numerator < 0 else ""
+    numerator = abs(numerator)
+
+    # the exponent of the quotient is shift or shift - 1
+    shift = count_digits(numerator) - count_digits(denominator)
+    scale = shift - precision - 1
+
+    if scale >= 0:
+        quotient, remainder = divmod(numerator, denominator * 10 ** scale)
+    else:
+        quotient, remainder = divmod(numerator * 10 ** -scale, denominator)
+
+    # drop the guard digits, rounding half to even (any remainder breaks ties upwards)
+    extra = count_digits(quotient) - precision
+    mantissa, dropped = divmod(quotient, 10 ** extra)
+    half = 5 * 10 ** (extra - 1)
+
+    if dropped > half or (dropped == half and (remainder or mantissa % 2)):
+        mantissa += 1
+
+    exponent = scale + extra + precision - 1
+
+    if mantissa == 10 ** precision:
+        mantissa //= 10
+        exponent += 1
+
+    digits = str(mantissa)
+    body = digits[0] + ("." + digits[1:] if precision > 1 else "")
+    return f"{sign}{body}e{exponent:+d}"
@@ -0,0 +1,56 @@
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional, Tuple
+
+# A product of factors partly multiplied: the number of factors multiplied
+# so far, and their product held as one or more lists of integers
+Partial = Tuple[int, Tuple[List[int], ...]]
+
+
+class ProductProgress:
+    """
+    The partial product to resume a product of factors from (if one was
+    saved), and the function that saves it as more factors are multiplied.
+    """
+
+    def __init__(self, saved: Optional[Partial], save: Callable[[Partial], None]) -> None:
+        self.saved = saved
+        self.save = save
+        self.started = False
+
+
+# Set while an evaluation that saves its progress is running in this thread
+_progress: ContextVar[Optional[ProductProgress]] = ContextVar("progress", default=None)
+
+
+def start_product() -> Optional[ProductProgress]:
+    """
+    The progress of the product of factors the evaluation running in this
+    thread is starting to multiply.
+
+    Only the first product of an evaluation is saved (the engines whose
+    products are worth saving only multiply one), so this is None for any
+    later product, and outside of run_with_progress.
+    """
+    progress = _progress.get()
+
+    if progress is None or progress.started:
+        return None
+
+    progress.started = True
+    return progress
+
+
+def run_with_progress(
+    saved: Optional[Partial], save: Callable[[Partial], None], function: Callable[..., Any], *args
+) -> Any:
+    """
+    Call the function, resuming its product of factors from the saved
+    partial product (if any), and passing each partial product it reaches
+    to save.
+    """
+    token = _progress.set(ProductProgress(saved, save))
+
+    try:
+        return function(*args)
+    finally:
+        _progress.reset(token)
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ccc import aio, evaluate
+from ccc.draw import Draw
+from ccc.errors import EvaluationCancelled
+from ccc.multiset import Multiset
+from ccc.permutation import PermutationCounter
+from ccc.sequence import Sequence
+from ccc.series import truncated_product
+from ccc.util.cancellation import run_cancellable
+
+COLLECTION = {"a": 4, "b": 3, "c": 5}
+CONSTRAINTS = [[("ge", "a", 2)], [("le", "b", 1)], [("ne", "c", 3)]]
+
+# the term with both constraints takes seconds with the transfer-matrix engine
+SLOW_SEQUENCE = "abcdefgh" * 3
+SLOW_CONSTRAINTS = [[("derangement",)], [("no_adjacent",)]]
+
+
+def test_probability_draw():
+    answer = asyncio.run(aio.probability_draw(6, COLLECTION, CONSTRAINTS))
+    assert answer == evaluate.probability_draw(6, COLLECTION, CONSTRAINTS)
+
+
+def test_count_multisets():
+    answer = asyncio.run(aio.count_multisets(6, COLLECTION, CONSTRAINTS, timeout=60))
+    assert answer == evaluate.count_multisets(6, COLLECTION, CONSTRAINTS)
+
+
+def test_timeout():
+    start = time.monotonic()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(aio.count_permutations(SLOW_SEQUENCE, SLOW_CONSTRAINTS, timeout=0.2))
+
+    assert time.monotonic() - start < 1.5
+
+
+def test_timeout_with_partial_answer():
+    answer = asyncio.run(
+        aio.count_permutations(SLOW_SEQUENCE, SLOW_CONSTRAINTS, timeout=0.2, partial=True)
+    )
+    assert isinstance(answer, aio.Partial)
+    assert answer.evaluated < answer.terms == 3
+
+
+def test_cancellation():
+    async def cancel_soon():
+        task = asyncio.ensure_future(aio.count_permutations(SLOW_SEQUENCE, SLOW_CONSTRAINTS))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancel_soon())
+
+
+def test_cancelled_evaluation_stops():
+    cancelled = threading.Event()
+    cancelled.set()
+
+    with pytest.raises(EvaluationCancelled):
+        run_cancellable(cancelled, truncated_product, [[1, 1]] * 10, 10)
+
+    # outside of run_cancellable nothing is checked
+    assert truncated_product([[1, 1]] * 10, 10)[10] == 1
+
+
+@pytest.mark.parametrize(
+    "tracker,method,engine",
+    [
+        (Multiset(6, COLLECTION, [("ge", "a", 2)]), "count", "polynomial"),
+        (Multiset(6, COLLECTION, [("le", "a", 2)]), "count", "closed_form"),
+        (Draw(6, COLLECTION, [("ge", "a", 2)]), "count", "polynomial"),
+        (Draw(6, COLLECTION, [("ge", "a", 2)], replace=True), "probability", "polynomial"),
+        (Sequence(6, COLLECTION, [("ge", "a", 2)]), "count", "polynomial"),
+        (PermutationCounter("aabbcc", [("derangement",)]), "count", "laguerre"),
+    ],
+)
+def test_every_engine_can_be_cancelled(tracker, method, engine):
+    cancelled = threading.Event()
+
+    def cancel_then_evaluate():
+        # run_cancellable checks on entry, so cancel once inside it
+        cancelled.set()
+        return getattr(tracker, method)(engine)
+
+    with pytest.raises(EvaluationCancelled):
+        run_cancellable(cancelled, cancel_then_evaluate)
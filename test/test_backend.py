@@ -0,0 +1,76 @@
+import pytest
+
+from sympy import Rational
+
+from ccc import backend
+from ccc.draw import Draw
+from ccc.multiset import Multiset
+from ccc.permutation import PermutationCounter
+from ccc.sequence import Sequence
+
+
+@pytest.fixture(params=backend.available_backends())
+def use_backend(request):
+    previous = backend.get_backend()
+    backend.set_backend(request.param)
+    yield request.param
+    backend.set_backend(previous)
+
+
+def test_python_backend_is_always_available():
+    assert "python" in backend.available_backends()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown backend 'numpy'"):
+        backend.set_backend("numpy")
+
+
+@pytest.mark.skipif(backend.flint is not None, reason="python-flint is installed")
+def test_flint_backend_needs_python_flint():
+    with pytest.raises(ValueError, match="needs python-flint"):
+        backend.set_backend("flint")
+
+
+@pytest.mark.skipif(backend.flint is None, reason="python-flint is not installed")
+@pytest.mark.parametrize(
+    "first,second,max_degree",
+    [
+        ([1, 2, 1], [1, 1], 10),
+        ([1, 2, 1], [1, 1], 1),
+        ([0, -4, 7, 0], [3, 0, 0, 0], 6),
+        ([10 ** 40, 1], [10 ** 30, -1, 5], 3),
+    ],
+)
+def test_flint_multiply_matches_multiply_signed(first, second, max_degree):
+    expected = [0] * (len(first) + len(second) - 1)
+
+    for i, a in enumerate(first):
+        for j, b in enumerate(second):
+            expected[i + j] += a * b
+
+    assert backend.flint_multiply(first, second, max_degree) == expected[: max_degree + 1]
+
+
+@pytest.mark.parametrize(
+    "tracker,method,expected",
+    [
+        (
+            Multiset(30, {"a": 20, "b": 15, "c": 9}, [("ge", "a", 3), ("mod", "b", 3, 1)]),
+            "count",
+            32,
+        ),
+        (Draw(12, {"a": 40, "b": 30, "c": 20}, [("in", "a", (2, 3, 5))]), "count", 98490796203800),
+        (
+            Draw(6, {"a": 3, "b": 4}, [("le", "a", 2)], replace=True),
+            "probability",
+            Rational(57088, 117649),
+        ),
+        (Sequence(12, {"a": 9, "b": 6, "c": 4}, [("eq", "a", 4)]), "count", 76230),
+        (PermutationCounter("aaabbbccdd", [("derangement",)]), "count", 1405),
+        (PermutationCounter("aaabbbccdd", [("no_adjacent",)], same_distinct=True), "count", 605376),
+    ],
+)
+def test_backends_give_identical_answers(use_backend, tracker, method, expected):
+    for engine in tracker.plan().costs:
+        assert getattr(tracker, method)(engine) == expected, engine
@@ -0,0 +1,109 @@
+import pytest
+from sympy import Rational
+
+from ccc import evaluate, series
+from ccc.checkpoint import (
+    checkpoint_path,
+    evaluate_with_checkpoint,
+    read_checkpoint,
+    write_checkpoint,
+)
+from ccc.errors import CheckpointError
+from ccc.query import compile_draws, compile_multisets
+
+COLLECTION = {"a": 4, "b": 3, "c": 5}
+CONSTRAINTS = [[("ge", "a", 2)], [("le", "b", 1)], [("ne", "c", 3)]]
+
+
+@pytest.mark.parametrize("answer", [0, -(3 ** 200), 2 ** 64, Rational(-7, 3 ** 50)])
+@pytest.mark.parametrize("partial", [None, (3, ([1, 5, 3 ** 90],)), (1, ([0, 7], [1, 2]))])
+def test_checkpoint_round_trip(tmp_path, answer, partial):
+    method = "probability" if isinstance(answer, Rational) else "count"
+    query = compile_draws(6, COLLECTION, CONSTRAINTS, method=method)
+    path = checkpoint_path(str(tmp_path), query)
+
+    write_checkpoint(path, query, 2, answer, partial)
+    assert read_checkpoint(path, query) == (2, answer, partial)
+
+
+def test_evaluate_with_checkpoint(tmp_path):
+    query = compile_draws(6, COLLECTION, CONSTRAINTS)
+    expected = evaluate.probability_draw(6, COLLECTION, CONSTRAINTS)
+
+    assert evaluate_with_checkpoint(query, str(tmp_path), interval=0) == expected
+    assert read_checkpoint(checkpoint_path(str(tmp_path), query), query) == (
+        len(query.terms),
+        expected,
+        None,
+    )
+
+
+def test_evaluation_resumes_from_checkpoint(tmp_path):
+    query = compile_multisets(6, COLLECTION, CONSTRAINTS)
+    path = checkpoint_path(str(tmp_path), query)
+    first = query.terms[0]
+
+    # only the terms after the first are evaluated
+    write_checkpoint(path, query, 1, first.coefficient * first.evaluate() + 1000)
+    answer = evaluate_with_checkpoint(query, str(tmp_path))
+
+    assert answer == evaluate.count_multisets(6, COLLECTION, CONSTRAINTS) + 1000
+
+
+def test_interrupted_product_resumes(tmp_path, monkeypatch):
+    collection = {"a": 20, "b": 20, "c": 20, "d": 20}
+    constraints = [[("ge", "a", 5), ("mod", "b", 3, 0), ("le", "c", 10)]]
+    query = compile_draws(30, collection, constraints, method="count")
+    assert [term.engine for term in query.terms] == ["packed"]
+
+    multiply = series.multiply
+    calls = []
+
+    def interrupted(*args):
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        calls.append(args)
+        return multiply(*args)
+
+    monkeypatch.setattr(series, "multiply", interrupted)
+
+    with pytest.raises(KeyboardInterrupt):
+        evaluate_with_checkpoint(query, str(tmp_path), interval=0)
+
+    path = checkpoint_path(str(tmp_path), query)
+    evaluated, _, (factors, _) = read_checkpoint(path, query)
+    assert (evaluated, factors) == (0, 2)
+
+    # only the last two of the four factors are multiplied
+    calls.clear()
+    monkeypatch.setattr(series, "multiply", lambda *args: calls.append(args) or multiply(*args))
+    answer = evaluate_with_checkpoint(query, str(tmp_path))
+
+    assert len(calls) == 2
+    assert answer == evaluate.count_draws(30, collection, constraints)
+
+
+def test_checkpoint_for_another_query_is_rejected(tmp_path):
+    query = compile_multisets(6, COLLECTION, CONSTRAINTS)
+    other = compile_multisets(7, COLLECTION, CONSTRAINTS)
+    path = checkpoint_path(str(tmp_path), query)
+
+    write_checkpoint(path, other, 1, 10)
+
+    with pytest.raises(CheckpointError):
+        evaluate_with_checkpoint(query, str(tmp_path))
+
+
+def test_corrupt_checkpoint_is_rejected(tmp_path):
+    query = compile_multisets(6, COLLECTION, CONSTRAINTS)
+    path = checkpoint_path(str(tmp_path), query)
+    write_checkpoint(path, query, 1, 3 ** 100)
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with open(path, "wb") as f:
+        f.write(data[:-5])
+
+    with pytest.raises(CheckpointError):
+        read_checkpoint(path, query)
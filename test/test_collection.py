@@ -1,6 +1,7 @@
 import pytest
 
-from ccc.util.collection import process_collection_string
+from ccc.errors import CollectionError
+from ccc.util.collection import process_collection_string, read_collection_file
 
 
 @pytest.mark.parametrize(
@@ -8,3 +9,42 @@ from ccc.util.collection import process_collection_string
 )
 def test_process_collection_string_succeeds(string, expected):
     assert process_collection_string(string) == expected
+
+
+@pytest.mark.parametrize(
+    "name,text",
+    [
+        ("items.csv", "item,count\nred,7\nblue,9\n"),
+        ("items.csv", "red, 7\n\nblue, 9\n"),
+        ("items.json", '{"red": 7, "blue": 9}'),
+        ("items.jsonl", '{"item": "red", "count": 7}\n["blue", 9]\n'),
+    ],
+)
+def test_read_collection_file_succeeds(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    assert read_collection_file(str(path)) == {"red": 7, "blue": 9}
+
+
+@pytest.mark.parametrize(
+    "name,text",
+    [
+        ("items.csv", "red,7\nred,9\n"),
+        ("items.csv", "red,7\nblue,0\n"),
+        ("items.csv", "red,7\nblue,many\n"),
+        ("items.csv", "red,7.5\nblue,9\n"),
+        ("items.csv", "red,-3\nblue,9\n"),
+        ("items.json", '{"red": 7, "red": 9}'),
+        ("items.json", '{"red": 7.5}'),
+        ("items.json", "[7, 9]"),
+        ("items.jsonl", '["red", 7]\n["blue", true]\n'),
+        ("items.jsonl", '["red", 7, 9]\n'),
+        ("items.jsonl", '[1, 7]\n["1", 9]\n'),
+        ("items.txt", "red = 7"),
+    ],
+)
+def test_read_collection_file_fails(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    with pytest.raises(CollectionError):
+        read_collection_file(str(path))
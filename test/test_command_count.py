@@ -42,6 +42,7 @@ def test_count_multisets_no_constraints(runner, subcommand, size, collection, ex
         # https://math.stackexchange.com/questions/960046
         (3, "a <= 2, b <= 3", 7),
         (3, "m <= 1, p <= 2, i <= 4, s <= 4", 53),
+        (30, "A <= 20, B <= 20, C <= 20", 205863750414990),
     ],
 )
 def test_count_sequences(runner, size, constraints, expected):
@@ -126,3 +127,107 @@ def test_count_permutations_derangement(runner, sequence, expected, expected_if_
     assert result.output.rstrip() == str(expected)
     result = runner.invoke(permutations, [sequence, "--where", "derangement", "--same-distinct"])
     assert result.output.rstrip() == str(expected_if_same_distinct)
+
+
+@pytest.mark.parametrize(
+    "sequence,constraints,expected,expected_if_same_distinct",
+    [
+        ("aabbcc", "derangement, no_adjacent", 5, 40),
+        ("aaabbc", "derangement, no_adjacent", 0, 0),
+        ("abcabc", "derangement, no_adjacent", 3, 24),
+        ("aabbcc", "derangement or no_adjacent", 35, 280),
+        ("aaabbc", "derangement or no_adjacent", 13, 156),
+        ("abcabc", "derangement or no_adjacent", 37, 296),
+        ("aabbccddee", "derangement, no_adjacent", 4181, 133792),
+    ],
+)
+def test_count_permutations_multiple_constraints(
+    runner, sequence, constraints, expected, expected_if_same_distinct
+):
+    result = runner.invoke(permutations, [sequence, "--where", constraints])
+    assert result.output.rstrip() == str(expected)
+    result = runner.invoke(permutations, [sequence, "--where", constraints, "--same-distinct"])
+    assert result.output.rstrip() == str(expected_if_same_distinct)
+
+
+@pytest.mark.parametrize(
+    "counts,constraints,expected",
+    [
+        ("a=2; b=2; c=2", "derangement, no_adjacent", 5),
+        ("a=4; b=3; c=3", "derangement", 78),
+        ("M=1; I=4; S=4; P=2", "no_adjacent", 2016),
+    ],
+)
+def test_count_permutations_from_counts(runner, counts, constraints, expected):
+    result = runner.invoke(permutations, ["--counts", counts, "--where", constraints])
+    assert result.output.rstrip() == str(expected)
+
+
+def test_count_permutations_from_counts_file(runner, tmp_path):
+    path = tmp_path / "counts.txt"
+    path.write_text("a = 4; b = 3; c = 3\n")
+    result = runner.invoke(permutations, ["--counts", str(path), "--where", "derangement"])
+    assert result.output.rstrip() == "78"
+
+
+def test_count_permutations_needs_sequence_or_counts(runner):
+    assert runner.invoke(permutations, []).exit_code != 0
+    assert runner.invoke(permutations, ["abc", "--counts", "a=1; b=1; c=1"]).exit_code != 0
+
+
+def test_count_permutations_bad_counts(runner):
+    result = runner.invoke(permutations, ["--counts", "a=2; b=", "--where", "derangement"])
+    assert result.exit_code == 2
+    assert "Invalid syntax in collection string" in result.output
+
+
+@pytest.mark.parametrize(
+    "output_format,expected",
+    [
+        ("decimal", "205863750414990"),
+        ("sci", "2.059e+14"),
+        ("digits", "15"),
+        ("hex", "0xbb3b63b7328e"),
+    ],
+)
+def test_count_output_format(runner, output_format, expected):
+    args = ["--size", 30, "--where", "A <= 20, B <= 20, C <= 20"]
+    result = runner.invoke(sequences, args + ["--format", output_format, "--precision", 4])
+    assert result.output.rstrip() == expected
+
+
+def test_count_precision_must_be_positive(runner):
+    args = ["--size", 3, "--where", "A <= 2", "--format", "sci", "--precision", 0]
+    result = runner.invoke(sequences, args)
+    assert result.exit_code == 2
+    assert "--precision" in result.output
+
+
+def test_count_draws_from_file(runner, tmp_path):
+    path = tmp_path / "collection.json"
+    path.write_text('{"a": 3, "b": 2}')
+    result = runner.invoke(draws, ["--size", 3, "--from-file", str(path)])
+    assert result.output.rstrip() == "3"
+
+
+def test_count_draws_needs_one_collection(runner, tmp_path):
+    path = tmp_path / "collection.csv"
+    path.write_text("a,3\nb,2\n")
+    assert runner.invoke(draws, ["--size", 3]).exit_code != 0
+    assert runner.invoke(draws, ["--size", 3, "-k", "a=3", "--from-file", str(path)]).exit_code != 0
+
+
+def test_count_draws_with_checkpoint(runner, tmp_path):
+    args = ["--size", 6, "-k", "a=4; b=3; c=5", "--where", "a >= 2 or b <= 1"]
+    expected = runner.invoke(draws, args).output
+    assert runner.invoke(draws, args + ["--checkpoint", str(tmp_path)]).output == expected
+    assert runner.invoke(draws, args + ["--checkpoint", str(tmp_path)]).output == expected
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+@pytest.mark.parametrize("extra", [[], ["--explain"]])
+def test_count_draws_unimplemented_constraint(runner, extra):
+    args = ["--size", 2, "-k", "a=2; b=2", "--where", "derangement"]
+    result = runner.invoke(draws, args + extra)
+    assert result.exit_code == 1
+    assert result.output.rstrip() == "Constraint 'derangement' is not implemented"
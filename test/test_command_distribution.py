@@ -0,0 +1,45 @@
+import pytest
+
+from ccc.commands.distribution import draw_command
+from ccc.commands.probability import draw_command as probability_draw_command
+
+
+def test_distribution_draw_table(runner):
+    result = runner.invoke(draw_command, ["3", "--from", "a=2; b=2", "--item", "a", "--replace"])
+    assert result.output.splitlines() == [
+        "count\tpmf\tcdf\tsurvival",
+        "0\t1/8\t1/8\t7/8",
+        "1\t3/8\t1/2\t1/2",
+        "2\t3/8\t7/8\t1/8",
+        "3\t1/8\t1\t0",
+    ]
+
+
+@pytest.mark.parametrize("replace", ["--replace", "--no-replace"])
+@pytest.mark.parametrize("constraints", ["forest >= 1", "forest <= 2 or island == 1"])
+def test_distribution_draw_matches_probability(runner, replace, constraints):
+    collection = "mountain=5; forest=7; island=4"
+    args = ["6", "--from", collection, "--item", "mountain", "--where", constraints, replace]
+    rows = runner.invoke(draw_command, args).output.splitlines()[1:]
+
+    for row in rows:
+        count, pmf, _, _ = row.split("\t")
+        where = " or ".join(
+            f"({alternative}, mountain == {count})" for alternative in constraints.split(" or ")
+        )
+        args = ["6", "--from", collection, "--where", where, replace]
+        assert runner.invoke(probability_draw_command, args).output.rstrip() == pmf
+
+
+def test_distribution_draw_unknown_item(runner):
+    result = runner.invoke(draw_command, ["3", "--from", "a=2; b=2", "--item", "c"])
+    assert result.exit_code != 0
+    assert "--item" in result.output
+
+
+def test_distribution_draw_unknown_constraint_item(runner):
+    args = ["3", "--from", "a=2; b=2", "--item", "a", "--where", "c == 1"]
+    result = runner.invoke(draw_command, args)
+    assert result.exit_code != 0
+    assert "not in the collection: c" in result.output
+    assert "--item" not in result.output
@@ -1,6 +1,6 @@
 import pytest
 
-from ccc.commands.probability import draw_command, permutation_command
+from ccc.commands.probability import draw_command, permutation_command, stages_command
 
 
 @pytest.mark.parametrize(
@@ -91,3 +91,68 @@ def test_count_permutations_derangement(runner, sequence, expected, expected_if_
         permutation_command, [sequence, "--where", "derangement", "--same-distinct"]
     )
     assert result.output.rstrip() == str(expected_if_same_distinct)
+
+
+def test_probability_output_format(runner):
+    args = ["5", "--from", "a=10; b=20", "--where", "a >= 2", "--format", "sci", "--precision", 4]
+    result = runner.invoke(draw_command, args)
+    assert result.output.rstrip() == "5.512e-1"
+
+
+def test_probability_approximate_method(runner):
+    args = ["232", "--from", "group=12; rest=351", "--where", "group <= 2", "--method", "approx"]
+    result = runner.invoke(draw_command, args)
+    value, error = result.output.rstrip().split(" ± ")
+    assert float(value) == pytest.approx(0.00093431, rel=1e-4)
+    assert float(error) < 1e-5
+
+
+@pytest.mark.parametrize("threshold,expected", [("0.98", "yes"), ("99/100", "no")])
+def test_probability_threshold(runner, threshold, expected):
+    args = ["6", "--from", "r=10; g=10", "--where", "r >= 1, g >= 1", "--threshold", threshold]
+    result = runner.invoke(draw_command, args)
+    assert result.output.split()[0] == expected
+
+
+@pytest.mark.parametrize(
+    "options,message",
+    [
+        (["--threshold", "0.9", "--method", "approx"], "--threshold cannot be used with --method"),
+        (["--explain", "--threshold", "0.9"], "--explain cannot be used with --threshold"),
+        (["--threshold", "0.9", "--jobs", "2"], "cannot be used with --threshold"),
+        (["--explain", "--checkpoint", "progress"], "cannot be used with --explain"),
+        (["--method", "approx", "--jobs", "2"], "cannot be used with --method approx"),
+        (["--method", "approx", "--format", "sci"], "cannot be used with --method approx"),
+        (["--method", "approx", "--float"], "cannot be used with --method approx"),
+    ],
+)
+def test_probability_rejects_ignored_options(runner, options, message):
+    args = ["6", "--from", "r=10; g=10", "--where", "r >= 1, g >= 1"] + options
+    result = runner.invoke(draw_command, args)
+    assert result.exit_code == 2
+    assert message in result.output
+
+
+def test_probability_permutation_threshold_rejects_jobs(runner):
+    args = ["aabb", "--where", "derangement", "--threshold", "0.5", "--jobs", "2"]
+    result = runner.invoke(permutation_command, args)
+    assert result.exit_code == 2
+
+
+def test_probability_permutation_threshold_unknown_constraint(runner):
+    args = ["aabb", "--where", "a == 1", "--threshold", "0.5"]
+    result = runner.invoke(permutation_command, args)
+    assert result.exit_code == 1
+    assert "not implemented" in result.output
+
+
+def test_probability_permutation_bad_counts(runner):
+    result = runner.invoke(permutation_command, ["--counts", "a=2; b=", "--where", "derangement"])
+    assert result.exit_code == 2
+    assert "Invalid syntax in collection string" in result.output
+
+
+def test_probability_stages(runner):
+    args = ["--from", "m=3; s=2; f=2; x=2", "--stage", "3: m >= 1", "--stage", "2: s >= 1"]
+    result = runner.invoke(stages_command, args)
+    assert result.output.rstrip() == "143/420"
@@ -0,0 +1,50 @@
+import pytest
+
+from ccc.util.degrees import intersect_ranges, interval_bounds, tighten_degrees
+
+
+@pytest.mark.parametrize(
+    "first,second",
+    [
+        (range(1, 20, 3), range(0, 12, 2)),
+        (range(0, 50, 4), range(2, 50, 6)),
+        (range(0, 50, 4), range(1, 50, 2)),
+        (range(5, 30), range(0, 11)),
+        (range(7, 100, 7), range(3, 40, 5)),
+        (range(0), range(5)),
+        (range(10, 20), range(0, 5)),
+    ],
+)
+def test_intersect_ranges(first, second):
+    assert list(intersect_ranges(first, second)) == sorted(set(first) & set(second))
+
+
+@pytest.mark.parametrize(
+    "degrees,expected",
+    [
+        (range(3, 8), (3, 7)),
+        (range(3, 4, 5), (3, 3)),
+        (range(3, 8, 2), None),
+        (range(0), None),
+        ({2, 3, 4}, (2, 4)),
+        ({2, 4}, None),
+        (set(), None),
+    ],
+)
+def test_interval_bounds(degrees, expected):
+    assert interval_bounds(degrees) == expected
+
+
+@pytest.mark.parametrize(
+    "degree_sets,total,expected",
+    [
+        ([range(0, 11), {2, 5}], 6, [range(1, 5), {2, 5}]),
+        ([range(0, 11), range(0, 11)], 10, [range(0, 11), range(0, 11)]),
+        ([range(6, 11), range(0, 3), range(2, 11)], 10, [range(6, 9), range(0, 3), range(2, 5)]),
+        ([range(0, 3), range(0, 3)], 7, [range(0), range(0)]),
+        ([range(4, 9), {5, 6}], 8, [range(0), range(0)]),
+        ([range(0, 11), set()], 5, [range(0), range(0)]),
+    ],
+)
+def test_tighten_degrees(degree_sets, total, expected):
+    assert tighten_degrees(degree_sets, total) == expected
@@ -0,0 +1,208 @@
+from itertools import combinations
+
+import pytest
+from sympy import Rational
+
+from ccc import evaluate
+from ccc.draw import Draw
+from ccc.multiset import Multiset
+from ccc.util.misc import subsets
+
+COLLECTION = {"a": 4, "b": 3, "c": 5}
+
+
+def flat_inclusion_exclusion(size, collection, constraints):
+    return sum(
+        (-1) ** (n + 1) * Multiset(size, collection, subset).count()
+        for n, subset in subsets(constraints)
+    )
+
+
+@pytest.mark.parametrize(
+    "size,constraints",
+    [
+        (6, [[("eq", "a", 1)], [("eq", "a", 2)], [("ge", "b", 2)]]),
+        (8, [[("le", "a", 1)], [("gt", "b", 1), ("lt", "c", 3)], [("ne", "c", 4)]]),
+        (5, [[("eq", "b", 0)], [("eq", "b", 0)], [("eq", "c", 5)]]),
+        (12, [[("ge", "a", 3)], [("ge", "b", 3)], [("ge", "c", 4)], [("eq", "a", 0)]]),
+    ],
+)
+def test_lattice_walk_matches_flat_inclusion_exclusion(size, constraints):
+    expected = flat_inclusion_exclusion(size, COLLECTION, constraints)
+    assert evaluate.count_multisets(size, COLLECTION, constraints) == expected
+
+
+def test_supersets_of_infeasible_conjunctions_are_pruned():
+    constraints = [[("eq", "a", i)] for i in range(10)]
+    terms = list(evaluate.multiset_terms(8, {"a": 10, "b": 10}, constraints))
+    assert len(terms) == 9
+    assert all(coefficient == 1 for coefficient, _, _ in terms)
+
+
+def test_duplicate_conjunctions_are_merged():
+    constraints = [[("eq", "a", 1)], [("eq", "a", 1)], [("le", "b", 1)]]
+    terms = list(evaluate.multiset_terms(4, COLLECTION, constraints))
+    assert [subset for _, subset, _ in terms] == [
+        [("eq", "a", 1)],
+        [("le", "b", 1)],
+        [("eq", "a", 1), ("le", "b", 1)],
+    ]
+    assert [coefficient for coefficient, _, _ in terms] == [1, 1, -1]
+
+
+def test_parallel_evaluation_matches_serial():
+    constraints = [[("ge", "a", 2)], [("le", "b", 1)], [("ne", "c", 3)], [("eq", "a", 1)]]
+    serial = evaluate.probability_draw(6, COLLECTION, constraints)
+    assert evaluate.probability_draw(6, COLLECTION, constraints, jobs=3) == serial
+    assert evaluate.count_draws(6, COLLECTION, constraints, jobs=2) == evaluate.count_draws(
+        6, COLLECTION, constraints
+    )
+
+
+@pytest.mark.parametrize("replace", [False, True])
+@pytest.mark.parametrize(
+    "constraints",
+    [
+        None,
+        [[("ge", "a", 2)], [("eq", "b", 1)]],
+        [[("le", "a", 1), ("ge", "c", 1)], [("mod", "b", 2, 0)], [("ne", "d", 0)]],
+    ],
+)
+def test_batched_draws_match_single_draws(constraints, replace):
+    items = ["a", "b", "c", "d"]
+    rows = [[4, 3, 5, 2], [1, 2, 1, 1], [4, 3, 5, 2], [6, 2, 1, 3], [2, 5, 1, 4]]
+    batch = evaluate.probability_draws(5, items, rows, constraints, replace)
+
+    for row, probability in zip(rows, batch):
+        collection = dict(zip(items, row))
+        if constraints is None:
+            assert probability == 1
+        else:
+            assert probability == evaluate.probability_draw(5, collection, constraints, replace)
+
+
+def test_batched_draws_check_rows():
+    with pytest.raises(ValueError):
+        evaluate.probability_draws(2, ["a", "b"], [[1, 2, 3]])
+    with pytest.raises(ValueError):
+        evaluate.probability_draws(2, ["a", "b"], [[1, -2]])
+
+
+@pytest.mark.parametrize("replace", [False, True])
+@pytest.mark.parametrize(
+    "size,collection,constraints",
+    [
+        (232, {"group": 12, "rest": 351}, [[("le", "group", 2)]]),
+        (2320, {"group": 120, "rest": 3510}, [[("le", "group", 50)]]),
+        (300, {"a": 100, "b": 107, "c": 114, "rest": 5000}, [[("ge", "a", 5), ("le", "b", 3)]]),
+        (50, {"a": 30, "b": 40, "c": 50}, [[("mod", "a", 3, 0)], [("ge", "b", 20)]]),
+        (232, {"group": 12, "rest": 351}, [[("ne", "group", 7)]]),
+        (
+            800,
+            {"a": 1000, "b": 1200, "rest": 3000},
+            [[("ne", "a", 150)], [("not_in", "b", [183, 184])]],
+        ),
+    ],
+)
+def test_approximate_draw_is_close_to_exact(size, collection, constraints, replace):
+    exact = float(evaluate.probability_draw(size, collection, constraints, replace))
+    value, error = evaluate.approximate_probability_draw(size, collection, constraints, replace)
+    assert value == pytest.approx(exact, rel=1e-4)
+    assert abs(value - exact) <= error
+
+
+def test_approximate_draw_of_impossible_constraints_is_zero():
+    assert evaluate.approximate_probability_draw(3, {"a": 2, "b": 2}, [[("ge", "a", 3)]]) == (0, 0)
+    constraints = [[("mod", "a", 2, 1), ("mod", "b", 2, 0)]]
+    assert evaluate.approximate_probability_draw(6, {"a": 5, "b": 5}, constraints) == (0, 0)
+
+
+@pytest.mark.parametrize("threshold", [0, Rational(1, 4), Rational(1, 2), Rational(9, 10), 1])
+def test_threshold_decides_like_exact_probability(threshold):
+    collection = {"a": 4, "b": 5, "c": 3, "d": 6}
+    constraints = [[("ge", "a", 2)], [("ge", "b", 3)], [("eq", "c", 1)], [("le", "d", 1)]]
+    exact = evaluate.probability_draw(7, collection, constraints)
+
+    above, lower, upper = evaluate.threshold_probability_draw(7, collection, constraints, threshold)
+    assert above == (exact >= threshold)
+    assert lower <= exact <= upper
+
+
+def test_bonferroni_bounds_tighten_to_exact_probability():
+    collection = {"a": 10, "b": 10, "c": 10, "d": 10, "rest": 40}
+    constraints = [[("ge", item, 2)] for item in "abcd"]
+    exact = evaluate.probability_draw(10, collection, constraints)
+
+    levels = evaluate.conjunction_levels(constraints, lambda subset: Draw(10, collection, subset))
+    bounds = list(evaluate.bonferroni_bounds(levels, 2))
+    assert len(bounds) == 1
+
+    levels = evaluate.conjunction_levels(constraints, lambda subset: Draw(10, collection, subset))
+    bounds = list(evaluate.bonferroni_bounds(levels, exact))
+    assert bounds[-1][0] == exact
+    assert all(lower <= exact <= upper for lower, upper in bounds)
+    assert all(a[0] <= b[0] and a[1] >= b[1] for a, b in zip(bounds, bounds[1:]))
+
+
+def test_threshold_permutation():
+    constraints = [[("derangement",)], [("no_adjacent",)]]
+    exact = evaluate.probability_permutation("AABBCC", constraints)
+    assert evaluate.threshold_probability_permutation("AABBCC", constraints, exact).above
+    assert not evaluate.threshold_probability_permutation("AABBCC", constraints, exact + 1e-9).above
+
+
+def brute_force_staged_draw(collection, stages):
+    objects = [item for item, count in collection.items() for _ in range(count)]
+    met = total = 0
+
+    def draw(remaining, stages):
+        if not stages:
+            return [[]]
+        size, _ = stages[0]
+        return [
+            [[objects[i] for i in chosen]] + rest
+            for chosen in combinations(remaining, size)
+            for rest in draw([i for i in remaining if i not in chosen], stages[1:])
+        ]
+
+    for drawn in draw(range(len(objects)), stages):
+        total += 1
+        met += all(
+            any(all(_meets(items, c) for c in conjunct) for conjunct in constraints or [[]])
+            for items, (_, constraints) in zip(drawn, stages)
+        )
+
+    return Rational(met, total)
+
+
+def _meets(items, constraint):
+    op, item, *args = constraint
+    n = items.count(item)
+    return {
+        "eq": lambda: n == args[0],
+        "ge": lambda: n >= args[0],
+        "le": lambda: n <= args[0],
+        "mod": lambda: n % args[0] == args[1],
+    }[op]()
+
+
+@pytest.mark.parametrize(
+    "stages",
+    [
+        [(3, [[("ge", "a", 1)]]), (2, [[("ge", "b", 1)]])],
+        [(3, [[("ge", "a", 1)], [("eq", "c", 2)]]), (2, [[("ge", "b", 1)], [("eq", "d", 0)]])],
+        [(2, None), (2, [[("le", "a", 1), ("mod", "b", 2, 0)]]), (1, [[("eq", "a", 1)]])],
+        [(4, [[("eq", "a", 3)]]), (3, [[("ge", "a", 1)]])],
+    ],
+)
+def test_staged_draw_matches_brute_force(stages):
+    collection = {"a": 3, "b": 2, "c": 2, "d": 2}
+    expected = brute_force_staged_draw(collection, stages)
+    assert evaluate.probability_staged_draw(collection, stages) == expected
+
+
+def test_single_stage_is_a_draw():
+    constraints = [[("ge", "a", 2)], [("le", "b", 1)]]
+    assert evaluate.probability_staged_draw(COLLECTION, [(6, constraints)]) == (
+        evaluate.probability_draw(6, COLLECTION, constraints)
+    )
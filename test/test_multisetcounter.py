@@ -1,8 +1,11 @@
 import itertools
 
 import pytest
+from sympy import prod
+from sympy.abc import x
 
 from ccc.multiset import Multiset
+from ccc.polynomial import degrees_to_polynomial
 
 
 @pytest.mark.parametrize(
@@ -104,3 +107,39 @@ def test_single_constraint_with_collection(constraint, expected_degrees):
     ms = Multiset(8, constraints=[constraint], collection={"red": 8, "blue": 2})
     assert ms._degrees["red"] == expected_degrees  # pylint: disable=protected-access
     assert ms._degrees["blue"] == {0, 1, 2}  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize(
+    "size,constraints",
+    [
+        (10, [("le", "a", 3), ("ge", "b", 2), ("eq", "c", 1)]),
+        (12, [("le", "a", 3), ("le", "b", 3), ("le", "c", 3), ("le", "d", 3)]),
+        (7, [("ge", "a", 3), ("ge", "b", 3), ("ge", "c", 3)]),
+        (15, [("gt", "a", 2), ("lt", "a", 9), ("le", "b", 4), ("in", "c", [2, 3, 4])]),
+        (20, [("le", "a", 25), ("ge", "b", 0)]),
+    ],
+)
+def test_interval_constraints_match_polynomial_count(size, constraints):
+    """
+    Test the closed-form count for interval constraints agrees with
+    the count from multiplying polynomials.
+    """
+    ms = Multiset(size, constraints=constraints)
+    degrees = ms._degrees.values()  # pylint: disable=protected-access
+    poly = prod(degrees_to_polynomial(d) for d in degrees)
+    assert ms.count() == poly.coeff_monomial(x ** size)
+
+
+def test_interval_constraints_large_size():
+    """
+    Test the closed-form count does not materialise degrees for huge sizes.
+    """
+    ms = Multiset(10 ** 9, constraints=[("le", "a", 20), ("ge", "b", 7)])
+    assert ms.count() == 21
+    ms = Multiset(10 ** 9, collection={"a": 20, "b": 4 * 10 ** 8, "c": 7 * 10 ** 8})
+    assert ms.count() == 2100000231
+
+
+def test_constrained_items_are_limited_by_collection():
+    assert Multiset(10, {"a": 3, "b": 3}, [("ge", "a", 5)]).count() == 0
+    assert Multiset(5, {"a": 3, "b": 3}, [("ne", "a", 1)]).count() == 2
@@ -0,0 +1,52 @@
+import pytest
+from sympy import Rational
+
+from ccc.util.output import count_digits, format_number, scientific, to_decimal_string
+
+
+@pytest.mark.parametrize("n", [0, 7, 10 ** 50, 3 ** 5000 + 1, 2 ** 14000 - 1, -(10 ** 1200)])
+def test_to_decimal_string(n):
+    assert to_decimal_string(n) == str(n)
+
+
+@pytest.mark.parametrize("n", [1, 9, 10, 99, 100, 10 ** 30 - 1, 10 ** 30, 2 ** 1000])
+def test_count_digits(n):
+    assert count_digits(n) == len(str(n))
+
+
+@pytest.mark.parametrize(
+    "numerator,denominator,precision,expected",
+    [
+        (123456789, 1, 3, "1.23e+8"),
+        (123456789, 1, 1, "1e+8"),
+        (999999, 1, 3, "1.00e+6"),
+        (125, 1, 2, "1.2e+2"),
+        (135, 1, 2, "1.4e+2"),
+        (1, 3, 4, "3.333e-1"),
+        (2, 3, 4, "6.667e-1"),
+        (0, 1, 5, "0e+0"),
+        (10 ** 400, 7, 6, "1.42857e+399"),
+    ],
+)
+def test_scientific(numerator, denominator, precision, expected):
+    assert scientific(numerator, denominator, precision) == expected
+
+
+@pytest.mark.parametrize(
+    "value,style,expected",
+    [
+        (255, "hex", "0xff"),
+        (Rational(1, 16), "hex", "0x1/0x10"),
+        (12345, "digits", "5"),
+        (Rational(22, 7), "decimal", "22/7"),
+        (1000, "log10", "3.0"),
+    ],
+)
+def test_format_number(value, style, expected):
+    assert format_number(value, style) == expected
+
+
+def test_huge_integer_is_written_in_full():
+    digits = to_decimal_string(10 ** 50000 + 1)
+    assert len(digits) == 50001
+    assert digits[0] == "1" and digits[-1] == "1" and set(digits[1:-1]) == {"0"}
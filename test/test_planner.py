@@ -0,0 +1,124 @@
+import math
+
+import pytest
+
+from ccc.commands.count import draws
+from ccc.draw import Draw
+from ccc.multiset import Multiset
+from ccc.permutation import LAGUERRE_ALPHA, PermutationCounter, laguerre_integral
+from ccc.sequence import Sequence
+
+COLLECTION = {"red": 6, "blue": 4, "green": 9}
+CONSTRAINTS = [
+    [("le", "red", 3), ("ge", "blue", 1)],
+    [("mod", "red", 2, 0), ("ne", "green", 3)],
+    [("in", "blue", [0, 2, 4]), ("gt", "green", 1), ("lt", "green", 8)],
+]
+
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+@pytest.mark.parametrize("collection", [COLLECTION, None])
+@pytest.mark.parametrize("tracker_class", [Multiset, Sequence])
+def test_engines_agree(tracker_class, collection, constraints):
+    tracker = tracker_class(11, collection, constraints)
+    counts = {engine: tracker.count(engine) for engine in tracker.plan().costs}
+    assert len(set(counts.values())) == 1
+
+
+@pytest.mark.parametrize("constraints", CONSTRAINTS)
+@pytest.mark.parametrize("replace", [False, True])
+def test_draw_engines_agree(constraints, replace):
+    draw = Draw(11, COLLECTION, constraints, replace=replace)
+    probabilities = {engine: draw.probability(engine) for engine in draw.plan().costs}
+    assert len(set(probabilities.values())) == 1
+
+
+def test_closed_form_only_for_intervals():
+    assert "closed_form" in Multiset(10, constraints=[("le", "a", 3), ("ge", "b", 2)]).plan().costs
+    assert "closed_form" not in Multiset(10, {"a": 10, "b": 10}, [("mod", "a", 2, 0)]).plan().costs
+
+
+def test_infeasible_terms_are_not_evaluated():
+    ms = Multiset(10, {"a": 2, "b": 3}, [("le", "a", 4), ("le", "b", 4)])
+    assert ms.plan().engine == "infeasible"
+    assert ms.count() == 0
+
+
+def test_tightened_degrees():
+    ms = Multiset(10, {"a": 10, "b": 10}, [("ge", "a", 6), ("le", "b", 2)])
+    assert ms.factor_degrees() == [range(8, 11), range(0, 3)]
+    assert ms.count() == 3
+
+
+def test_unconstrained_draw():
+    draw = Draw(5, COLLECTION, [("le", "red", 6)])
+    assert draw.plan().engine == "unconstrained"
+    assert draw.count() == draw.count("packed")
+
+
+def test_unconstrained_draw_items_are_pooled():
+    collection = {f"item{i}": i for i in range(1, 200)}
+    draw = Draw(50, collection, [("eq", "item1", 1)])
+    assert len(draw.factor_degrees()) == 2
+    # the other items hold 19899 between them, and one draw has exactly 1 of item1
+    assert draw.count() == draw.count("polynomial") == math.comb(19899, 49)
+
+
+def test_sparse_degrees_use_sparse_engine():
+    constraints = [("in", "a", [0, 500, 3000]), ("in", "b", [0, 1000, 2000])]
+    draw = Draw(6000, {"a": 20000, "b": 20000, "c": 20000}, constraints)
+    assert draw.plan().engine == "sparse"
+    assert draw.count() == sum(
+        math.comb(20000, a) * math.comb(20000, b) * math.comb(20000, 6000 - a - b)
+        for a in (0, 500, 3000)
+        for b in (0, 1000, 2000)
+    )
+
+    ms = Multiset(10 ** 6, constraints=[("in", "a", [0, 5000, 10 ** 6]), ("mod", "b", 250000, 0)])
+    assert ms.plan().engine == "sparse"
+    assert ms.count() == 2
+
+
+def test_huge_size_uses_closed_form():
+    ms = Multiset(10 ** 12, constraints=[("ge", "red", 2), ("le", "blue", 5)])
+    assert ms.plan().engine == "closed_form"
+
+
+def test_explain_lists_each_term(runner):
+    result = runner.invoke(
+        draws,
+        ["--size", 4, "--collection", "a=3; b=4", "--where", "a == 1 or b == 3", "--explain"],
+    )
+    lines = result.output.splitlines()
+    assert lines[0] == "3 terms to evaluate"
+    assert lines[1].startswith("+ a == 1: ")
+    assert lines[3].startswith("- a == 1, b == 3: ")
+
+
+@pytest.mark.parametrize("sequence", ["mississippi", "aabbccddee", "abbc", "aaabbb"])
+@pytest.mark.parametrize("constraint", ["derangement", "no_adjacent"])
+@pytest.mark.parametrize("same_distinct", [False, True])
+def test_permutation_engines_agree(sequence, constraint, same_distinct):
+    counter = PermutationCounter(sequence, [(constraint,)], same_distinct)
+    assert counter.count("laguerre") == counter.count("transfer_matrix")
+
+
+@pytest.mark.parametrize("sequence", ["mississippi", "aabbccddee", "abbc", "aaabbb"])
+@pytest.mark.parametrize("constraint", ["derangement", "no_adjacent"])
+def test_laguerre_integral(sequence, constraint):
+    counter = PermutationCounter(sequence, [(constraint,)])
+    frequencies = list(counter.frequencies.values())
+    integral = laguerre_integral(frequencies, LAGUERRE_ALPHA[constraint])
+    assert abs(integral) == counter.count("transfer_matrix")
+
+
+def test_multiple_permutation_constraints_use_transfer_matrix():
+    counter = PermutationCounter("aabbcc", [("derangement",), ("no_adjacent",)])
+    assert counter.plan().engine == "transfer_matrix"
+    assert "laguerre" not in counter.plan().costs
+
+
+def test_periodic_constraints_at_huge_size_use_recurrence():
+    ms = Multiset(10 ** 15, constraints=[("mod", "a", 3, 1), ("mod", "b", 5, 0)])
+    assert ms.plan().engine == "recurrence"
+    assert ms.count() == 66666666666667
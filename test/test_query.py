@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ccc import evaluate
+from ccc.query import (
+    compile_draws,
+    compile_multisets,
+    compile_permutations,
+    compile_sequences,
+    evaluate_query,
+)
+
+COLLECTION = {"a": 4, "b": 3, "c": 5}
+CONSTRAINTS = [[("ge", "a", 2)], [("le", "b", 1)], [("ne", "c", 3)]]
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        (
+            compile_multisets(6, COLLECTION, CONSTRAINTS),
+            evaluate.count_multisets(6, COLLECTION, CONSTRAINTS),
+        ),
+        (
+            compile_draws(6, COLLECTION, CONSTRAINTS),
+            evaluate.probability_draw(6, COLLECTION, CONSTRAINTS),
+        ),
+        (
+            compile_draws(6, COLLECTION, CONSTRAINTS, replace=True),
+            evaluate.probability_draw(6, COLLECTION, CONSTRAINTS, replace=True),
+        ),
+        (
+            compile_draws(6, COLLECTION, CONSTRAINTS, method="count"),
+            evaluate.count_draws(6, COLLECTION, CONSTRAINTS),
+        ),
+        (compile_draws(6, COLLECTION), 1),
+        (
+            compile_sequences(6, COLLECTION, CONSTRAINTS),
+            evaluate.count_sequences(6, COLLECTION, CONSTRAINTS),
+        ),
+        (
+            compile_permutations("aabbbc", [[("derangement",)], [("no_adjacent",)]]),
+            evaluate.count_permutations("aabbbc", [[("derangement",)], [("no_adjacent",)]]),
+        ),
+        (compile_permutations({"a": 2, "b": 2}), 6),
+    ],
+)
+def test_query_matches_evaluate(query, expected):
+    assert evaluate_query(query) == expected
+    assert evaluate_query(query) == expected
+
+
+def test_queries_are_hashable():
+    first = compile_draws(6, COLLECTION, CONSTRAINTS)
+    second = compile_draws(6, dict(COLLECTION), [list(c) for c in CONSTRAINTS])
+
+    assert first == second
+    assert len({first, second}) == 1
+    assert first != compile_draws(6, COLLECTION, CONSTRAINTS, replace=True)
+    assert first != compile_draws(6, {"a": 4, "b": 3, "c": 6}, CONSTRAINTS)
+    assert first != compile_draws(6, COLLECTION, CONSTRAINTS, method="count")
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        compile_multisets(6, COLLECTION, CONSTRAINTS),
+        compile_draws(6, COLLECTION, [[("ne", "a", 2)], [("in", "b", [0, 3])]], replace=True),
+        compile_sequences(6, COLLECTION, CONSTRAINTS),
+    ],
+)
+def test_query_terms_are_frozen(query):
+    for term in query.terms:
+        hash(term.args)
+        assert all(isinstance(degrees, (range, frozenset)) for degrees in term.args[0])
+
+
+def test_query_shared_between_threads():
+    query = compile_draws(
+        40, {"a": 40, "b": 30, "c": 50}, [[("ge", "a", 20)], [("mod", "b", 3, 1)]]
+    )
+    expected = evaluate_query(query)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        answers = list(executor.map(evaluate_query, [query] * 32))
+
+    assert answers == [expected] * 32
+
+
+def test_query_with_no_feasible_terms():
+    query = compile_permutations("aaab", [[("derangement",)], [("no_adjacent",)]])
+    assert query.terms == ()
+    assert evaluate_query(query) == 0
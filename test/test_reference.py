@@ -0,0 +1,229 @@
+import math
+import os
+import random
+
+import pytest
+
+from ccc import backend, evaluate, reference
+from ccc.draw import Draw
+from ccc.multiset import Multiset
+from ccc.util.constraints import process_constraint_string
+
+# Number of random questions asked of each kind, and the seed they are made
+# from (set these to fuzz for longer, or to repeat a failure)
+FUZZ_CASES = int(os.environ.get("CCC_FUZZ_CASES", 25))
+FUZZ_SEED = int(os.environ.get("CCC_FUZZ_SEED", 0))
+
+ITEMS = ["a", "b", "c", "d"]
+
+
+def random_collection(rng, items=3, most=4):
+    return {item: rng.randint(1, most) for item in ITEMS[:items]}
+
+
+def random_compare(rng, item, size):
+    number = rng.randint(0, size)
+    kind = rng.choice(["==", "!=", "<", "<=", ">", ">=", "in", "not in", "%", "chain"])
+
+    if kind in ("in", "not in"):
+        numbers = rng.sample(range(size + 1), rng.randint(1, min(3, size + 1)))
+        return f"{item} {kind} ({', '.join(map(str, numbers))},)"
+    if kind == "%":
+        mod = rng.randint(2, 3)
+        return f"{item} % {mod} == {rng.randrange(mod)}"
+    if kind == "chain":
+        return f"{number} <= {item} < {number + rng.randint(1, 3)}"
+
+    return f"{item} {kind} {number}"
+
+
+def random_where(rng, items, size, disjuncts=3, conjuncts=2):
+    """
+    A --where string of up to the given number of alternatives (joined
+    with 'or'), each a tuple of up to the given number of comparisons.
+    """
+    alternatives = []
+
+    for _ in range(rng.randint(1, disjuncts)):
+        compares = [
+            random_compare(rng, rng.choice(items), size) for _ in range(rng.randint(1, conjuncts))
+        ]
+        alternatives.append(compares[0] if len(compares) == 1 else f"({', '.join(compares)})")
+
+    return " or ".join(alternatives)
+
+
+def engine_answers(terms, method="count"):
+    """
+    The inclusion-exclusion sum of the terms found with each engine that
+    can evaluate any of them (terms it cannot evaluate use the planner's
+    choice).
+    """
+    terms = list(terms)
+    plans = [tracker.plan() for _, _, tracker in terms]
+    engines = set().union(*(plan.costs for plan in plans))
+
+    for engine in sorted(engines):
+        yield engine, sum(
+            coefficient * getattr(tracker, method)(engine if engine in plan.costs else None)
+            for (coefficient, _, tracker), plan in zip(terms, plans)
+        )
+
+
+@pytest.fixture(autouse=True, params=backend.available_backends())
+def use_backend(request):
+    """
+    Every question is answered with each backend that is installed.
+    """
+    previous = backend.get_backend()
+    backend.set_backend(request.param)
+    yield request.param
+    backend.set_backend(previous)
+
+
+def cases(kind):
+    rng = random.Random(f"{FUZZ_SEED}-{kind}")
+    return [rng.random() for _ in range(FUZZ_CASES)]
+
+
+@pytest.mark.parametrize("seed", cases("multisets"))
+def test_fuzz_multisets(seed):
+    rng = random.Random(seed)
+    collection = random_collection(rng)
+    size = rng.randint(0, sum(collection.values()))
+    constraints = process_constraint_string(random_where(rng, list(collection), size))
+
+    expected = reference.count_multisets(size, collection, constraints)
+    assert evaluate.count_multisets(size, collection, constraints) == expected
+
+    for engine, answer in engine_answers(evaluate.multiset_terms(size, collection, constraints)):
+        assert answer == expected, engine
+
+
+@pytest.mark.parametrize("seed", cases("multisets without collection"))
+def test_fuzz_multisets_without_collection(seed):
+    rng = random.Random(seed)
+    size = rng.randint(0, 6)
+    constraints = process_constraint_string(random_where(rng, ITEMS[:3], size, disjuncts=1))
+
+    expected = reference.count_multisets(size, None, constraints)
+
+    for engine, answer in engine_answers(evaluate.multiset_terms(size, None, constraints)):
+        assert answer == expected, engine
+
+
+@pytest.mark.parametrize("seed", cases("draws"))
+def test_fuzz_draws(seed):
+    rng = random.Random(seed)
+    replace = rng.random() < 0.3
+    collection = random_collection(rng, most=3 if replace else 4)
+    size = rng.randint(0, 4 if replace else sum(collection.values()))
+    constraints = process_constraint_string(random_where(rng, list(collection), size))
+
+    expected = reference.probability_draw(size, collection, constraints, replace)
+    assert evaluate.probability_draw(size, collection, constraints, replace) == expected
+
+    terms = evaluate.draw_terms(size, collection, constraints, replace)
+    for engine, answer in engine_answers(terms, "probability"):
+        assert answer == expected, engine
+
+    if not replace:
+        expected = reference.count_draws(size, collection, constraints)
+        assert evaluate.count_draws(size, collection, constraints) == expected
+
+
+@pytest.mark.parametrize("seed", cases("sequences"))
+def test_fuzz_sequences(seed):
+    rng = random.Random(seed)
+    collection = random_collection(rng) if rng.random() < 0.7 else None
+    items = list(collection) if collection else ITEMS[:3]
+    size = rng.randint(0, 5)
+    disjuncts = 3 if collection else 1
+    constraints = process_constraint_string(random_where(rng, items, size, disjuncts))
+
+    expected = reference.count_sequences(size, collection, constraints)
+    assert evaluate.count_sequences(size, collection, constraints) == expected
+
+    for engine, answer in engine_answers(evaluate.sequence_terms(size, collection, constraints)):
+        assert answer == expected, engine
+
+
+@pytest.mark.parametrize("seed", cases("permutations"))
+def test_fuzz_permutations(seed):
+    rng = random.Random(seed)
+    sequence = "".join(rng.choice("abc") for _ in range(rng.randint(1, 7)))
+    where = rng.choice(["derangement", "no_adjacent", "derangement or no_adjacent"])
+    constraints = process_constraint_string(where)
+    same_distinct = rng.random() < 0.5
+
+    expected = reference.count_permutations(sequence, constraints, same_distinct)
+    assert evaluate.count_permutations(sequence, constraints, same_distinct) == expected
+
+    terms = evaluate.permutation_terms(sequence, constraints, same_distinct)
+    for engine, answer in engine_answers(terms):
+        assert answer == expected, engine
+
+
+@pytest.mark.parametrize("seed", cases("stages"))
+def test_fuzz_staged_draws(seed):
+    rng = random.Random(seed)
+    collection = random_collection(rng, most=3)
+    total = sum(collection.values())
+    first = rng.randint(0, min(total, 4))
+    second = rng.randint(0, min(total - first, 3))
+    stages = [
+        (size, process_constraint_string(random_where(rng, list(collection), size, 2)))
+        for size in (first, second)
+    ]
+
+    expected = reference.probability_staged_draw(collection, stages)
+    assert evaluate.probability_staged_draw(collection, stages) == expected
+
+
+# The sizes timed for each engine in the scaling checks, which are only run
+# when CCC_SCALING is set (they take a while, and depend on the machine)
+SCALING_SIZES = [250, 500, 1000, 2000]
+
+
+@pytest.mark.skipif(not os.environ.get("CCC_SCALING"), reason="set CCC_SCALING to run")
+@pytest.mark.parametrize(
+    "build,digits",
+    [
+        (
+            lambda size: Multiset(
+                size, None, [("mod", "a", 3, 1), ("le", "b", size // 2), ("ge", "c", 5)]
+            ),
+            0,
+        ),
+        (
+            lambda size: Multiset(
+                size, None, [("in", "a", [0, size // 3, size]), ("mod", "b", 97, 0)]
+            ),
+            0,
+        ),
+        # the binomial coefficients of a draw have O(size) digits
+        (
+            lambda size: Draw(
+                size, {"a": size, "b": size, "c": size}, [("mod", "a", 2, 0), ("le", "b", 9)]
+            ),
+            1,
+        ),
+    ],
+)
+def test_engines_scale_as_modelled(build, digits):
+    """
+    Each engine's time should not grow much faster with the size than its
+    estimated cost does (allowing for the fixed costs at small sizes).
+
+    The cost models count operations on coefficients, so when the number
+    of digits in the coefficients grows as a power of the size, that power
+    is allowed for too.
+    """
+    timings = reference.time_engines(build, SCALING_SIZES)
+    first, last = build(SCALING_SIZES[0]).plan().costs, build(SCALING_SIZES[-1]).plan().costs
+    doublings = math.log2(SCALING_SIZES[-1] / SCALING_SIZES[0])
+
+    for engine, times in timings.items():
+        modelled = math.log2(last[engine] / first[engine]) / doublings + digits
+        measured = math.log2(max(times[-1][1], 1e-6) / max(times[0][1], 1e-6)) / doublings
+        assert measured <= modelled + 1, engine
@@ -0,0 +1,112 @@
+import pytest
+
+from sympy import prod, factorial
+from sympy.abc import x
+
+from ccc.polynomial import degrees_to_polynomial_with_factorial_coeff
+from ccc.series import (
+    multinomial_product,
+    multiply_signed,
+    rational_coefficient,
+    scaled_multinomial_product,
+    sparse_product,
+    truncated_product,
+)
+
+
+@pytest.mark.parametrize(
+    "degree_sets,max_degree,expected",
+    [
+        ([], 3, [1, 0, 0, 0]),
+        ([{0, 1}, {2}], 3, [0, 0, 1, 3]),
+        ([{1}, {1}, {1}], 3, [0, 0, 0, 6]),
+        ([{0, 1, 2}, set()], 2, [0, 0, 0]),
+        ([{0, 5}, {0, 1}], 2, [1, 1, 0]),
+    ],
+)
+def test_multinomial_product(degree_sets, max_degree, expected):
+    assert multinomial_product(degree_sets, max_degree) == expected
+
+
+@pytest.mark.parametrize(
+    "degree_sets,max_degree",
+    [
+        ([set(range(5)), set(range(0, 12, 3)), {1, 4, 7}], 12),
+        ([set(range(2, 9)), set(range(9)), set(range(1, 9, 2)), {0, 8}], 8),
+    ],
+)
+def test_multinomial_product_matches_exponential_generating_function(degree_sets, max_degree):
+    poly = prod(degrees_to_polynomial_with_factorial_coeff(degrees) for degrees in degree_sets)
+    expected = [poly.coeff_monomial(x ** n) * factorial(n) for n in range(max_degree + 1)]
+    assert multinomial_product(degree_sets, max_degree) == expected
+
+
+@pytest.mark.parametrize(
+    "degree_sets,max_degree,bases",
+    [
+        ([], 3, []),
+        ([{0, 1, 2}, set()], 2, [1, 1]),
+        ([set(range(5)), set(range(0, 12, 3)), {1, 4, 7}], 12, [1, 1, 1]),
+        ([set(range(2, 9)), {0, 8, 20}, set(range(1, 9, 2))], 8, [3, 1, 5]),
+    ],
+)
+def test_scaled_multinomial_product(degree_sets, max_degree, bases):
+    expected = multinomial_product(degree_sets, max_degree, bases)
+    assert scaled_multinomial_product(degree_sets, max_degree, bases) == expected
+
+
+@pytest.mark.parametrize(
+    "first,second,expected",
+    [
+        ([1, -1], [1, 1], [1, 0, -1]),
+        ([-3], [2, -5, 7], [-6, 15, -21]),
+        ([0, 4, -2], [0, 0, 1], [0, 0, 0, 4, -2]),
+        ([], [1], []),
+    ],
+)
+def test_multiply_signed(first, second, expected):
+    assert multiply_signed(first, second) == expected
+
+
+@pytest.mark.parametrize(
+    "numerator,denominator,n,expected",
+    [
+        ([0, 1], [1, -1, -1], 10, 55),
+        ([1], [1, -1], 10 ** 18, 1),
+        ([1], [1, -2], 100, 2 ** 100),
+        ([1, 0, 0, -1], [1, -1], 2, 1),
+        ([1, 0, 0, -1], [1, -1], 3, 0),
+        ([1], [1, -1, 0, -1, 1], 40, 14),
+    ],
+)
+def test_rational_coefficient(numerator, denominator, n, expected):
+    assert rational_coefficient(numerator, denominator, n) == expected
+
+
+@pytest.mark.parametrize(
+    "factors,max_degree",
+    [
+        # sparse throughout
+        ([([0, 5], [1, 1]), ([0, 7], [1, 2]), ([3, 900], [4, 5])], 1000),
+        # sparse, then a dense factor, then sparse again
+        ([([0, 40], [2, 3]), (list(range(30)), list(range(1, 31))), ([0, 1, 60], [1, 7, 1])], 80),
+        # dense throughout, truncated
+        ([(list(range(9)), [3] * 9), (list(range(0, 12, 2)), [1, 2, 3, 4, 5, 6])], 10),
+        # a factor with no terms
+        ([([0, 2], [1, 1]), ([], [])], 5),
+        # sparse factors whose degrees together are all above max_degree
+        ([([5], [1]), ([7], [1]), ([0, 1], [1, 1])], 10),
+    ],
+)
+def test_sparse_product_matches_truncated_product(factors, max_degree):
+    dense = []
+    for degrees, coeffs in factors:
+        coeff_list = [0] * (max(degrees, default=0) + 1)
+        for degree, coeff in zip(degrees, coeffs):
+            coeff_list[degree] = coeff
+        dense.append(coeff_list if degrees else [])
+
+    expected = truncated_product(dense, max_degree)
+    degrees, coeffs = sparse_product(factors, max_degree)
+    assert degrees == [d for d, c in enumerate(expected) if c]
+    assert coeffs == [c for c in expected if c]
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ccc import server
+from ccc.server import QueryServer, run_query
+from ccc.util.cancellation import check_cancelled, run_cancellable
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.mark.parametrize(
+    "path,params,expected",
+    [
+        ("/count/multisets", {"size": 20, "where": "a < 10, b >= 5, c != 13, d % 2 == 0"}, "406"),
+        ("/count/draws", {"size": 4, "collection": "a=5; b=10; c=15"}, "15"),
+        ("/count/sequences", {"size": 4, "where": "f == 1, o == 2, d == 1"}, "12"),
+        ("/count/permutations", {"sequence": "mississippi", "where": "no_adjacent"}, "2016"),
+        (
+            "/probability/draw",
+            {"number": 4, "from": "red=3; blue=1; yellow=2", "where": "blue == 0"},
+            "1/3",
+        ),
+        ("/probability/permutation", {"sequence": "food", "where": "derangement"}, "1/6"),
+    ],
+)
+def test_run_query(path, params, expected):
+    assert run_query(path, params)["result"] == expected
+
+
+@pytest.mark.parametrize(
+    "method,path,body,status",
+    [
+        ("GET", "/health", b"", 200),
+        ("POST", "/count/draws", b'{"size": 2, "collection": "a=2; b=2"}', 200),
+        ("POST", "/count/nothing", b"{}", 404),
+        ("GET", "/count/draws", b"", 405),
+        ("POST", "/count/draws", b"[1, 2]", 400),
+        ("POST", "/count/draws", b'{"size": 2}', 400),
+        ("POST", "/count/draws", b'{"size": 2, "collection": "a=2", "where": "a <"}', 400),
+        (
+            "POST",
+            "/count/draws",
+            b'{"size": 3, "collection": "red=3; blue=", "where": "red >= 1"}',
+            400,
+        ),
+        ("POST", "/count/draws", b'{"size": "2", "collection": "a=2"}', 400),
+        ("POST", "/count/draws", b'{"size": 2, "collection": 5}', 400),
+        ("POST", "/count/permutations", b'{"where": "derangement"}', 400),
+        ("POST", "/count/multisets", b'{"size": 3}', 400),
+        ("POST", "/count/sequences", b'{"size": 3}', 400),
+        ("POST", "/probability/draw", b'{"number": 2, "from": "a=2; b=2"}', 400),
+        ("POST", "/probability/permutation", b'{"sequence": "food"}', 400),
+        ("POST", "/probability/draw", b'{"number": 2, "from": "", "where": "a == 1"}', 400),
+        ("POST", "/count/draws", b'{"size": 2, "collection": "a=2", "where": "b == 1"}', 400),
+    ],
+)
+def test_respond_status(method, path, body, status):
+    with ThreadPoolExecutor(1) as executor:
+        query_server = QueryServer(executor, timeout=10)
+        assert run(query_server.respond(method, path, body))[0] == status
+
+
+def test_large_answers_are_written_in_full():
+    # more digits than Python will convert with str()
+    result = run_query("/count/permutations", {"counts": "a=3000; b=3000; c=3000; d=3000"})
+    assert len(result["result"]) > 7000
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_unexpected_errors_are_answered(monkeypatch):
+    def broken_query(path, params, cancelled):
+        raise KeyError("bug")
+
+    monkeypatch.setattr(server, "run_query", broken_query)
+    body = b'{"size": 2, "collection": "a=2"}'
+
+    async def request(query_server):
+        reader = asyncio.StreamReader()
+        reader.feed_data(
+            b"POST /count/draws HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+        )
+        writer = FakeWriter()
+        await query_server.handle(reader, writer)
+        return writer
+
+    with ThreadPoolExecutor(1) as executor:
+        writer = run(request(QueryServer(executor, timeout=10)))
+
+    assert writer.data.startswith(b"HTTP/1.1 500 Internal Server Error")
+    assert writer.closed
+
+
+def test_identical_queries_are_coalesced(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_query(path, params, cancelled):
+        calls.append(path)
+        release.wait(5)
+        return {"result": "42"}
+
+    monkeypatch.setattr(server, "run_query", slow_query)
+
+    async def many_queries(query_server):
+        params = {"size": 3, "collection": "a=3"}
+        tasks = [
+            asyncio.ensure_future(query_server.evaluate("/count/draws", dict(params)))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0.1)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = run(many_queries(QueryServer(executor, timeout=10)))
+
+    assert results == [{"result": "42"}] * 5
+    assert len(calls) == 1
+
+
+def test_timeout():
+    release = threading.Event()
+
+    with ThreadPoolExecutor(1) as executor:
+        query_server = QueryServer(executor, timeout=0.05)
+        executor.submit(release.wait, 5)
+        body = json.dumps({"size": 2, "collection": "a=2; b=2"}).encode()
+        status, _ = run(query_server.respond("POST", "/count/draws", body))
+        release.set()
+
+    assert status == 504
+
+
+def test_abandoned_queries_are_cancelled(monkeypatch):
+    events = []
+
+    def endless_query(path, params, cancelled):
+        events.append(cancelled)
+        return run_cancellable(cancelled, _spin)
+
+    monkeypatch.setattr(server, "run_query", endless_query)
+
+    with ThreadPoolExecutor(1) as executor:
+        query_server = QueryServer(executor, timeout=0.05)
+        body = json.dumps({"size": 2, "collection": "a=2; b=2"}).encode()
+        status, _ = run(query_server.respond("POST", "/count/draws", body))
+
+    assert status == 504
+    assert events[0].is_set()
+    assert not query_server._in_flight
+
+
+def _spin():
+    while True:
+        check_cancelled()
@@ -0,0 +1,121 @@
+import math
+
+import pytest
+import sympy
+
+from ccc import tables
+from ccc.tablefile import TableFile, build_table_file
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 20, 171, 400, 1023, 1024, 5000])
+def test_factorial(n):
+    assert tables.factorial(n) == math.factorial(n)
+    assert tables.log_factorial(n) == pytest.approx(math.lgamma(n + 1))
+
+
+def test_log_factorial_beyond_cache():
+    n = 3 * tables.LOG_FACTORIAL_CACHE_SIZE
+    assert tables.log_factorial(n) == pytest.approx(math.lgamma(n + 1))
+    assert len(tables._log_factorials) <= tables.LOG_FACTORIAL_CACHE_SIZE
+
+
+def test_factorial_cache_grows_by_doubling(monkeypatch):
+    monkeypatch.setattr(tables, "_factorials", [1])
+    lengths = set()
+
+    for n in range(200):
+        assert tables.factorial(n) == math.factorial(n)
+        lengths.add(len(tables._factorials))
+
+    assert lengths == {1, 2, 4, 8, 16, 32, 64, 128, 256}
+
+
+def test_factorial_cache_is_bounded():
+    tables.factorial(3 * tables.FACTORIAL_CACHE_SIZE)
+    assert len(tables._factorials) <= tables.FACTORIAL_CACHE_SIZE
+
+
+@pytest.mark.parametrize("n,k", [(0, 0), (5, 2), (5, 7), (5, -1), (100, 37), (1000, 999)])
+def test_binomial(n, k):
+    assert tables.binomial(n, k) == sympy.binomial(n, k)
+
+
+@pytest.mark.parametrize("n,max_k", [(0, 3), (6, 6), (6, 10), (50, 20)])
+def test_binomial_row(n, max_k):
+    assert tables.binomial_row(n, max_k) == [sympy.binomial(n, k) for k in range(max_k + 1)]
+
+
+@pytest.mark.parametrize("modulus", [101, 998244353])
+def test_modular_factorials(modulus):
+    # grow the table twice to check extending it keeps earlier entries valid
+    for n in [10, 40, 100]:
+        assert tables.factorial_mod(n, modulus) == math.factorial(n) % modulus
+        assert tables.inverse_factorial_mod(n, modulus) * math.factorial(n) % modulus == 1
+        assert tables.binomial_mod(n, n // 3, modulus) == sympy.binomial(n, n // 3) % modulus
+
+
+@pytest.mark.parametrize("n,modulus", [(7, 7), (5, 101 * 1009)])
+def test_modulus_must_be_a_larger_prime(n, modulus):
+    with pytest.raises(ValueError):
+        tables.factorial_mod(n, modulus)
+
+
+@pytest.fixture
+def mapped_tables(tmp_path):
+    path = str(tmp_path / "tables.bin")
+    build_table_file(path, 3000, stride=100, moduli=[10007])
+    tables.map_tables(path)
+    yield path
+    tables.map_tables(None)
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 171, 1500, 2999, 3000, 4500])
+def test_mapped_tables(mapped_tables, n):
+    assert tables.factorial(n) == math.factorial(n)
+    assert tables.log_factorial(n) == pytest.approx(math.lgamma(n + 1))
+
+
+def test_mapped_modular_tables(mapped_tables, monkeypatch):
+    monkeypatch.setattr(tables, "_modular_tables", {})
+
+    for n in [0, 7, 2999]:
+        assert tables.factorial_mod(n, 10007) == math.factorial(n) % 10007
+        assert tables.inverse_factorial_mod(n, 10007) * math.factorial(n) % 10007 == 1
+
+    assert tables.binomial_mod(2999, 1000, 10007) == sympy.binomial(2999, 1000) % 10007
+    assert tables._modular_tables == {}
+
+
+def test_table_file_contents(mapped_tables):
+    table = TableFile(mapped_tables)
+    assert (table.size, table.stride, list(table.modular)) == (3000, 100, [10007])
+    assert table.log_factorials[2999] == pytest.approx(math.lgamma(3000))
+    assert table.checkpoint(0) == (0, 1)
+    assert table.checkpoint(2999) == (2900, math.factorial(2900))
+    assert [table.checkpoint(n)[1] for n in range(0, 3000, 100)] == [
+        math.factorial(n) for n in range(0, 3000, 100)
+    ]
+
+
+def test_table_file_size_is_linear_in_checkpoints(tmp_path):
+    sparse, dense = tmp_path / "sparse.bin", tmp_path / "dense.bin"
+    build_table_file(str(sparse), 2000, stride=100)
+    build_table_file(str(dense), 2000, stride=1)
+    assert sparse.stat().st_size * 50 < dense.stat().st_size
+
+
+def test_table_file_is_checked(tmp_path):
+    path = tmp_path / "tables.bin"
+    path.write_bytes(b"not a table file")
+
+    with pytest.raises(ValueError):
+        TableFile(str(path))
+
+    with pytest.raises(ValueError):
+        build_table_file(str(path), 300, stride=0)
+
+
+@pytest.mark.parametrize("modulus", [101, 1009 * 1013, 2 ** 64 + 13])
+def test_table_file_moduli_are_checked(tmp_path, modulus):
+    with pytest.raises(ValueError):
+        build_table_file(str(tmp_path / "tables.bin"), 300, moduli=[modulus])